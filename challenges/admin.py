@@ -1,25 +1,59 @@
 from django.contrib import admin
 from django.urls import path
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.urls import reverse
 from django.contrib import messages
 from django import forms
+from django.utils.html import format_html
 import pandas as pd
 from datetime import date, timedelta
-from .models import DailyQuestion, TestCase, UserStreak, DailySubmission
+from .models import DailyQuestion, TestCase, UserStreak, DailySubmission, JudgeJob, SubmissionRecord, Contest, ContestProblem, ContestEntry
+from .similarity import question_report
+from .testdata import store_chunks
 
 class ExcelUploadForm(forms.Form):
     file = forms.FileField()
 
+class TestCaseForm(forms.ModelForm):
+    """
+    Large inputs / expected outputs can be uploaded as files instead of pasted;
+    they go straight to challenges/testdata.py storage without being read into memory.
+    """
+    input_file = forms.FileField(required=False, help_text="Replaces the input")
+    expected_file = forms.FileField(required=False, help_text="Replaces the expected output")
+
+    class Meta:
+        model = TestCase
+        fields = '__all__'
+
+    def save(self, commit=True):
+        test = super().save(commit=False)
+        for upload_field, field, prefix in (('input_file', 'input_data', 'input'), ('expected_file', 'expected_output', 'expected')):
+            upload = self.cleaned_data.get(upload_field)
+            if upload:
+                sha256, size = store_chunks(upload.chunks())
+                setattr(test, field, '')
+                setattr(test, f'{prefix}_in_file', True)
+                setattr(test, f'{prefix}_sha256', sha256)
+                setattr(test, f'{prefix}_size', size)
+        if commit:
+            test.save()
+        return test
+
 class TestCaseInline(admin.TabularInline):
     model = TestCase
+    form = TestCaseForm
     extra = 1           # Shows 1 empty slot for a new test case
     min_num = 0         # Allows saving without test cases (important for MCQs)
     can_delete = True   # Allows deleting test cases directly here
-    fields = ('input_data', 'expected_output') # Only show relevant fields
+    fields = ('input_data', 'input_file', 'input_size', 'expected_output', 'expected_file', 'expected_size', 'compare_mode', 'float_tolerance', 'time_limit_ms', 'memory_limit_mb', 'output_limit_kb') # Only show relevant fields
+    readonly_fields = ('input_size', 'expected_size')
 
 @admin.register(DailyQuestion)
 class DailyQuestionAdmin(admin.ModelAdmin):
-    list_display = ('title', 'question_type', 'release_date')
+    list_display = ('title', 'question_type', 'release_date', 'similarity_link')
+    search_fields = ('title',) # Also used by the contest problem picker
     change_list_template = "admin/challenges_changelist.html"
     inlines = [TestCaseInline]
 
@@ -27,9 +61,25 @@ class DailyQuestionAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('upload-excel/', self.upload_excel, name='upload_challenges_excel'),
+            path('<int:question_id>/similarity/', self.admin_site.admin_view(self.similarity_report), name='challenges_similarity_report'),
         ]
         return custom_urls + urls
 
+    @admin.display(description='Similarity')
+    def similarity_link(self, obj):
+        if obj.question_type != 'CODE':
+            return '-'
+        return format_html('<a href="{}">Report</a>', reverse('admin:challenges_similarity_report', args=[obj.pk]))
+
+    def similarity_report(self, request, question_id):
+        question = get_object_or_404(DailyQuestion, pk=question_id)
+        return render(request, "admin/similarity_report.html", {
+            'question': question,
+            'pairs': question_report(question),
+            'threshold': settings.SIMILARITY_THRESHOLD,
+            'indexed': question.fingerprints.count(),
+        })
+
     def upload_excel(self, request):
         if request.method == "POST":
             excel_file = request.FILES["file"]
@@ -39,7 +89,7 @@ class DailyQuestionAdmin(admin.ModelAdmin):
                 df = df.fillna('')
                 
                 # 2. Determine Start Date
-                last_question = DailyQuestion.objects.order_by('-release_date').first()
+                last_question = DailyQuestion.objects.filter(release_date__isnull=False).order_by('-release_date').first()
                 if last_question:
                     start_date = last_question.release_date + timedelta(days=1)
                 else:
@@ -125,4 +175,65 @@ class DailyQuestionAdmin(admin.ModelAdmin):
 
 admin.site.register(UserStreak)
 admin.site.register(DailySubmission)
-admin.site.register(TestCase)
\ No newline at end of file
+
+@admin.register(TestCase)
+class TestCaseAdmin(admin.ModelAdmin):
+    form = TestCaseForm
+    list_display = ('__str__', 'compare_mode', 'input_size', 'input_in_file', 'expected_size', 'expected_in_file')
+    list_select_related = ('question',)
+    readonly_fields = ('input_sha256', 'input_size', 'input_in_file', 'expected_sha256', 'expected_size', 'expected_in_file')
+
+    def get_queryset(self, request):
+        # Test data can be megabytes per row: only the detail page loads it
+        return super().get_queryset(request).defer('input_data', 'expected_output')
+
+@admin.register(JudgeJob)
+class JudgeJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'user', 'question', 'language', 'status', 'score', 'total', 'attempts', 'created_at')
+    list_filter = ('status', 'language')
+    readonly_fields = ('job_id', 'results', 'is_scored', 'started_at', 'finished_at')
+
+@admin.register(SubmissionRecord)
+class SubmissionRecordAdmin(admin.ModelAdmin):
+    list_display = ('user', 'question', 'language', 'score', 'total', 'submitted_at')
+    list_filter = ('language',)
+    list_select_related = ('user', 'question')
+    fields = ('user', 'question', 'language', 'score', 'total', 'submitted_at', 'case_results', 'source_code')
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        # The code blob is only needed on the detail page
+        return super().get_queryset(request).select_related('code').defer('code__data')
+
+    @admin.display(description='Test cases')
+    def case_results(self, obj):
+        return ', '.join(
+            f"#{index} {case['verdict']}"
+            + (f" {case['run_time_ms']} ms" if case['run_time_ms'] is not None else '')
+            + (f" {case['memory_kb']} KB" if case['memory_kb'] is not None else '')
+            for index, case in enumerate(obj.cases(), start=1)
+        )
+
+    @admin.display(description='Code')
+    def source_code(self, obj):
+        return format_html('<pre>{}</pre>', obj.code.text)
+
+class ContestProblemInline(admin.TabularInline):
+    model = ContestProblem
+    extra = 3
+    autocomplete_fields = ('question',)
+
+@admin.register(Contest)
+class ContestAdmin(admin.ModelAdmin):
+    list_display = ('title', 'starts_at', 'ends_at', 'penalty_minutes')
+    prepopulated_fields = {'slug': ('title',)}
+    inlines = [ContestProblemInline]
+
+@admin.register(ContestEntry)
+class ContestEntryAdmin(admin.ModelAdmin):
+    list_display = ('contest', 'user', 'solved', 'penalty', 'joined_at')
+    list_filter = ('contest',)
+    list_select_related = ('contest', 'user')
+    ordering = ('contest', '-solved', 'penalty')
+    readonly_fields = ('contest', 'user', 'solved', 'penalty', 'problems', 'joined_at')
+
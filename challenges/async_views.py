@@ -0,0 +1,124 @@
+"""
+Async versions of submit_code and the contest views, used when settings.USE_ASYNC_VIEWS is on.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils import timezone
+
+from core.decorators import async_login_required
+from core.gateway import ExecutorUnavailable
+from core.streaming import event_stream_response
+from core.throttle import admission_control
+from .contests import astanding_events, record_result
+from .judge import ajudge_submission, count_passed, describe_results, is_accepted
+from .models import Contest, ContestProblem, DailyQuestion, JudgeJob
+from .submissions import record_submission
+from .views import contest_closed, last_seen_event, update_user_progress
+
+
+@async_login_required(login_url='login')
+@admission_control(html=True)
+async def submit_code(request, question_id):
+    if request.method == "POST":
+        data = json.loads(request.body)
+        user_code = data.get('code')
+        language = data.get('language')
+
+        try:
+            # Only released daily questions, as in the sync view
+            question = await DailyQuestion.objects.aget(id=question_id, release_date__lte=timezone.now().date())
+        except DailyQuestion.DoesNotExist:
+            raise Http404("No DailyQuestion matches the given query.")
+
+        # Async mode: queue the job and let the page poll judge_status
+        if settings.JUDGE_ASYNC:
+            job = await JudgeJob.objects.acreate(user=request.user, question=question, language=language or '', code=user_code or '')
+            return JsonResponse({
+                'job_id': str(job.job_id),
+                'status_url': reverse('judge_status', args=[job.job_id]),
+            }, status=202)
+
+        test_cases = [test async for test in question.test_cases.all()]
+        total_cases = len(test_cases)
+
+        try:
+            results = await ajudge_submission(language, user_code, test_cases, question.stop_on_first_failure)
+        except ExecutorUnavailable:
+            # Don't record a score: the user gets to submit again once the runner is back
+            return HttpResponse(
+                '<div class="alert alert-warning mt-3 mb-0">Code runner is busy right now. Please submit again in a moment.</div>',
+                status=503
+            )
+        score = count_passed(results)
+        await sync_to_async(record_submission)(request.user, question, language, user_code, results)
+
+        # Update Streak
+        await sync_to_async(update_user_progress)(request.user, question, score)
+
+        return await sync_to_async(render)(request, 'challenges/code_result_partial.html', {
+            'score': score,
+            'results': describe_results(results),
+            'total': total_cases
+        })
+
+
+@async_login_required(login_url='login')
+@admission_control(html=True)
+async def contest_submit(request, slug, label):
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    submitted_at = timezone.now()
+    data = json.loads(request.body)
+    user_code = data.get('code')
+    language = data.get('language')
+
+    try:
+        problem = await ContestProblem.objects.select_related('contest', 'question').aget(contest__slug=slug, label=label)
+    except ContestProblem.DoesNotExist:
+        raise Http404("No ContestProblem matches the given query.")
+    if problem.contest.get_status(submitted_at) != 'RUNNING':
+        return contest_closed(problem.contest)
+    question = problem.question
+
+    if settings.JUDGE_ASYNC:
+        job = await JudgeJob.objects.acreate(
+            user=request.user, question=question, contest_problem=problem, language=language or '', code=user_code or ''
+        )
+        return JsonResponse({
+            'job_id': str(job.job_id),
+            'status_url': reverse('judge_status', args=[job.job_id]),
+        }, status=202)
+
+    test_cases = [test async for test in question.test_cases.all()]
+    try:
+        results = await ajudge_submission(language, user_code, test_cases, question.stop_on_first_failure)
+    except ExecutorUnavailable:
+        return HttpResponse(
+            '<div class="alert alert-warning mt-3 mb-0">Code runner is busy right now. Please submit again in a moment.</div>',
+            status=503
+        )
+    await sync_to_async(record_submission)(request.user, question, language, user_code, results)
+    await sync_to_async(record_result)(problem, request.user, is_accepted(results), submitted_at)
+
+    return await sync_to_async(render)(request, 'challenges/code_result_partial.html', {
+        'score': count_passed(results),
+        'results': describe_results(results),
+        'total': len(results)
+    })
+
+
+async def contest_events(request, slug):
+    """
+    Async views.contest_events: an open standings page doesn't hold a thread while it waits.
+    """
+    try:
+        contest = await Contest.objects.aget(slug=slug)
+    except Contest.DoesNotExist:
+        raise Http404("No Contest matches the given query.")
+    return event_stream_response(astanding_events(contest, last_seen_event(request)))
+
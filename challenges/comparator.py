@@ -0,0 +1,160 @@
+"""
+Output comparator for the Daily Challenge judge.
+
+Outputs and expected outputs are read as streams of chunks (a str, a file object or
+any iterable of str), so multi-megabyte outputs are compared in constant memory and
+the comparison stops at the first difference.
+
+Modes (TestCase.compare_mode):
+    EXACT       same text, apart from whitespace at the very start and end
+    WHITESPACE  same whitespace-separated tokens (spacing and line breaks don't matter)
+    FLOAT       like WHITESPACE, but numbers may differ by float_tolerance (absolute or relative)
+    UNORDERED   same lines in any order (trailing spaces and blank lines ignored)
+"""
+import math
+import operator
+import re
+
+EXACT = 'EXACT'
+WHITESPACE = 'WHITESPACE'
+FLOAT = 'FLOAT'
+UNORDERED = 'UNORDERED'
+
+DEFAULT_MODE = WHITESPACE
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+CHUNK_SIZE = 64 * 1024
+
+NUMBER = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+HASH_MODULUS = 1 << 64
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.decode('utf-8', errors='replace') if isinstance(chunk, bytes) else chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def iter_token_blocks(source):
+    """
+    Whitespace-separated tokens, one list per chunk (lists compare much faster than
+    single tokens). A token split across two chunks is joined back.
+    """
+    pending = ''
+    for chunk in iter_chunks(source):
+        data = pending + chunk
+        tokens = data.split()
+        pending = tokens.pop() if tokens and not data[-1].isspace() else ''
+        if tokens:
+            yield tokens
+    if pending:
+        yield [pending]
+
+
+def iter_lines(source):
+    """Lines without the line break (\\r\\n or \\n)."""
+    pending = ''
+    for chunk in iter_chunks(source):
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    yield pending.rstrip('\r')
+
+
+def iter_trimmed(source):
+    """
+    The text with leading and trailing whitespace removed (like str.strip()).
+    A whitespace run is held back until we know it isn't the end of the output.
+    """
+    started = False
+    held = ''
+    for chunk in iter_chunks(source):
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        text = chunk.rstrip()
+        if text:
+            yield held + text
+            held = chunk[len(text):]
+        else:
+            held += chunk
+
+
+def streams_equal(left, right, equal=operator.eq):
+    """
+    Compares two streams of blocks (str chunks or token lists) however each side
+    happens to be split, stopping at the first block that differs.
+    """
+    a = b = None
+    while True:
+        if not a:
+            a = next(left, None)
+        if not b:
+            b = next(right, None)
+        if a is None or b is None:
+            # Equal only if both ran out together
+            return a is None and b is None
+        size = min(len(a), len(b))
+        if not equal(a[:size], b[:size]):
+            return False
+        a, b = a[size:], b[size:]
+
+
+def numbers_close(got, want, float_tolerance):
+    """
+    Token lists are equal, allowing numbers to differ by float_tolerance (absolute or relative).
+    """
+    for x, y in zip(got, want):
+        if x == y:
+            continue
+        if not (NUMBER.fullmatch(x) and NUMBER.fullmatch(y)):
+            return False
+        if not math.isclose(float(x), float(y), rel_tol=float_tolerance, abs_tol=float_tolerance):
+            return False
+    return True
+
+
+def line_multiset_digest(source):
+    """
+    (line count, sum of line hashes) of the non-blank lines. Addition doesn't care
+    about order, so two outputs with the same lines in any order get the same digest
+    without holding either in memory. str hashes are keyed per process (SipHash),
+    so a submission can't craft lines whose hashes cancel out.
+    """
+    count = 0
+    total = 0
+    for line in iter_lines(source):
+        line = line.rstrip()
+        if line:
+            total += hash(line)
+            count += 1
+    return count, total % HASH_MODULUS
+
+
+def compare(output, expected, mode=DEFAULT_MODE, float_tolerance=DEFAULT_FLOAT_TOLERANCE):
+    """
+    True if `output` is an accepted answer for `expected` under `mode`.
+    """
+    if mode == EXACT:
+        return streams_equal(iter_trimmed(output), iter_trimmed(expected))
+    if mode == UNORDERED:
+        return line_multiset_digest(output) == line_multiset_digest(expected)
+
+    output, expected = iter_token_blocks(output), iter_token_blocks(expected)
+    if mode == FLOAT:
+        return streams_equal(output, expected, lambda got, want: got == want or numbers_close(got, want, float_tolerance))
+    return streams_equal(output, expected)
@@ -0,0 +1,203 @@
+"""
+Timed contests: incremental standings and the live rank feed.
+
+Entries are ranked by problems solved (more first), then penalty (less first);
+equal entries share a rank. Solving a problem adds the minutes since the start
+plus contest.penalty_minutes for every rejected submission before it.
+
+A judged submission updates its ContestEntry in place. When that changes the
+standings (an accepted submission, or a new participant) a ContestEvent is
+stored:
+    {'user_id', 'username', 'solved', 'penalty', 'rank',
+     'previous': {'solved', 'penalty', 'rank'} | None, 'problem', 'minutes'}
+Ranks are counted on the (contest, solved, penalty) index; nothing is recomputed.
+A client holding the standings applies an event by bumping the rank of every
+row the user has just overtaken (behind the new score, not behind the old one)
+and moving the user's row, so the page never reloads the table.
+
+Events of one contest are written one at a time (the contest row is locked),
+so their ids are in commit order and each rank in them is exact.
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from core.streaming import format_event
+from .models import Contest, ContestEntry, ContestEvent
+
+
+def last_event_key(contest_id):
+    return f'contest:{contest_id}:last-event'
+
+
+def rank_of(contest_id, solved, penalty):
+    """
+    1 + number of entries strictly ahead of (solved, penalty).
+    """
+    ahead = ContestEntry.objects.filter(contest_id=contest_id).filter(
+        Q(solved__gt=solved) | Q(solved=solved, penalty__lt=penalty)
+    ).count()
+    return ahead + 1
+
+
+def standings(contest):
+    """
+    Entries in rank order, each with .rank set. One query.
+    """
+    entries = list(
+        ContestEntry.objects.filter(contest=contest).select_related('user').order_by('-solved', 'penalty', 'joined_at')
+    )
+    previous = None
+    for position, entry in enumerate(entries, start=1):
+        if previous is not None and (entry.solved, entry.penalty) == (previous.solved, previous.penalty):
+            entry.rank = previous.rank
+        else:
+            entry.rank = position
+        previous = entry
+    return entries
+
+
+def lock_contest(contest_id):
+    # Held until the end of the transaction
+    Contest.objects.select_for_update().get(pk=contest_id)
+
+
+def publish(contest_id, data):
+    """
+    Stores an event. Call inside a transaction holding lock_contest().
+    """
+    event = ContestEvent.objects.create(contest_id=contest_id, data=data)
+    transaction.on_commit(lambda: cache.set(last_event_key(contest_id), event.pk, settings.CONTEST_STREAM_POLL_SECONDS))
+    return event
+
+
+def join(contest, user):
+    """
+    Returns the user's entry, creating it (and announcing it) on first use.
+    """
+    entry = ContestEntry.objects.filter(contest=contest, user=user).first()
+    if entry:
+        return entry
+
+    with transaction.atomic():
+        lock_contest(contest.pk)
+        entry, created = ContestEntry.objects.get_or_create(contest=contest, user=user)
+        if not created:
+            return entry
+        publish(contest.pk, {
+            'user_id': user.pk,
+            'username': user.username,
+            'solved': 0,
+            'penalty': 0,
+            'rank': rank_of(contest.pk, 0, 0),
+            'previous': None,
+            'problem': None,
+            'minutes': None,
+        })
+    return entry
+
+
+def record_result(problem, user, accepted, submitted_at):
+    """
+    Applies one judged submission to the standings. Submissions after the end, or on
+    a problem the user already solved, don't count.
+    """
+    contest = problem.contest
+    if not (contest.starts_at <= submitted_at < contest.ends_at):
+        return None
+    entry = join(contest, user)
+
+    with transaction.atomic():
+        if accepted:
+            lock_contest(contest.pk)
+        entry = ContestEntry.objects.select_for_update().get(pk=entry.pk)
+        state = entry.problems.get(problem.label, {'attempts': 0, 'solved_at': None})
+        if state['solved_at'] is not None:
+            return entry
+
+        if not accepted:
+            state['attempts'] += 1
+            entry.problems[problem.label] = state
+            entry.save(update_fields=['problems'])
+            return entry
+
+        previous = {
+            'solved': entry.solved,
+            'penalty': entry.penalty,
+            'rank': rank_of(contest.pk, entry.solved, entry.penalty),
+        }
+        minutes = int((submitted_at - contest.starts_at).total_seconds() // 60)
+        state['solved_at'] = minutes
+        entry.problems[problem.label] = state
+        entry.solved += 1
+        entry.penalty += minutes + state['attempts'] * contest.penalty_minutes
+        entry.save(update_fields=['problems', 'solved', 'penalty'])
+
+        publish(contest.pk, {
+            'user_id': user.pk,
+            'username': user.username,
+            'solved': entry.solved,
+            'penalty': entry.penalty,
+            'rank': rank_of(contest.pk, entry.solved, entry.penalty),
+            'previous': previous,
+            'problem': problem.label,
+            'minutes': minutes,
+        })
+    return entry
+
+
+def get_last_event_id(contest_id):
+    """
+    Id of the contest's latest event. Cached for one poll interval, so however many
+    clients are watching, a process looks it up at most once per interval.
+    """
+    last_id = cache.get(last_event_key(contest_id))
+    if last_id is None:
+        last_id = ContestEvent.objects.filter(contest_id=contest_id).order_by('-pk').values_list('pk', flat=True).first() or 0
+        cache.set(last_event_key(contest_id), last_id, settings.CONTEST_STREAM_POLL_SECONDS)
+    return last_id
+
+
+def events_after(contest_id, last_id):
+    return list(ContestEvent.objects.filter(contest_id=contest_id, pk__gt=last_id).order_by('pk').values_list('pk', 'data'))
+
+
+def standing_events(contest, last_id):
+    """
+    Generator of SSE strings for the sync view: the standings events after last_id,
+    then the response ends. Waiting for new ones would hold a worker per open page;
+    instead EventSource reconnects after `retry` and sends the last id it got back
+    as Last-Event-ID, so the browser polls.
+    """
+    yield f"retry: {int(settings.CONTEST_STREAM_POLL_SECONDS * 1000)}\n\n"
+    if get_last_event_id(contest.pk) > last_id:
+        for event_id, data in events_after(contest.pk, last_id):
+            yield format_event('standing', data, event_id)
+
+
+async def astanding_events(contest, last_id):
+    """
+    Generator of SSE strings for the async view: the standings events after last_id,
+    then new ones as they happen (waiting doesn't hold a thread). Ends after
+    settings.CONTEST_STREAM_SECONDS; EventSource reconnects with Last-Event-ID and
+    picks up where it stopped.
+    """
+    poll = settings.CONTEST_STREAM_POLL_SECONDS
+    deadline = time.monotonic() + settings.CONTEST_STREAM_SECONDS
+    yield f"retry: {int(poll * 1000)}\n\n"
+    while time.monotonic() < deadline:
+        latest = await cache.aget(last_event_key(contest.pk))
+        if latest is None:
+            latest = await sync_to_async(get_last_event_id)(contest.pk)
+        if latest > last_id:
+            for event_id, data in await sync_to_async(events_after)(contest.pk, last_id):
+                yield format_event('standing', data, event_id)
+                last_id = event_id
+        else:
+            yield ": ping\n\n"
+        await asyncio.sleep(poll)
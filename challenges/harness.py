@@ -0,0 +1,178 @@
+"""
+Batched judging harness.
+
+Instead of one execution per TestCase, the submission is wrapped in a small
+harness written in the same language. The harness saves the user program to a
+file and runs it once per input inside the same sandbox, printing every case's
+output after a random marker line:
+
+    \n<marker> <case index> <exit status> <run ms> <peak KB or ->\n<program output>...\n<marker> END\n
+
+So an N-case question costs one executor call instead of N. Only interpreted
+languages are supported; compiled ones still go through the per-case path.
+"""
+import json
+import re
+import secrets
+
+from django.conf import settings
+
+from core.executor import aexecute, execute, normalize_language
+
+PYTHON_HARNESS = '''import os, resource, subprocess, sys, tempfile, time
+CASES = {cases}
+LIMITS = {limits}
+SOURCE = {code}
+MARK = {marker}
+STOP_ON_ERROR = {stop_on_error}
+BUDGET = {budget}
+path = os.path.join(tempfile.mkdtemp(), 'main.py')
+with open(path, 'w', encoding='utf-8') as f:
+    f.write(SOURCE)
+PEAK_KB = [None]
+def wait4(pid, options):
+    # subprocess reaps children with os.waitpid; wait4 also gives their peak memory
+    pid, status, usage = os.wait4(pid, options)
+    if pid:
+        PEAK_KB[0] = usage.ru_maxrss
+    return pid, status
+os.waitpid = wait4
+def limit_memory(memory):
+    hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+    if hard != resource.RLIM_INFINITY:
+        memory = min(memory, hard)
+    return lambda: resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+started = time.monotonic()
+for index, stdin in enumerate(CASES):
+    timeout, memory_mb, max_output = LIMITS[index]
+    # Only start a case whose whole limit fits in the budget: a kill by the budget
+    # would read as a TLE; unprinted cases are re-run per case instead
+    if BUDGET - (time.monotonic() - started) < timeout:
+        break
+    PEAK_KB[0] = None
+    case_started = time.monotonic()
+    try:
+        proc = subprocess.run([sys.executable, path], input=stdin.encode(), stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, timeout=timeout,
+                              preexec_fn=limit_memory(memory_mb * 1024 * 1024))
+        output, status = proc.stdout, str(proc.returncode)
+    except subprocess.TimeoutExpired as e:
+        output, status = e.output or b'', 'TLE'
+    elapsed_ms = int((time.monotonic() - case_started) * 1000)
+    if len(output) > max_output:
+        output, status = output[:max_output], 'OLE'
+    peak = '-' if PEAK_KB[0] is None else str(PEAK_KB[0])
+    sys.stdout.buffer.write(('\\n%s %d %s %d %s\\n' % (MARK, index, status, elapsed_ms, peak)).encode())
+    sys.stdout.buffer.write(output)
+    sys.stdout.buffer.flush()
+    if STOP_ON_ERROR and status != '0':
+        break
+sys.stdout.buffer.write(('\\n%s END\\n' % MARK).encode())
+'''
+
+JAVASCRIPT_HARNESS = '''const fs = require('fs'), os = require('os'), path = require('path'), cp = require('child_process');
+const CASES = {cases};
+const LIMITS = {limits};
+const SOURCE = {code};
+const MARK = {marker};
+const STOP_ON_ERROR = {stop_on_error};
+const BUDGET = {budget} * 1000;
+const file = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'run-')), 'main.js');
+fs.writeFileSync(file, SOURCE);
+const started = Date.now();
+for (let index = 0; index < CASES.length; index++) {{
+    const [timeout, memoryMb, maxOutput] = LIMITS[index];
+    if (BUDGET - (Date.now() - started) < timeout * 1000) break;
+    const caseStarted = Date.now();
+    const proc = cp.spawnSync(process.execPath, ['--max-old-space-size=' + memoryMb, file], {{
+        input: CASES[index], timeout: timeout * 1000, maxBuffer: maxOutput
+    }});
+    let status = proc.status === null ? 'RE' : String(proc.status);
+    if (proc.error && proc.error.code === 'ETIMEDOUT') status = 'TLE';
+    if (proc.error && proc.error.code === 'ENOBUFS') status = 'OLE';
+    // spawnSync doesn't report the child's memory
+    fs.writeSync(1, '\\n' + MARK + ' ' + index + ' ' + status + ' ' + (Date.now() - caseStarted) + ' -\\n');
+    if (proc.stdout) fs.writeSync(1, proc.stdout);
+    if (proc.stderr) fs.writeSync(1, proc.stderr);
+    if (STOP_ON_ERROR && status !== '0') break;
+}}
+fs.writeSync(1, '\\n' + MARK + ' END\\n');
+'''
+
+HARNESSES = {
+    'python': PYTHON_HARNESS,
+    'javascript': JAVASCRIPT_HARNESS,
+}
+
+
+def supports_batch(language):
+    return normalize_language(language) in HARNESSES
+
+
+def build_harness(language, code, inputs, limits, marker, stop_on_error=False):
+    """
+    Source code of the harness program for `language`.
+    `limits` holds each case's executor limits (TestCase.get_limits()).
+    json.dumps output is a valid string/list literal in both Python and JavaScript.
+    """
+    return HARNESSES[normalize_language(language)].format(
+        cases=json.dumps(list(inputs)),
+        limits=json.dumps([
+            [case['wall_seconds'], case['memory_mb'], case['output_bytes']] for case in limits
+        ]),
+        code=json.dumps(code),
+        marker=json.dumps(marker),
+        stop_on_error=int(stop_on_error),  # 1 / 0 reads the same in both languages
+        budget=getattr(settings, 'JUDGE_BATCH_BUDGET_SECONDS', 2.5),
+    )
+
+
+def parse_batch_output(output, marker):
+    """
+    Splits harness output into {case index: (program output, exit status, run ms, peak KB)};
+    peak KB is None when the harness couldn't measure it.
+    If the harness was cut off (time/output limit), the last case may be incomplete,
+    so it is dropped and only cases that were fully printed are returned.
+    """
+    header = re.compile(r'\n' + re.escape(marker) + r' (\d+|END)(?: (\S+) (\d+) (\d+|-))?\n')
+    parts = header.split(output)
+
+    cases = {}
+    finished = False
+    # parts = [preamble, index, status, ms, kb, text, index, status, ms, kb, text, ...]
+    for i in range(1, len(parts) - 4, 5):
+        index, status, run_ms, peak_kb, text = parts[i:i + 5]
+        if index == 'END':
+            finished = True
+            break
+        cases[int(index)] = (text, status, int(run_ms), None if peak_kb == '-' else int(peak_kb))
+
+    if not finished and cases:
+        cases.pop(max(cases))
+    return cases
+
+
+def run_batch(language, code, inputs, limits, stop_on_error=False):
+    """
+    Runs all inputs in one execution. Returns {case index: (output, status, ms, KB)} for the
+    cases that completed; callers re-run any missing index on the per-case path.
+    The harness stops before a case whose full time limit no longer fits in
+    settings.JUDGE_BATCH_BUDGET_SECONDS, so every TLE it reports is the case's own.
+    With stop_on_error the harness stops after the first case that exits non-zero,
+    times out or hits a limit (wrong answers are only found afterwards, by the caller).
+    """
+    marker = f"@@CODEAPT-{secrets.token_hex(16)}@@"
+    harness = build_harness(language, code, inputs, limits, marker, stop_on_error)
+    # The random marker makes every harness unique, so skip the result cache
+    result = execute(language, harness, '', use_cache=False)
+    return parse_batch_output(result['output'], marker)
+
+
+async def arun_batch(language, code, inputs, limits, stop_on_error=False):
+    """
+    Async run_batch() for the async submit_code view.
+    """
+    marker = f"@@CODEAPT-{secrets.token_hex(16)}@@"
+    harness = build_harness(language, code, inputs, limits, marker, stop_on_error)
+    result = await aexecute(language, harness, '', use_cache=False)
+    return parse_batch_output(result['output'], marker)
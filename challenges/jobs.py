@@ -0,0 +1,113 @@
+"""
+DB-backed queue for asynchronous code judging.
+
+submit_code enqueues a JudgeJob and returns its job_id straight away; the
+run_judge_workers management command drains the queue and the page polls
+judge_status until the result partial is ready.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.gateway import ExecutorUnavailable
+from .contests import record_result
+from .judge import count_passed, is_accepted, judge_submission
+from .models import JudgeJob
+from .submissions import record_submission
+
+
+def enqueue_job(user, question, language, code, contest_problem=None):
+    return JudgeJob.objects.create(
+        user=user, question=question, contest_problem=contest_problem, language=language or '', code=code or ''
+    )
+
+
+def claim_next_job():
+    """
+    Marks the oldest QUEUED job that is due as RUNNING and returns it (None if there is
+    none). The status-guarded UPDATE means two workers can never claim the same job.
+    """
+    while True:
+        due = Q(not_before__isnull=True) | Q(not_before__lte=timezone.now())
+        job_pk = JudgeJob.objects.filter(due, status='QUEUED').order_by('created_at').values_list('pk', flat=True).first()
+        if job_pk is None:
+            return None
+
+        claimed = JudgeJob.objects.filter(pk=job_pk, status='QUEUED').update(
+            status='RUNNING',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return JudgeJob.objects.select_related('user', 'question', 'contest_problem__contest').get(pk=job_pk)
+        # Another worker got it first; try the next one
+
+
+def requeue_stale_jobs():
+    """
+    Puts RUNNING jobs whose worker died back in the queue (or fails them after too many tries).
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JUDGE_JOB_STALE_SECONDS', 300))
+    max_attempts = getattr(settings, 'JUDGE_JOB_MAX_ATTEMPTS', 3)
+    stale = JudgeJob.objects.filter(status='RUNNING', is_scored=False, started_at__lt=cutoff)
+
+    stale.filter(attempts__gte=max_attempts).update(
+        status='FAILED', error='Worker stopped while judging.', finished_at=timezone.now()
+    )
+    return stale.filter(attempts__lt=max_attempts).update(status='QUEUED')
+
+
+def retry_delay(job, retry_after=None):
+    """
+    Seconds to wait before judging the job again after an executor outage: doubles with
+    every outage of this job (capped), and is never shorter than the executor's retry_after.
+    """
+    base = getattr(settings, 'JUDGE_JOB_RETRY_SECONDS', 2)
+    cap = getattr(settings, 'JUDGE_JOB_MAX_RETRY_SECONDS', 120)
+    return max(min(cap, base * 2 ** job.outages), retry_after or 0)
+
+
+def process_job(job):
+    """
+    Judges one claimed job. Scoring happens in the same transaction that flips
+    is_scored, so update_user_progress (or the contest standings update) runs
+    exactly once per job even if a job is retried or two workers race on a stale requeue.
+    """
+    from .views import update_user_progress
+
+    try:
+        results = judge_submission(
+            job.language, job.code, job.question.test_cases.all(), job.question.stop_on_first_failure
+        )
+    except ExecutorUnavailable as e:
+        # Executor is down: nothing was judged, so give the attempt back and put the
+        # job back in the queue once the executor is likely to be up again
+        JudgeJob.objects.filter(pk=job.pk, status='RUNNING', is_scored=False).update(
+            status='QUEUED',
+            attempts=F('attempts') - 1,
+            outages=F('outages') + 1,
+            not_before=timezone.now() + timedelta(seconds=retry_delay(job, e.retry_after)),
+        )
+        return
+
+    score = count_passed(results)
+    with transaction.atomic():
+        scored = JudgeJob.objects.filter(pk=job.pk, is_scored=False).update(
+            is_scored=True,
+            status='DONE',
+            score=score,
+            total=len(results),
+            results=results,
+            compile_time_ms=results.compile_time_ms,
+            finished_at=timezone.now(),
+        )
+        if scored:
+            record_submission(job.user, job.question, job.language, job.code, results)
+            if job.contest_problem_id:
+                # Penalty minutes count from when the job was submitted
+                record_result(job.contest_problem, job.user, is_accepted(results), job.created_at)
+            else:
+                update_user_progress(job.user, job.question, score)
@@ -0,0 +1,341 @@
+"""
+Daily Challenge judge: runs one submission against all test cases of a question.
+
+Every case gets a verdict:
+    AC  accepted            WA  wrong answer         TLE  time limit exceeded
+    MLE memory limit        RE  runtime error        CE   compilation error
+    OLE output limit        SKIP not run (the question stops at the first failure)
+
+Verdicts of cases that ran are CaseVerdicts: plain verdict strings that also carry
+the case's run time and peak memory.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from core.executor import aexecute, aprepare, execute, is_memory_error, prepare
+from core.gateway import ExecutorUnavailable
+from . import comparator
+from .harness import arun_batch, run_batch, supports_batch
+from .testdata import StoredData
+
+ACCEPTED = 'AC'
+WRONG_ANSWER = 'WA'
+TIME_LIMIT = 'TLE'
+MEMORY_LIMIT = 'MLE'
+RUNTIME_ERROR = 'RE'
+COMPILE_ERROR = 'CE'
+OUTPUT_LIMIT = 'OLE'
+SKIPPED = 'SKIP'
+
+VERDICT_LABELS = {
+    ACCEPTED: 'Passed',
+    WRONG_ANSWER: 'Wrong Answer',
+    TIME_LIMIT: 'Time Limit Exceeded',
+    MEMORY_LIMIT: 'Memory Limit Exceeded',
+    RUNTIME_ERROR: 'Runtime Error',
+    COMPILE_ERROR: 'Compilation Error',
+    OUTPUT_LIMIT: 'Output Limit Exceeded',
+    SKIPPED: 'Skipped',
+}
+
+
+class CaseVerdict(str):
+    """
+    A verdict ('AC', 'WA', ...) with the case's run_time_ms and memory_kb attached
+    (None when the executor didn't report them). Compares, and is stored in JSON,
+    like the plain verdict string.
+    """
+    def __new__(cls, verdict, run_time_ms=None, memory_kb=None):
+        case = super().__new__(cls, verdict)
+        case.run_time_ms = run_time_ms
+        case.memory_kb = memory_kb
+        return case
+
+
+class JudgeResults(list):
+    """
+    One entry per test case, plus the submission's compile_time_ms: None for interpreted
+    languages or when the backend doesn't report it, 0 when the build was already cached.
+    """
+    def __init__(self, entries=(), compile_time_ms=None):
+        super().__init__(entries)
+        self.compile_time_ms = compile_time_ms
+
+
+def run_test_case(language, code, input_data, expected_output, limits=None, check=None):
+    """
+    Executes one test case and returns its verdict.
+    ExecutorUnavailable is re-raised: an outage must not be scored as a wrong answer.
+    """
+    try:
+        result = execute(language, code, input_data, limits=limits)
+        return CaseVerdict(result_verdict(result, expected_output, check), result.get('run_time_ms'), result.get('memory_kb'))
+    except ExecutorUnavailable:
+        raise
+    except Exception:
+        return RUNTIME_ERROR
+
+
+def outputs_match(api_out, expected_output, check=None):
+    """
+    `check` is (compare mode, float tolerance) of the test case; None = comparator defaults.
+    An expected output stored in a file (testdata.StoredData) is read as a stream.
+    """
+    if isinstance(expected_output, StoredData):
+        with expected_output.open('rt') as expected:
+            return comparator.compare(api_out, expected, *(check or ()))
+    return comparator.compare(api_out, expected_output, *(check or ()))
+
+
+def result_verdict(result, expected_output, check=None):
+    """
+    Verdict for an execute() result.
+    """
+    if result['status'] == 'OK':
+        return ACCEPTED if outputs_match(result['output'], expected_output, check) else WRONG_ANSWER
+    # Executor statuses share the verdict names (CE / TLE / MLE / OLE / RE)
+    return result['status'] if result['status'] in VERDICT_LABELS else RUNTIME_ERROR
+
+
+def batch_verdict(output, status, expected_output, check=None):
+    """
+    Verdict for one case of a batched run (status is what the harness printed).
+    """
+    if status == '0':
+        return ACCEPTED if outputs_match(output, expected_output, check) else WRONG_ANSWER
+    if status in (TIME_LIMIT, OUTPUT_LIMIT):
+        return status
+    return MEMORY_LIMIT if is_memory_error(output) else RUNTIME_ERROR
+
+
+def skip_after_failure(results):
+    """
+    Marks every case after the first failed one as SKIP (None = not judged yet).
+    """
+    for index, verdict in enumerate(results):
+        if verdict is not None and verdict != ACCEPTED:
+            return results[:index + 1] + [SKIPPED] * (len(results) - index - 1)
+    return results
+
+
+def count_passed(results):
+    return sum(1 for verdict in results if verdict == ACCEPTED)
+
+
+def is_accepted(results):
+    # A question without test cases can't be solved
+    return bool(results) and count_passed(results) == len(results)
+
+
+def case_stats(results):
+    """
+    [(run_time_ms, memory_kb), ...] for the verdicts; None where unknown or not run.
+    """
+    return [(getattr(verdict, 'run_time_ms', None), getattr(verdict, 'memory_kb', None)) for verdict in results]
+
+
+def describe_results(results, compile_time_ms=None):
+    """
+    Rows for code_result_partial.html, as JudgeResults carrying the compile time
+    (taken from `results` unless given). Jobs judged before verdicts existed stored booleans.
+    """
+    rows = JudgeResults(compile_time_ms=getattr(results, 'compile_time_ms', None) if compile_time_ms is None else compile_time_ms)
+    for verdict in results:
+        if isinstance(verdict, bool):
+            verdict = ACCEPTED if verdict else WRONG_ANSWER
+        rows.append({
+            'verdict': verdict,
+            'label': VERDICT_LABELS.get(verdict, verdict),
+            'run_time_ms': getattr(verdict, 'run_time_ms', None),
+        })
+    return rows
+
+
+def run_cases_concurrently(language, code, cases, stop_on_failure=False):
+    """
+    One execution per case on a thread pool capped by settings.JUDGE_MAX_CONCURRENCY.
+    Returns verdicts in the same order as cases. With stop_on_failure, cases after a
+    failed one are cancelled if they haven't started and reported as SKIP.
+    """
+    workers = min(getattr(settings, 'JUDGE_MAX_CONCURRENCY', 4), len(cases))
+    if workers <= 1:
+        results = []
+        for case in cases:
+            results.append(run_test_case(language, code, *case))
+            if stop_on_failure and results[-1] != ACCEPTED:
+                break
+        return results + [SKIPPED] * (len(cases) - len(results))
+
+    results = [None] * len(cases)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='judge') as pool:
+        futures = {pool.submit(run_test_case, language, code, *case): index for index, case in enumerate(cases)}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            index = futures[future]
+            results[index] = future.result()
+            if stop_on_failure and results[index] != ACCEPTED:
+                for other, other_index in futures.items():
+                    if other_index > index:
+                        other.cancel()
+
+    results = [SKIPPED if verdict is None else verdict for verdict in results]
+    return skip_after_failure(results) if stop_on_failure else results
+
+
+def run_cases_batched(language, code, cases, stop_on_failure=False):
+    """
+    All cases in one execution through the language harness. Cases the harness
+    didn't finish (budget or output cap hit) fall back to the concurrent path.
+    """
+    try:
+        batch = run_batch(
+            language, code,
+            [input_data for input_data, _, _, _ in cases],
+            [limits for _, _, limits, _ in cases],
+            stop_on_error=stop_on_failure,
+        )
+    except ExecutorUnavailable:
+        raise
+    except Exception:
+        batch = {}
+
+    results = [None] * len(cases)
+    for index, (output, status, run_time_ms, memory_kb) in batch.items():
+        results[index] = CaseVerdict(batch_verdict(output, status, cases[index][1], cases[index][3]), run_time_ms, memory_kb)
+    if stop_on_failure:
+        results = skip_after_failure(results)
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        reruns = run_cases_concurrently(language, code, [cases[index] for index in missing], stop_on_failure)
+        for index, result in zip(missing, reruns):
+            results[index] = result
+    return skip_after_failure(results) if stop_on_failure else results
+
+
+def compile_failed(cases, stop_on_failure=False):
+    """
+    Verdicts when the submission doesn't compile: CE for every case (or the first only).
+    """
+    results = [COMPILE_ERROR] * len(cases)
+    return skip_after_failure(results) if stop_on_failure else results
+
+
+def load_cases(test_cases):
+    # Read the rows here: worker threads must not touch the ORM.
+    # Data stored in files stays there (StoredData) until a case runs.
+    return [
+        (test.get_input(), test.get_expected_output(), test.get_limits(), (test.compare_mode, test.float_tolerance))
+        for test in test_cases
+    ]
+
+
+def can_batch(language, cases):
+    # The batch harness takes every input inline; file-backed inputs are streamed per case
+    return (
+        len(cases) > 1 and getattr(settings, 'JUDGE_BATCH_MODE', True) and supports_batch(language)
+        and all(isinstance(input_data, str) for input_data, _, _, _ in cases)
+    )
+
+
+def judge_submission(language, code, test_cases, stop_on_failure=False):
+    """
+    Runs a submission against the test cases and returns JudgeResults: one verdict per
+    case, in the same order as test_cases, and the compile time. Interpreted languages
+    are judged in a single batched execution when settings.JUDGE_BATCH_MODE is on.
+    Compiled languages are compiled once up front; the per-case runs then reuse the
+    build from the compile cache.
+    """
+    cases = load_cases(test_cases)
+    if not cases:
+        return JudgeResults()
+
+    compiled = prepare(language, code)
+    if compiled['status'] == 'CE':
+        results = compile_failed(cases, stop_on_failure)
+    elif can_batch(language, cases):
+        results = run_cases_batched(language, code, cases, stop_on_failure)
+    else:
+        results = run_cases_concurrently(language, code, cases, stop_on_failure)
+    return JudgeResults(results, compiled.get('compile_time_ms'))
+
+
+# --- ASYNC (used by challenges.async_views) ---
+async def arun_test_case(language, code, input_data, expected_output, limits=None, check=None):
+    try:
+        result = await aexecute(language, code, input_data, limits=limits)
+        return CaseVerdict(result_verdict(result, expected_output, check), result.get('run_time_ms'), result.get('memory_kb'))
+    except ExecutorUnavailable:
+        raise
+    except Exception:
+        return RUNTIME_ERROR
+
+
+async def arun_cases_concurrently(language, code, cases, stop_on_failure=False):
+    # Same per-submission cap as the thread pool, as a semaphore
+    semaphore = asyncio.Semaphore(max(1, getattr(settings, 'JUDGE_MAX_CONCURRENCY', 4)))
+    results = [None] * len(cases)
+
+    async def run(index, case):
+        async with semaphore:
+            results[index] = await arun_test_case(language, code, *case)
+        if stop_on_failure and results[index] != ACCEPTED:
+            for other_index, task in enumerate(tasks):
+                if other_index > index:
+                    task.cancel()
+
+    tasks = [asyncio.ensure_future(run(index, case)) for index, case in enumerate(cases)]
+    for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            raise outcome
+
+    results = [SKIPPED if verdict is None else verdict for verdict in results]
+    return skip_after_failure(results) if stop_on_failure else results
+
+
+async def arun_cases_batched(language, code, cases, stop_on_failure=False):
+    try:
+        batch = await arun_batch(
+            language, code,
+            [input_data for input_data, _, _, _ in cases],
+            [limits for _, _, limits, _ in cases],
+            stop_on_error=stop_on_failure,
+        )
+    except ExecutorUnavailable:
+        raise
+    except Exception:
+        batch = {}
+
+    results = [None] * len(cases)
+    for index, (output, status, run_time_ms, memory_kb) in batch.items():
+        results[index] = CaseVerdict(batch_verdict(output, status, cases[index][1], cases[index][3]), run_time_ms, memory_kb)
+    if stop_on_failure:
+        results = skip_after_failure(results)
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        reruns = await arun_cases_concurrently(language, code, [cases[index] for index in missing], stop_on_failure)
+        for index, result in zip(missing, reruns):
+            results[index] = result
+    return skip_after_failure(results) if stop_on_failure else results
+
+
+async def ajudge_submission(language, code, test_cases, stop_on_failure=False):
+    """
+    Async judge_submission(). test_cases must already be loaded (no lazy queryset).
+    """
+    cases = load_cases(test_cases)
+    if not cases:
+        return JudgeResults()
+
+    compiled = await aprepare(language, code)
+    if compiled['status'] == 'CE':
+        results = compile_failed(cases, stop_on_failure)
+    elif can_batch(language, cases):
+        results = await arun_cases_batched(language, code, cases, stop_on_failure)
+    else:
+        results = await arun_cases_concurrently(language, code, cases, stop_on_failure)
+    return JudgeResults(results, compiled.get('compile_time_ms'))
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from challenges.jobs import claim_next_job, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Runs a pool of workers that judge queued code submissions (settings.JUDGE_ASYNC)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Jobs judged at the same time")
+        parser.add_argument('--poll-interval', type=float, default=0.5, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.once = options['once']
+        self.poll_interval = options['poll_interval']
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        threads = [
+            threading.Thread(target=self.work, name=f'judge-worker-{i}', daemon=True)
+            for i in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(threads)} judge worker(s)."))
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the current jobs...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self):
+        last_stale_check = time.monotonic()
+        while not self.stop.is_set():
+            close_old_connections()
+
+            if time.monotonic() - last_stale_check > 60:
+                requeue_stale_jobs()
+                last_stale_check = time.monotonic()
+
+            job = claim_next_job()
+            if job is None:
+                if self.once:
+                    break
+                self.stop.wait(self.poll_interval)
+                continue
+
+            try:
+                process_job(job)
+                self.stdout.write(f"Judged job {job.job_id}")
+            except Exception as e:
+                # Leave it RUNNING; requeue_stale_jobs() retries it later
+                self.stderr.write(f"Job {job.job_id} crashed: {e}")
+
+        close_old_connections()
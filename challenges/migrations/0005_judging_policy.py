@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0004_judgejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyquestion',
+            name='memory_limit_mb',
+            field=models.PositiveIntegerField(default=256, help_text='Memory limit per test case'),
+        ),
+        migrations.AddField(
+            model_name='dailyquestion',
+            name='output_limit_kb',
+            field=models.PositiveIntegerField(default=64, help_text='Max output per test case'),
+        ),
+        migrations.AddField(
+            model_name='dailyquestion',
+            name='stop_on_first_failure',
+            field=models.BooleanField(default=False, help_text='Skip the remaining test cases after the first one that fails'),
+        ),
+        migrations.AddField(
+            model_name='dailyquestion',
+            name='time_limit_ms',
+            field=models.PositiveIntegerField(default=2000, help_text='Time limit per test case'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='memory_limit_mb',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_limit_kb',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='time_limit_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
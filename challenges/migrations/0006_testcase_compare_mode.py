@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0005_judging_policy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='compare_mode',
+            field=models.CharField(choices=[('EXACT', 'Exact (ignores leading/trailing whitespace)'), ('WHITESPACE', 'Ignore whitespace differences'), ('FLOAT', 'Numbers within tolerance'), ('UNORDERED', 'Lines in any order')], default='WHITESPACE', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='float_tolerance',
+            field=models.FloatField(default=1e-06, help_text="Used by the 'Numbers within tolerance' mode"),
+        ),
+    ]
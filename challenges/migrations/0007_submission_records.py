@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0006_testcase_compare_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubmissionRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=20)),
+                ('score', models.PositiveSmallIntegerField(default=0)),
+                ('total', models.PositiveSmallIntegerField(default=0)),
+                ('verdicts', models.BinaryField()),
+                ('run_times', models.BinaryField()),
+                ('memory', models.BinaryField()),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('code', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='records', to='challenges.submissioncode')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_records', to='challenges.dailyquestion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'submitted_at'], name='challenges__questio_3c0a1a_idx'), models.Index(fields=['user', 'question'], name='challenges__user_id_46d0a2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0007_submission_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.BinaryField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='challenges.dailyquestion')),
+                ('record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint', to='challenges.submissionrecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FingerprintBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='challenges.submissionfingerprint')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='challenges.dailyquestion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'bucket'], name='challenges__questio_4f56dd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:00
+
+import hashlib
+
+from django.db import migrations, models
+
+from challenges.testdata import StoredData
+
+
+def fill_stored_data(apps, schema_editor):
+    """
+    Checksums and sizes of the existing test cases. The data itself stays in the rows:
+    migrations may run where the storage isn't reachable (a build container), so large
+    data only moves out when the test case is next saved.
+    """
+    TestCase = apps.get_model('challenges', 'TestCase')
+    for test in TestCase.objects.iterator(chunk_size=100):
+        for field, prefix in (('input_data', 'input'), ('expected_output', 'expected')):
+            data = getattr(test, field).encode('utf-8')
+            setattr(test, f'{prefix}_sha256', hashlib.sha256(data).hexdigest())
+            setattr(test, f'{prefix}_size', len(data))
+        test.save()
+
+
+def inline_stored_data(apps, schema_editor):
+    # The old schema has nowhere to point at a file: read the data back into the row
+    TestCase = apps.get_model('challenges', 'TestCase')
+    for test in TestCase.objects.filter(models.Q(input_in_file=True) | models.Q(expected_in_file=True)).iterator(chunk_size=100):
+        if test.input_in_file:
+            test.input_data = StoredData(test.input_sha256, test.input_size).read_text()
+        if test.expected_in_file:
+            test.expected_output = StoredData(test.expected_sha256, test.expected_size).read_text()
+        test.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0008_submission_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_in_file',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='expected_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_in_file',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='expected_output',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='input_data',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(fill_stored_data, inline_stored_data),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0009_testcase_stored_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('slug', models.SlugField(unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('penalty_minutes', models.PositiveIntegerField(default=20, help_text='Added per rejected submission on a problem that is later solved')),
+            ],
+            options={
+                'ordering': ['-starts_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='dailyquestion',
+            name='release_date',
+            field=models.DateField(blank=True, help_text='The date this question goes live (empty for contest-only questions)', null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='ContestProblem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(help_text='A, B, C...', max_length=5)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='problems', to='challenges.contest')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='contest_problems', to='challenges.dailyquestion')),
+            ],
+            options={
+                'ordering': ['label'],
+                'unique_together': {('contest', 'label')},
+            },
+        ),
+        migrations.AddField(
+            model_name='judgejob',
+            name='contest_problem',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='judge_jobs', to='challenges.contestproblem'),
+        ),
+        migrations.CreateModel(
+            name='ContestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='challenges.contest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['contest', 'id'], name='challenges__contest_a712a7_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solved', models.PositiveIntegerField(default=0)),
+                ('penalty', models.PositiveIntegerField(default=0)),
+                ('problems', models.JSONField(blank=True, default=dict)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('contest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='challenges.contest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contest_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['contest', '-solved', 'penalty'], name='challenges__contest_2fadeb_idx')],
+                'unique_together': {('contest', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0010_contests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='judgejob',
+            name='compile_time_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
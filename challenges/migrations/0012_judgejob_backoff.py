@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0011_judgejob_compile_time_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='judgejob',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='judgejob',
+            name='outages',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -1,10 +1,16 @@
 from django.db import models
 
 # Create your models here.
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+import hashlib
+import math
+import uuid
+
+from .testdata import StoredData, store_text
 
 class DailyQuestion(models.Model):
     TYPE_CHOICES = (
@@ -15,7 +21,7 @@ class DailyQuestion(models.Model):
     question_type = models.CharField(max_length=4, choices=TYPE_CHOICES)
     title = models.CharField(max_length=255)
     description = models.TextField()
-    release_date = models.DateField(unique=True, help_text="The date this question goes live")
+    release_date = models.DateField(unique=True, null=True, blank=True, help_text="The date this question goes live (empty for contest-only questions)")
     
     # MCQ Fields (can be null if type is CODE)
     option_a = models.CharField(max_length=200, blank=True, null=True)
@@ -25,19 +31,98 @@ class DailyQuestion(models.Model):
     correct_option = models.CharField(max_length=10, choices=[('A','A'), ('B','B'), ('C','C'), ('D','D')], blank=True, null=True)
     starter_code = models.TextField(blank=True, null=True, help_text="Pre-filled code for the editor")
 
+    # Judging policy (Coding Challenges). Test cases can override the limits.
+    stop_on_first_failure = models.BooleanField(default=False, help_text="Skip the remaining test cases after the first one that fails")
+    time_limit_ms = models.PositiveIntegerField(default=2000, help_text="Time limit per test case")
+    memory_limit_mb = models.PositiveIntegerField(default=256, help_text="Memory limit per test case")
+    output_limit_kb = models.PositiveIntegerField(default=64, help_text="Max output per test case")
 
     def __str__(self):
         return f"{self.release_date} - {self.title}"
 
 class TestCase(models.Model):
     """Stores 5 test cases for Coding Questions"""
+    COMPARE_CHOICES = (
+        ('EXACT', 'Exact (ignores leading/trailing whitespace)'),
+        ('WHITESPACE', 'Ignore whitespace differences'),
+        ('FLOAT', 'Numbers within tolerance'),
+        ('UNORDERED', 'Lines in any order'),
+    )
+
     question = models.ForeignKey(DailyQuestion, on_delete=models.CASCADE, related_name='test_cases')
-    input_data = models.TextField()
-    expected_output = models.TextField()
+    # Data over settings.TESTDATA_INLINE_MAX_BYTES is moved to a file (challenges/testdata.py)
+    # and the field is left empty; *_sha256 / *_size always describe the data
+    input_data = models.TextField(blank=True)
+    expected_output = models.TextField(blank=True)
+    input_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    input_size = models.PositiveIntegerField(default=0, editable=False)
+    input_in_file = models.BooleanField(default=False, editable=False)
+    expected_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    expected_size = models.PositiveIntegerField(default=0, editable=False)
+    expected_in_file = models.BooleanField(default=False, editable=False)
+
+    # How the output is checked (challenges/comparator.py)
+    compare_mode = models.CharField(max_length=10, choices=COMPARE_CHOICES, default='WHITESPACE')
+    float_tolerance = models.FloatField(default=1e-6, help_text="Used by the 'Numbers within tolerance' mode")
+
+    # Leave empty to use the question's limits
+    time_limit_ms = models.PositiveIntegerField(null=True, blank=True)
+    memory_limit_mb = models.PositiveIntegerField(null=True, blank=True)
+    output_limit_kb = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"Test Case for {self.question.title}"
 
+    def save(self, *args, **kwargs):
+        self.store_data('input_data', 'input')
+        self.store_data('expected_output', 'expected')
+        super().save(*args, **kwargs)
+
+    def store_data(self, field, prefix):
+        """
+        Fills in the checksum and size of one field, moving large data to a file.
+        An empty field of data that is already in a file keeps the file.
+        """
+        text = getattr(self, field)
+        if not text and getattr(self, f'{prefix}_in_file'):
+            return
+        data = text.encode('utf-8')
+        if len(data) > settings.TESTDATA_INLINE_MAX_BYTES:
+            sha256, size = store_text(text)
+            setattr(self, field, '')
+            setattr(self, f'{prefix}_in_file', True)
+        else:
+            sha256, size = hashlib.sha256(data).hexdigest(), len(data)
+            setattr(self, f'{prefix}_in_file', False)
+        setattr(self, f'{prefix}_sha256', sha256)
+        setattr(self, f'{prefix}_size', size)
+
+    def get_input(self):
+        """
+        The input as a str, or a testdata.StoredData handle when it is in a file.
+        """
+        if self.input_in_file:
+            return StoredData(self.input_sha256, self.input_size)
+        return self.input_data
+
+    def get_expected_output(self):
+        if self.expected_in_file:
+            return StoredData(self.expected_sha256, self.expected_size)
+        return self.expected_output
+
+    def get_limits(self):
+        """
+        Execution limits for this case (core.executor limits keys).
+        """
+        question = self.question
+        time_limit_ms = self.time_limit_ms or question.time_limit_ms
+        return {
+            'cpu_seconds': max(1, math.ceil(time_limit_ms / 1000)),
+            'wall_seconds': time_limit_ms / 1000,
+            'memory_mb': self.memory_limit_mb or question.memory_limit_mb,
+            'output_bytes': (self.output_limit_kb or question.output_limit_kb) * 1024,
+        }
+
 class UserStreak(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='streak')
     current_streak = models.IntegerField(default=0)
@@ -55,4 +140,200 @@ class DailySubmission(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'question') # User can only submit once for points
\ No newline at end of file
+        unique_together = ('user', 'question') # User can only submit once for points
+
+class SubmissionCode(models.Model):
+    """
+    Submitted source code, stored once per distinct content (see challenges/submissions.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField() # zlib-compressed UTF-8
+    size = models.PositiveIntegerField() # Uncompressed bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+    @property
+    def text(self):
+        from .submissions import decompress_code
+        return decompress_code(self.data)
+
+class SubmissionRecord(models.Model):
+    """
+    Every judged code submission with its per-test-case results, kept out of the
+    DailySubmission table (one scored row per user and question). The per-case
+    fields are packed byte strings, read with cases().
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submission_records')
+    question = models.ForeignKey(DailyQuestion, on_delete=models.CASCADE, related_name='submission_records')
+    code = models.ForeignKey(SubmissionCode, on_delete=models.PROTECT, related_name='records')
+    language = models.CharField(max_length=20)
+    score = models.PositiveSmallIntegerField(default=0)
+    total = models.PositiveSmallIntegerField(default=0)
+
+    verdicts = models.BinaryField() # One byte per test case
+    run_times = models.BinaryField() # uint32 per test case, ms
+    memory = models.BinaryField() # uint32 per test case, KB
+
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'submitted_at']), # Analytics per question
+            models.Index(fields=['user', 'question']), # A user's attempts at a question
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.question.title} ({self.score}/{self.total})"
+
+    def cases(self):
+        """
+        [{'verdict', 'label', 'run_time_ms', 'memory_kb'}, ...], one per test case.
+        """
+        from .submissions import unpack_cases
+        return unpack_cases(self.verdicts, self.run_times, self.memory)
+
+class SubmissionFingerprint(models.Model):
+    """
+    MinHash signature of a submission's code, for near-duplicate search (challenges/similarity.py).
+    """
+    record = models.OneToOneField(SubmissionRecord, on_delete=models.CASCADE, related_name='fingerprint')
+    question = models.ForeignKey(DailyQuestion, on_delete=models.CASCADE, related_name='fingerprints')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    signature = models.BinaryField() # uint32 per MinHash function
+
+class FingerprintBucket(models.Model):
+    """
+    One LSH band of a fingerprint. Submissions sharing a bucket are candidate copies.
+    """
+    fingerprint = models.ForeignKey(SubmissionFingerprint, on_delete=models.CASCADE, related_name='buckets')
+    question = models.ForeignKey(DailyQuestion, on_delete=models.CASCADE, related_name='+')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'bucket']),
+        ]
+
+class JudgeJob(models.Model):
+    """
+    A code submission waiting to be judged by the run_judge_workers command
+    (used when settings.JUDGE_ASYNC is on).
+    """
+    STATUS_CHOICES = (
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    )
+
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='judge_jobs')
+    question = models.ForeignKey(DailyQuestion, on_delete=models.CASCADE, related_name='judge_jobs')
+    # Set for contest submissions: the result goes to the contest standings instead of the streak
+    contest_problem = models.ForeignKey('ContestProblem', on_delete=models.CASCADE, null=True, blank=True, related_name='judge_jobs')
+    language = models.CharField(max_length=20)
+    code = models.TextField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    score = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    results = models.JSONField(default=list, blank=True)
+    compile_time_ms = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    outages = models.PositiveSmallIntegerField(default=0) # Requeued because the executor was down
+    not_before = models.DateTimeField(null=True, blank=True) # Not claimed again until then
+    is_scored = models.BooleanField(default=False) # update_user_progress ran for this job
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']), # Workers pick the oldest QUEUED job
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.question.title} ({self.status})"
+
+
+class Contest(models.Model):
+    """
+    A timed contest over several coding questions, ranked ICPC style: most problems
+    solved, then least penalty (see challenges/contests.py).
+    """
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(unique=True)
+    description = models.TextField(blank=True)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    penalty_minutes = models.PositiveIntegerField(default=20, help_text="Added per rejected submission on a problem that is later solved")
+
+    class Meta:
+        ordering = ['-starts_at']
+
+    def __str__(self):
+        return self.title
+
+    def get_status(self, now=None):
+        now = now or timezone.now()
+        if now < self.starts_at:
+            return 'UPCOMING'
+        if now < self.ends_at:
+            return 'RUNNING'
+        return 'ENDED'
+
+class ContestProblem(models.Model):
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='problems')
+    question = models.ForeignKey(DailyQuestion, on_delete=models.PROTECT, related_name='contest_problems')
+    label = models.CharField(max_length=5, help_text="A, B, C...")
+
+    class Meta:
+        ordering = ['label']
+        unique_together = ('contest', 'label')
+
+    def __str__(self):
+        return f"{self.contest.title} - {self.label}. {self.question.title}"
+
+class ContestEntry(models.Model):
+    """
+    One participant's standing. Updated in place on every judged submission, so the
+    standings are never recomputed from the submissions.
+    """
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contest_entries')
+    solved = models.PositiveIntegerField(default=0)
+    penalty = models.PositiveIntegerField(default=0) # Minutes
+    # {label: {'attempts': rejected submissions, 'solved_at': minutes from the start or None}}
+    problems = models.JSONField(default=dict, blank=True)
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('contest', 'user')
+        indexes = [
+            # Rank = 1 + entries ahead, counted on this index
+            models.Index(fields=['contest', '-solved', 'penalty']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.contest.title}"
+
+class ContestEvent(models.Model):
+    """
+    Standings changes, in order. The live standings stream sends the events after the
+    last one a client has seen (the SSE Last-Event-ID).
+    """
+    contest = models.ForeignKey(Contest, on_delete=models.CASCADE, related_name='events')
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['contest', 'id']),
+        ]
+
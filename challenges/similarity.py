@@ -0,0 +1,229 @@
+"""
+Near-duplicate index of code submissions, to flag copied Daily Challenge solutions.
+
+1. The code is tokenized and normalized: comments dropped, every identifier becomes
+   V, every number N and every string S (keywords and operators are kept), so
+   renaming variables or editing comments doesn't hide a copy.
+2. Hashes of every K consecutive tokens are winnowed: the minimum of each window
+   of WINDOW hashes is kept as a fingerprint (robust to small insertions).
+3. A MinHash signature of NUM_HASHES values summarizes the fingerprint set; the
+   share of equal positions in two signatures estimates their Jaccard similarity.
+4. The signature is cut into BANDS bands, each stored as a FingerprintBucket row
+   (LSH). Submissions sharing a bucket are the only candidates a query looks at,
+   so finding the near-duplicates of one submission is an indexed lookup instead
+   of a comparison against every other submission of the question.
+"""
+import hashlib
+import keyword
+import random
+import re
+import struct
+from collections import defaultdict
+
+from django.conf import settings
+
+from core.executor import normalize_language
+from .models import FingerprintBucket, SubmissionFingerprint
+
+K = 5
+WINDOW = 4
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+PRIME = (1 << 61) - 1
+# Fixed seed: signatures stored in the database must stay comparable
+_random = random.Random(20240601)
+PERMUTATIONS = [(_random.randrange(1, PRIME), _random.randrange(0, PRIME)) for _ in range(NUM_HASHES)]
+
+KEYWORDS = {
+    'python': set(keyword.kwlist) | {'print', 'input', 'range', 'len', 'int', 'str', 'list', 'dict', 'set'},
+    'c': {
+        'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do', 'double', 'else', 'enum',
+        'extern', 'float', 'for', 'goto', 'if', 'int', 'long', 'register', 'return', 'short', 'signed',
+        'sizeof', 'static', 'struct', 'switch', 'typedef', 'union', 'unsigned', 'void', 'volatile', 'while',
+    },
+    'java': {
+        'abstract', 'boolean', 'break', 'byte', 'case', 'catch', 'char', 'class', 'continue', 'default',
+        'do', 'double', 'else', 'extends', 'final', 'finally', 'float', 'for', 'if', 'implements',
+        'import', 'instanceof', 'int', 'interface', 'long', 'new', 'null', 'private', 'protected',
+        'public', 'return', 'short', 'static', 'super', 'switch', 'this', 'throw', 'throws', 'try',
+        'void', 'while', 'true', 'false',
+    },
+    'javascript': {
+        'break', 'case', 'catch', 'class', 'const', 'continue', 'default', 'do', 'else', 'false',
+        'finally', 'for', 'function', 'if', 'in', 'let', 'new', 'null', 'of', 'return', 'switch',
+        'this', 'throw', 'true', 'try', 'typeof', 'undefined', 'var', 'while',
+    },
+}
+KEYWORDS['cpp'] = KEYWORDS['c'] | {
+    'bool', 'class', 'delete', 'false', 'namespace', 'new', 'private', 'public', 'template', 'this',
+    'true', 'using', 'vector', 'string', 'std', 'cin', 'cout', 'endl',
+}
+
+STRING = r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`'
+TOKEN_PATTERNS = {
+    # '//' is floor division in Python, not a comment
+    'python': re.compile(r'(?P<skip>#[^\n]*|\s+)|(?P<string>' + STRING + r')|(?P<number>\d[\w.]*)|(?P<name>[A-Za-z_]\w*)|(?P<op>\S)'),
+    # C-like: // and /* */ comments; preprocessor lines (#include ...) are boilerplate
+    'other': re.compile(r'(?P<skip>//[^\n]*|/\*[\s\S]*?\*/|#[^\n]*|\s+)|(?P<string>' + STRING + r')|(?P<number>\d[\w.]*)|(?P<name>[A-Za-z_$]\w*)|(?P<op>\S)'),
+}
+
+
+def normalize_tokens(code, language):
+    language = normalize_language(language)
+    keywords = KEYWORDS.get(language, set())
+    tokens = []
+    for match in TOKEN_PATTERNS['python' if language == 'python' else 'other'].finditer(code or ''):
+        kind = match.lastgroup
+        if kind == 'skip':
+            continue
+        if kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        elif kind == 'name':
+            tokens.append(match.group() if match.group() in keywords else 'V')
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def stable_hash(text):
+    # Not hash(): str hashes change between processes
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def winnow(tokens):
+    """
+    Fingerprints of a token list: the smallest K-gram hash of every window.
+    """
+    hashes = [stable_hash('\x1f'.join(tokens[i:i + K])) for i in range(len(tokens) - K + 1)]
+    if len(hashes) <= WINDOW:
+        return set(hashes)
+    return {min(hashes[i:i + WINDOW]) for i in range(len(hashes) - WINDOW + 1)}
+
+
+def minhash(fingerprints):
+    # No fingerprints (fewer than K tokens): nothing to summarize
+    if not fingerprints:
+        return None
+    return [
+        min((a * value + b) % PRIME for value in fingerprints) & 0xFFFFFFFF
+        for a, b in PERMUTATIONS
+    ]
+
+
+def pack_signature(signature):
+    return struct.pack(f'<{NUM_HASHES}I', *signature)
+
+
+def unpack_signature(data):
+    return struct.unpack(f'<{NUM_HASHES}I', bytes(data))
+
+
+def band_buckets(signature):
+    """
+    One bucket id per band (signed 64-bit, for a BigIntegerField). The band number
+    is part of the hash, so equal rows in different bands don't collide.
+    """
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        value = stable_hash(f'{band}:' + ','.join(map(str, rows)))
+        buckets.append(value - (1 << 64) if value >= 1 << 63 else value)
+    return buckets
+
+
+def estimate_similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_HASHES
+
+
+def index_record(record, code):
+    """
+    Adds a SubmissionRecord to the index. Very short programs aren't indexed:
+    their solutions look alike whether copied or not.
+    """
+    tokens = normalize_tokens(code, record.language)
+    if len(tokens) < getattr(settings, 'SIMILARITY_MIN_TOKENS', 20):
+        return None
+
+    signature = minhash(winnow(tokens))
+    if signature is None:
+        return None
+    fingerprint = SubmissionFingerprint.objects.create(
+        record=record,
+        question_id=record.question_id,
+        user_id=record.user_id,
+        signature=pack_signature(signature),
+    )
+    FingerprintBucket.objects.bulk_create([
+        FingerprintBucket(fingerprint=fingerprint, question_id=record.question_id, bucket=bucket)
+        for bucket in band_buckets(signature)
+    ])
+    return fingerprint
+
+
+def find_similar(record, threshold=None):
+    """
+    [(other SubmissionRecord, similarity), ...] from other users for the same question,
+    most similar first.
+    """
+    threshold = threshold if threshold is not None else settings.SIMILARITY_THRESHOLD
+    try:
+        fingerprint = record.fingerprint
+    except SubmissionFingerprint.DoesNotExist:
+        return []
+    signature = unpack_signature(fingerprint.signature)
+
+    candidate_ids = FingerprintBucket.objects.filter(
+        question_id=fingerprint.question_id,
+        bucket__in=band_buckets(signature),
+    ).exclude(fingerprint__user_id=fingerprint.user_id).values_list('fingerprint_id', flat=True).distinct()
+
+    matches = []
+    candidates = SubmissionFingerprint.objects.filter(pk__in=list(candidate_ids)).select_related('record__user')
+    for candidate in candidates:
+        similarity = estimate_similarity(signature, unpack_signature(candidate.signature))
+        if similarity >= threshold:
+            matches.append((candidate.record, similarity))
+    matches.sort(key=lambda match: -match[1])
+    return matches
+
+
+def question_report(question, threshold=None):
+    """
+    Pairs of submissions by different users that look copied, for the admin report:
+    [{'similarity', 'first', 'second'}, ...] (SubmissionRecords), best match per pair
+    of users, most similar first. Only pairs sharing a bucket are compared.
+    """
+    threshold = threshold if threshold is not None else settings.SIMILARITY_THRESHOLD
+
+    members = defaultdict(list)
+    for bucket, fingerprint_id in FingerprintBucket.objects.filter(question=question).values_list('bucket', 'fingerprint_id'):
+        members[bucket].append(fingerprint_id)
+    pairs = {
+        (first, second)
+        for ids in members.values() if len(ids) > 1
+        for i, first in enumerate(ids) for second in ids[i + 1:]
+    }
+    if not pairs:
+        return []
+
+    involved = {fingerprint_id for pair in pairs for fingerprint_id in pair}
+    fingerprints = {
+        fingerprint.pk: fingerprint
+        for fingerprint in SubmissionFingerprint.objects.filter(pk__in=involved).select_related('record__user')
+    }
+    signatures = {pk: unpack_signature(fingerprint.signature) for pk, fingerprint in fingerprints.items()}
+
+    best = {}
+    for first, second in pairs:
+        a, b = fingerprints[first], fingerprints[second]
+        if a.user_id == b.user_id:
+            continue
+        similarity = estimate_similarity(signatures[first], signatures[second])
+        users = tuple(sorted((a.user_id, b.user_id)))
+        if similarity >= threshold and similarity > best.get(users, {}).get('similarity', 0):
+            best[users] = {'similarity': similarity, 'first': a.record, 'second': b.record}
+    return sorted(best.values(), key=lambda row: -row['similarity'])
@@ -0,0 +1,115 @@
+"""
+Compact storage of judged code submissions (SubmissionCode / SubmissionRecord).
+
+Source code is stored once per distinct content, zlib-compressed and keyed by its
+sha256, so resubmissions and shared solutions take one row. Per-case results are
+packed into small binary fields instead of a row or a JSON object per case:
+    verdicts   one byte per case (VERDICT_CODES)
+    run_times  little-endian uint32 per case, milliseconds
+    memory     little-endian uint32 per case, peak KB
+UNKNOWN marks a time or memory the executor didn't report (or a skipped case).
+"""
+import hashlib
+import logging
+import struct
+import zlib
+
+from django.db import transaction
+
+from .judge import (
+    ACCEPTED, COMPILE_ERROR, MEMORY_LIMIT, OUTPUT_LIMIT, RUNTIME_ERROR, SKIPPED, TIME_LIMIT,
+    VERDICT_LABELS, WRONG_ANSWER, case_stats, count_passed,
+)
+from .models import SubmissionCode, SubmissionRecord
+from .similarity import index_record
+
+# Stored values: never renumber, only append
+VERDICT_CODES = {
+    ACCEPTED: 0,
+    WRONG_ANSWER: 1,
+    TIME_LIMIT: 2,
+    MEMORY_LIMIT: 3,
+    RUNTIME_ERROR: 4,
+    COMPILE_ERROR: 5,
+    OUTPUT_LIMIT: 6,
+    SKIPPED: 7,
+}
+VERDICTS_BY_CODE = {code: verdict for verdict, code in VERDICT_CODES.items()}
+
+UNKNOWN = 0xFFFFFFFF
+
+logger = logging.getLogger(__name__)
+
+
+def decompress_code(data):
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+def store_code(code):
+    """
+    The SubmissionCode row for `code`, created on first sight.
+    """
+    raw = (code or '').encode('utf-8')
+    code_row, _ = SubmissionCode.objects.get_or_create(
+        sha256=hashlib.sha256(raw).hexdigest(),
+        defaults={'data': zlib.compress(raw), 'size': len(raw)},
+    )
+    return code_row
+
+
+def pack_numbers(values):
+    return struct.pack(f'<{len(values)}I', *(UNKNOWN if value is None else min(int(value), UNKNOWN - 1) for value in values))
+
+
+def unpack_numbers(data):
+    data = bytes(data)
+    return [None if value == UNKNOWN else value for value in struct.unpack(f'<{len(data) // 4}I', data)]
+
+
+def pack_cases(results):
+    """
+    SubmissionRecord fields for a judge_submission() result.
+    """
+    stats = case_stats(results)
+    return {
+        'verdicts': bytes(VERDICT_CODES.get(verdict, VERDICT_CODES[RUNTIME_ERROR]) for verdict in results),
+        'run_times': pack_numbers([run_time_ms for run_time_ms, _ in stats]),
+        'memory': pack_numbers([memory_kb for _, memory_kb in stats]),
+    }
+
+
+def unpack_cases(verdicts, run_times, memory):
+    rows = []
+    for verdict_code, run_time_ms, memory_kb in zip(bytes(verdicts), unpack_numbers(run_times), unpack_numbers(memory)):
+        verdict = VERDICTS_BY_CODE[verdict_code]
+        rows.append({
+            'verdict': verdict,
+            'label': VERDICT_LABELS[verdict],
+            'run_time_ms': run_time_ms,
+            'memory_kb': memory_kb,
+        })
+    return rows
+
+
+def record_submission(user, question, language, code, results):
+    """
+    Stores one judged submission (every attempt, scored or not) and adds it to the
+    similarity index. The index is only for the admin report: if adding to it fails,
+    the submission is still recorded and scored.
+    """
+    record = SubmissionRecord.objects.create(
+        user=user,
+        question=question,
+        code=store_code(code),
+        language=language or '',
+        score=count_passed(results),
+        total=len(results),
+        **pack_cases(results),
+    )
+    try:
+        # Savepoint: a failed insert mustn't break the caller's transaction
+        with transaction.atomic():
+            index_record(record, code)
+    except Exception:
+        logger.exception("Could not index submission record %s for similarity", record.pk)
+    return record
@@ -1,3 +1,583 @@
-from django.test import TestCase
+import io
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.gateway import ExecutorUnavailable
+
+from . import async_views, comparator, contests, jobs, similarity, views
+from .harness import parse_batch_output, run_batch
+from .judge import (
+    ACCEPTED, COMPILE_ERROR, MEMORY_LIMIT, RUNTIME_ERROR, SKIPPED, TIME_LIMIT, WRONG_ANSWER, CaseVerdict, JudgeResults,
+    describe_results, judge_submission, outputs_match, run_cases_batched, run_cases_concurrently, skip_after_failure,
+)
+from .models import (
+    Contest, ContestEntry, ContestEvent, ContestProblem, DailyQuestion, DailySubmission, JudgeJob, SubmissionCode,
+    SubmissionRecord, TestCase as QuestionTestCase, UserStreak,
+)
+from .submissions import UNKNOWN, pack_cases, pack_numbers, record_submission, unpack_cases, unpack_numbers
+from .testdata import get_storage, store_text
+
+MARK = '@@M@@'
+
+
+def make_question(values, **fields):
+    question = DailyQuestion.objects.create(question_type='CODE', title='Echo', description='', **fields)
+    for value in values:
+        QuestionTestCase.objects.create(question=question, input_data=value, expected_output=value)
+    return question
+
+
+def fake_case(input_data, expected='ok', limits=None, check=None):
+    return (input_data, expected, limits or {}, check)
+
+
+def fake_run(language, code, input_data, expected_output, limits=None, check=None):
+    # Input is '<seconds to sleep> <verdict>'; later cases finish first
+    delay, verdict = input_data.split()
+    time.sleep(float(delay))
+    return verdict
+
+
+@override_settings(JUDGE_MAX_CONCURRENCY=4)
+@mock.patch('challenges.judge.run_test_case', side_effect=fake_run)
+class VerdictOrderTests(SimpleTestCase):
+    def test_verdicts_follow_case_order(self, run):
+        cases = [fake_case('0.2 AC'), fake_case('0.1 WA'), fake_case('0 TLE')]
+        self.assertEqual(run_cases_concurrently('python', '', cases), [ACCEPTED, WRONG_ANSWER, TIME_LIMIT])
+
+    def test_stop_on_failure_skips_after_the_first_failure(self, run):
+        # Case 2 fails before case 1 does; only the first failure in case order counts
+        cases = [fake_case('0 AC'), fake_case('0.2 WA'), fake_case('0 TLE'), fake_case('0.3 AC')]
+        self.assertEqual(
+            run_cases_concurrently('python', '', cases, stop_on_failure=True),
+            [ACCEPTED, WRONG_ANSWER, SKIPPED, SKIPPED],
+        )
+
+    @override_settings(JUDGE_MAX_CONCURRENCY=1)
+    def test_sequential_stop_on_failure_does_not_run_the_rest(self, run):
+        cases = [fake_case('0 WA'), fake_case('0 AC'), fake_case('0 AC')]
+        self.assertEqual(run_cases_concurrently('python', '', cases, stop_on_failure=True), [WRONG_ANSWER, SKIPPED, SKIPPED])
+        self.assertEqual(run.call_count, 1)
+
+    def test_batch_leftovers_keep_their_position(self, run):
+        cases = [fake_case('', 'a'), fake_case('', 'b'), fake_case('0 WA'), fake_case('0 AC')]
+        # The harness finished cases 0 and 1 only
+        batch = {0: ('a\n', '0', 5, None), 1: ('b\n', '0', 5, None)}
+        with mock.patch('challenges.judge.run_batch', return_value=batch):
+            self.assertEqual(run_cases_batched('python', '', cases), [ACCEPTED, ACCEPTED, WRONG_ANSWER, ACCEPTED])
+            self.assertEqual(
+                run_cases_batched('python', '', cases, stop_on_failure=True),
+                [ACCEPTED, ACCEPTED, WRONG_ANSWER, SKIPPED],
+            )
+
+    def test_batched_failure_skips_without_rerunning(self, run):
+        cases = [fake_case('', 'a'), fake_case('', 'b'), fake_case('0 AC')]
+        with mock.patch('challenges.judge.run_batch', return_value={0: ('x\n', '0', 5, None)}):
+            self.assertEqual(run_cases_batched('python', '', cases, stop_on_failure=True), [WRONG_ANSWER, SKIPPED, SKIPPED])
+        run.assert_not_called()
+
+    def test_skip_after_failure(self, run):
+        self.assertEqual(skip_after_failure([ACCEPTED, None, WRONG_ANSWER, None]), [ACCEPTED, None, WRONG_ANSWER, SKIPPED])
+        self.assertEqual(skip_after_failure([ACCEPTED, ACCEPTED]), [ACCEPTED, ACCEPTED])
+
+
+class ParseBatchOutputTests(SimpleTestCase):
+    def test_finished_run(self):
+        output = f'\n{MARK} 0 0 12 3400\n1\n\n{MARK} 1 TLE 2001 -\n\n{MARK} END\n'
+        self.assertEqual(parse_batch_output(output, MARK), {
+            0: ('1\n', '0', 12, 3400),
+            1: ('', 'TLE', 2001, None),
+        })
+
+    def test_cut_off_run_drops_the_last_case(self):
+        output = f'\n{MARK} 0 0 12 3400\n1\n\n{MARK} 1 0 15 3400\npartial'
+        self.assertEqual(list(parse_batch_output(output, MARK)), [0])
+
+    def test_program_output_can_not_forge_a_case(self):
+        output = f'\n{MARK} 0 0 12 -\n@@OTHER@@ 1 0 1 -\n\n{MARK} END\n'
+        self.assertEqual(parse_batch_output(output, MARK), {0: ('@@OTHER@@ 1 0 1 -\n', '0', 12, None)})
+
+
+@override_settings(CODE_EXECUTION_BACKEND='local', CODE_EXECUTION_WARM_POOL_SIZE=0, JUDGE_BATCH_BUDGET_SECONDS=2.5)
+class BatchBudgetTests(TestCase):
+    SLOW_ECHO = 'import time\ntime.sleep(1)\nprint(input())'
+
+    def limits(self):
+        return {'cpu_seconds': 2, 'wall_seconds': 2.0, 'memory_mb': 256, 'output_bytes': 65536}
+
+    def test_stops_before_a_case_whose_limit_does_not_fit(self):
+        batch = run_batch('python', self.SLOW_ECHO, ['a', 'b', 'c'], [self.limits()] * 3)
+        # Case 1 would start with 1.5s of budget left for a 2s limit
+        self.assertEqual(list(batch), [0])
+        self.assertEqual(batch[0][:2], ('a\n', '0'))
+
+    def test_cases_left_over_are_judged_per_case(self):
+        question = make_question('abc')
+        results = judge_submission('python', self.SLOW_ECHO, list(question.test_cases.order_by('id')))
+        self.assertEqual(results, [ACCEPTED] * 3)
+
+
+class ComparatorTests(SimpleTestCase):
+    def compare(self, output, expected, mode, tolerance=comparator.DEFAULT_FLOAT_TOLERANCE):
+        return comparator.compare(output, expected, mode, tolerance)
+
+    def test_exact(self):
+        self.assertTrue(self.compare('\n 1 2\n3 \n\n', '1 2\n3', comparator.EXACT))
+        self.assertFalse(self.compare('1  2\n3', '1 2\n3', comparator.EXACT))
+        self.assertFalse(self.compare('1 2\n3\n4', '1 2\n3', comparator.EXACT))
+
+    def test_whitespace(self):
+        self.assertTrue(self.compare('1   2\r\n3\n', '1 2 3', comparator.WHITESPACE))
+        self.assertFalse(self.compare('12 3', '1 2 3', comparator.WHITESPACE))
+        self.assertFalse(self.compare('1 2', '1 2 3', comparator.WHITESPACE))
+
+    def test_float(self):
+        self.assertTrue(self.compare('0.3333333 yes', '0.33333333 yes', comparator.FLOAT, 1e-6))
+        self.assertTrue(self.compare('1000000.5', '1000000.0', comparator.FLOAT, 1e-6))  # relative
+        self.assertFalse(self.compare('0.334', '0.333', comparator.FLOAT, 1e-6))
+        self.assertFalse(self.compare('0.333 no', '0.333 yes', comparator.FLOAT, 1e-6))
+        self.assertFalse(self.compare('nan', '1.0', comparator.FLOAT, 1e-6))
+
+    def test_unordered(self):
+        self.assertTrue(self.compare('b\na  \n\nc', 'a\nb\nc\n', comparator.UNORDERED))
+        self.assertFalse(self.compare('a\na\nb', 'a\nb\nb', comparator.UNORDERED))
+        self.assertFalse(self.compare('a b\nc', 'a\nb c', comparator.UNORDERED))
+
+    def test_chunk_boundaries_do_not_matter(self):
+        expected = ' '.join(str(n) for n in range(50000))
+        chunks = [expected[start:start + 7] for start in range(0, len(expected), 7)]
+        for mode in (comparator.EXACT, comparator.WHITESPACE, comparator.FLOAT, comparator.UNORDERED):
+            self.assertTrue(self.compare(iter(chunks), io.StringIO(expected), mode), mode)
+        self.assertFalse(self.compare(iter(chunks[:-1]), expected, comparator.WHITESPACE))
+
+    def test_binary_file_expected(self):
+        self.assertTrue(self.compare('héllo\n', io.BytesIO('héllo'.encode('utf-8')), comparator.WHITESPACE))
+
+
+@override_settings(CODE_EXECUTION_BACKEND='local', CODE_EXECUTION_WARM_POOL_SIZE=0)
+class CompileTimeTests(TestCase):
+    ECHO_C = '#include <stdio.h>\nint main(){char s[16];scanf("%15s",s);puts(s);}'
+
+    def test_compile_time_comes_with_the_verdicts(self):
+        question = make_question('ab')
+        results = judge_submission('c', self.ECHO_C, list(question.test_cases.all()))
+        self.assertEqual(results, [ACCEPTED, ACCEPTED])
+        self.assertIsNotNone(results.compile_time_ms)
+
+        broken = judge_submission('c', 'int main(', list(question.test_cases.all()))
+        self.assertEqual(broken, [COMPILE_ERROR, COMPILE_ERROR])
+
+        interpreted = judge_submission('python', 'print(input())', list(question.test_cases.all()))
+        self.assertIsNone(interpreted.compile_time_ms)
+
+    def test_result_partial_shows_it(self):
+        html = render_to_string('challenges/code_result_partial.html', {
+            'score': 1, 'total': 1, 'results': describe_results(JudgeResults([ACCEPTED], 120)),
+        })
+        self.assertIn('Compiled in 120 ms', html)
+        html = render_to_string('challenges/code_result_partial.html', {
+            'score': 1, 'total': 1, 'results': describe_results([ACCEPTED], 0),
+        })
+        self.assertIn('Compiled (cached build)', html)
+        html = render_to_string('challenges/code_result_partial.html', {
+            'score': 1, 'total': 1, 'results': describe_results([ACCEPTED]),
+        })
+        self.assertNotIn('Compiled', html)
+
+
+class StoredTestDataTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = self.settings(TESTDATA_STORAGE='', MEDIA_ROOT=media.name, TESTDATA_INLINE_MAX_BYTES=16)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_large_data_goes_to_the_storage(self):
+        text = 'line\r\n' * 10000
+        test = make_question([text]).test_cases.get()
+        self.assertEqual((test.input_data, test.input_in_file, test.input_size), ('', True, len(text)))
+
+        stored = test.get_input()
+        with stored.open() as f:
+            self.assertEqual(f.read(), text.encode('utf-8'))
+        self.assertEqual(stored.read_text(), text)
+        # Expected outputs are compared straight from the storage
+        self.assertTrue(outputs_match(text, test.get_expected_output(), (comparator.EXACT, 0)))
+        with self.settings(CODE_EXECUTION_BACKEND='local', CODE_EXECUTION_WARM_POOL_SIZE=0):
+            results = judge_submission('python', 'import sys\nsys.stdout.write(sys.stdin.read())', [test])
+        self.assertEqual(results, [ACCEPTED])
+
+    def test_same_data_is_stored_once(self):
+        first = store_text('x' * 100)
+        self.assertEqual(store_text('x' * 100), first)
+        self.assertEqual(get_storage().listdir(f'testdata/{first[0][:2]}')[1], [f'{first[0]}.gz'])
+
+    def test_small_data_stays_inline(self):
+        test = make_question(['1 2']).test_cases.get()
+        self.assertEqual((test.input_data, test.input_in_file, test.input_size), ('1 2', False, 3))
+
+
+@override_settings(CONTEST_STREAM_POLL_SECONDS=2, CONTEST_STREAM_SECONDS=60)
+class ContestEventsTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Latest event ids are cached per contest
+        now = timezone.now()
+        self.contest = Contest.objects.create(title='Cup', slug='cup', starts_at=now, ends_at=now + timezone.timedelta(hours=1))
+        self.events = [ContestEvent.objects.create(contest=self.contest, data={'n': n}) for n in range(3)]
+
+    def get_events(self, **headers):
+        request = RequestFactory().get('/contests/cup/events/', {'after': self.events[0].pk}, **headers)
+        started = time.monotonic()
+        body = b''.join(views.contest_events(request, 'cup').streaming_content).decode()
+        # Answers straight away instead of holding the worker until new events arrive
+        self.assertLess(time.monotonic() - started, 1)
+        return body
+
+    def test_sends_what_is_new_and_closes(self):
+        body = self.get_events()
+        self.assertTrue(body.startswith('retry: 2000\n\n'))
+        self.assertEqual(body.count('event: standing'), 2)
+        self.assertIn(f'id: {self.events[2].pk}\n', body)
+
+    def test_reconnect_resumes_from_last_event_id(self):
+        body = self.get_events(HTTP_LAST_EVENT_ID=str(self.events[2].pk))
+        self.assertEqual(body, 'retry: 2000\n\n')
+
+
+@override_settings(JUDGE_JOB_MAX_ATTEMPTS=3, JUDGE_JOB_STALE_SECONDS=300, JUDGE_JOB_RETRY_SECONDS=2, JUDGE_JOB_MAX_RETRY_SECONDS=120)
+class JudgeJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student')
+        self.question = make_question(['1'])
+
+    def enqueue(self):
+        return jobs.enqueue_job(self.user, self.question, 'python', 'print(input())')
+
+    def test_claim_is_status_guarded(self):
+        first, second = self.enqueue(), self.enqueue()
+        self.assertEqual(jobs.claim_next_job().pk, first.pk)
+        self.assertEqual(jobs.claim_next_job().pk, second.pk)
+        self.assertIsNone(jobs.claim_next_job())
+
+        # Another worker claims the oldest job between our SELECT and UPDATE: we must
+        # not take it too, but move on to the next one
+        taken, left = self.enqueue(), self.enqueue()
+        real_filter = JudgeJob.objects.filter
+
+        def racing_filter(*args, **kwargs):
+            if kwargs.get('pk') == taken.pk and kwargs.get('status') == 'QUEUED':
+                real_filter(pk=taken.pk).update(status='RUNNING', attempts=1)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(JudgeJob.objects, 'filter', side_effect=racing_filter):
+            self.assertEqual(jobs.claim_next_job().pk, left.pk)
+        self.assertEqual(JudgeJob.objects.get(pk=taken.pk).attempts, 1)
+
+    def test_stale_running_jobs_are_requeued_until_out_of_attempts(self):
+        stale_time = timezone.now() - timezone.timedelta(seconds=301)
+        stale, worn_out, fresh, scored = (self.enqueue() for _ in range(4))
+        JudgeJob.objects.filter(pk__in=[stale.pk, worn_out.pk, scored.pk]).update(status='RUNNING', started_at=stale_time, attempts=1)
+        JudgeJob.objects.filter(pk=worn_out.pk).update(attempts=3)
+        JudgeJob.objects.filter(pk=scored.pk).update(is_scored=True)
+        JudgeJob.objects.filter(pk=fresh.pk).update(status='RUNNING', started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        statuses = dict(JudgeJob.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[job.pk] for job in (stale, worn_out, fresh, scored)], ['QUEUED', 'FAILED', 'RUNNING', 'RUNNING']
+        )
+
+    def test_scoring_happens_once(self):
+        self.enqueue()
+        job = jobs.claim_next_job()
+        with mock.patch('challenges.jobs.judge_submission', return_value=JudgeResults([ACCEPTED])):
+            jobs.process_job(job)
+            # A stale requeue let a second worker judge the same job
+            jobs.process_job(job)
+
+        self.assertEqual(JudgeJob.objects.get(pk=job.pk).status, 'DONE')
+        self.assertEqual(SubmissionRecord.objects.count(), 1)
+        self.assertEqual(DailySubmission.objects.get().score, 1)
+        self.assertEqual(UserStreak.objects.get(user=self.user).total_score, 1)
+
+    def test_executor_outage_backs_off_without_using_an_attempt(self):
+        self.enqueue()
+        outage = ExecutorUnavailable("Code runner is temporarily unavailable.")
+        with mock.patch('challenges.jobs.judge_submission', side_effect=outage):
+            for delay in (2, 4, 8, 16):
+                job = jobs.claim_next_job()
+                started = timezone.now()
+                jobs.process_job(job)
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.attempts), ('QUEUED', 0))
+                self.assertAlmostEqual((job.not_before - started).total_seconds(), delay, delta=1)
+
+                # Not claimed again before it is due
+                self.assertIsNone(jobs.claim_next_job())
+                JudgeJob.objects.filter(pk=job.pk).update(not_before=timezone.now())
+
+        # An open breaker's retry_after wins over a shorter backoff
+        JudgeJob.objects.filter(pk=job.pk).update(outages=0)
+        job = jobs.claim_next_job()
+        with mock.patch('challenges.jobs.judge_submission', side_effect=ExecutorUnavailable("Down", retry_after=30)):
+            jobs.process_job(job)
+        job.refresh_from_db()
+        self.assertAlmostEqual((job.not_before - timezone.now()).total_seconds(), 30, delta=1)
+        self.assertEqual(jobs.retry_delay(JudgeJob(outages=10)), 120)
+
+
+@override_settings(CODE_THROTTLE_ENABLED=False, JUDGE_ASYNC=False)
+@mock.patch('challenges.async_views.ajudge_submission', new_callable=mock.AsyncMock, return_value=JudgeResults([ACCEPTED]))
+@mock.patch('challenges.views.judge_submission', return_value=JudgeResults([ACCEPTED]))
+class SubmitCodeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student')
+        self.client.force_login(self.user)
+        self.today = make_question(['1'], release_date=timezone.now().date())
+        self.contest_only = make_question(['1'])
+        self.unreleased = make_question(['1'], release_date=timezone.now().date() + timezone.timedelta(days=1))
+
+    def submit(self, view, question):
+        request = RequestFactory().post('/', '{"language": "python", "code": "print(1)"}', content_type='application/json')
+        request.user, request.session = self.user, self.client.session
+        if view is async_views.submit_code:
+            return async_to_sync(view)(request, question.pk)
+        return view(request, question.pk)
+
+    def test_only_released_daily_questions_are_scored(self, judge, ajudge):
+        for view in (views.submit_code, async_views.submit_code):
+            for question in (self.contest_only, self.unreleased):
+                with self.assertRaises(Http404):
+                    self.submit(view, question)
+            self.assertEqual(self.submit(view, self.today).status_code, 200)
+
+        self.assertEqual((judge.call_count, ajudge.call_count), (1, 1))
+        self.assertEqual(list(DailySubmission.objects.values_list('question', flat=True)), [self.today.pk])
+        self.assertEqual(UserStreak.objects.get(user=self.user).total_score, 1)
+
+
+class RecordResultTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.start = timezone.now() - timezone.timedelta(hours=1)
+        self.contest = Contest.objects.create(
+            title='Cup', slug='cup', starts_at=self.start, ends_at=self.start + timezone.timedelta(hours=2), penalty_minutes=20
+        )
+        self.a, self.b = (
+            ContestProblem.objects.create(contest=self.contest, question=make_question(['1']), label=label) for label in 'AB'
+        )
+        self.alice, self.bob = User.objects.create_user('alice'), User.objects.create_user('bob')
+
+    def at(self, minutes):
+        return self.start + timezone.timedelta(minutes=minutes, seconds=30)
+
+    def events(self):
+        return [event.data for event in ContestEvent.objects.filter(contest=self.contest).order_by('pk')]
+
+    def test_penalty_counts_minutes_and_rejections_before_the_solve(self):
+        contests.record_result(self.a, self.alice, False, self.at(3))
+        contests.record_result(self.a, self.alice, False, self.at(5))
+        entry = contests.record_result(self.a, self.alice, True, self.at(10))
+        self.assertEqual((entry.solved, entry.penalty), (1, 10 + 2 * 20))
+        self.assertEqual(entry.problems, {'A': {'attempts': 2, 'solved_at': 10}})
+
+        # Rejections on an unsolved problem cost nothing
+        entry = contests.record_result(self.b, self.alice, False, self.at(20))
+        self.assertEqual((entry.solved, entry.penalty), (1, 50))
+
+    def test_submissions_after_the_solve_or_the_end_are_ignored(self):
+        contests.record_result(self.a, self.alice, True, self.at(10))
+        contests.record_result(self.a, self.alice, False, self.at(12))
+        contests.record_result(self.a, self.alice, True, self.at(15))
+        self.assertIsNone(contests.record_result(self.b, self.alice, True, self.contest.ends_at))
+        self.assertIsNone(contests.record_result(self.b, self.alice, True, self.start - timezone.timedelta(seconds=1)))
+
+        entry = ContestEntry.objects.get(user=self.alice)
+        self.assertEqual((entry.solved, entry.penalty, entry.problems), (1, 10, {'A': {'attempts': 0, 'solved_at': 10}}))
+        self.assertEqual(len(self.events()), 2)  # Joined, solved A
+
+    def test_events_carry_the_rank_change(self):
+        contests.record_result(self.a, self.alice, True, self.at(30))
+        contests.record_result(self.a, self.bob, False, self.at(5))
+        contests.record_result(self.a, self.bob, True, self.at(10))
+        contests.record_result(self.b, self.bob, True, self.at(40))
+
+        alice_joined, alice_solved, bob_joined, bob_a, bob_b = self.events()
+        self.assertEqual(
+            alice_joined,
+            {'user_id': self.alice.pk, 'username': 'alice', 'solved': 0, 'penalty': 0, 'rank': 1,
+             'previous': None, 'problem': None, 'minutes': None},
+        )
+        self.assertEqual(
+            (alice_solved['rank'], alice_solved['previous'], alice_solved['problem'], alice_solved['minutes']),
+            (1, {'solved': 0, 'penalty': 0, 'rank': 1}, 'A', 30),
+        )
+        # Bob joins behind Alice, ties her (10 minutes + one rejection), then overtakes her
+        self.assertEqual((bob_joined['rank'], bob_joined['previous']), (2, None))
+        self.assertEqual((bob_a['solved'], bob_a['penalty'], bob_a['rank']), (1, 30, 1))
+        self.assertEqual(bob_a['previous'], {'solved': 0, 'penalty': 0, 'rank': 2})
+        self.assertEqual((bob_b['solved'], bob_b['penalty'], bob_b['rank']), (2, 70, 1))
+        self.assertEqual(bob_b['previous'], {'solved': 1, 'penalty': 30, 'rank': 1})
+        self.assertEqual([entry.user for entry in contests.standings(self.contest)], [self.bob, self.alice])
+
+    def test_joining_is_announced_once(self):
+        contests.join(self.contest, self.alice)
+        contests.join(self.contest, self.alice)
+        contests.record_result(self.a, self.alice, False, self.at(1))
+        self.assertEqual([event['username'] for event in self.events()], ['alice'])
+        self.assertEqual(ContestEntry.objects.filter(contest=self.contest).count(), 1)
+
+
+SUM_PAIRS = """
+import sys
+# read every pair and print the sums
+def main():
+    total = 0
+    for line in sys.stdin:
+        first, second = map(int, line.split())
+        total += first + second
+        print(first + second, "sum")
+    return total
+main()
+"""
+
+SUM_PAIRS_RENAMED = """
+import sys
+
+def solve():  # renamed everything
+    acc = 0
+    for row in sys.stdin:
+        x, y = map(int, row.split())
+        acc += x + y
+        print(x + y, 'pair')
+    return acc
+solve()
+"""
+
+LONGEST_WORD = """
+words = input().split()
+best = ''
+for word in words:
+    if len(word) > len(best):
+        best = word
+while best.endswith('.'):
+    best = best[:-1]
+print(best.upper() if best else 'none')
+"""
+
+
+@override_settings(SIMILARITY_THRESHOLD=0.5, SIMILARITY_MIN_TOKENS=20)
+class SimilarityTests(TestCase):
+    def setUp(self):
+        self.question = make_question(['1 2'])
+        self.users = [User.objects.create_user(name) for name in ('alice', 'bob', 'carol')]
+
+    def submit(self, user, code, language='python'):
+        return record_submission(user, self.question, language, code, JudgeResults([ACCEPTED]))
+
+    def test_normalization_ignores_names_comments_and_literals(self):
+        self.assertEqual(
+            similarity.normalize_tokens(SUM_PAIRS, 'python'), similarity.normalize_tokens(SUM_PAIRS_RENAMED, 'Python')
+        )
+        self.assertEqual(similarity.normalize_tokens('x = a // 2  # half', 'python'), ['V', '=', 'V', '/', '/', 'N'])
+        self.assertEqual(
+            similarity.normalize_tokens('#include <stdio.h>\nint n = 10; /* ten */ puts("hi"); // done', 'c'),
+            ['int', 'V', '=', 'N', ';', 'V', '(', 'S', ')', ';'],
+        )
+
+    def test_copies_are_found_through_the_buckets(self):
+        original = self.submit(self.users[0], SUM_PAIRS)
+        copy = self.submit(self.users[1], SUM_PAIRS_RENAMED)
+        self.submit(self.users[2], LONGEST_WORD)
+        # The author's own resubmission isn't a match
+        self.submit(self.users[0], SUM_PAIRS_RENAMED)
+
+        self.assertEqual([(record, score) for record, score in similarity.find_similar(original)], [(copy, 1.0)])
+        self.assertEqual([record.user for record, _ in similarity.find_similar(copy)], [self.users[0], self.users[0]])
+
+        with self.assertNumQueries(2):
+            report = similarity.question_report(self.question)
+        self.assertEqual(len(report), 1)
+        self.assertEqual({report[0]['first'].user, report[0]['second'].user}, set(self.users[:2]))
+        self.assertEqual(report[0]['similarity'], 1.0)
+
+    def test_short_programs_are_not_indexed(self):
+        record = self.submit(self.users[0], 'print(1)')
+        self.assertFalse(similarity.SubmissionFingerprint.objects.filter(record=record).exists())
+        self.assertEqual(similarity.find_similar(record), [])
+
+    @override_settings(SIMILARITY_MIN_TOKENS=0)
+    def test_code_without_fingerprints_is_not_indexed(self):
+        self.assertIsNone(similarity.minhash(set()))
+        for code in ('', 'x = 1'):
+            record = self.submit(self.users[0], code)
+            self.assertIsNone(similarity.index_record(record, code))
+        self.assertEqual(similarity.SubmissionFingerprint.objects.count(), 0)
+        self.assertEqual(SubmissionRecord.objects.count(), 2)
+
+    def test_index_failure_does_not_lose_the_submission(self):
+        with mock.patch('challenges.submissions.index_record', side_effect=RuntimeError('index down')):
+            with self.assertLogs('challenges.submissions', 'ERROR'):
+                record = self.submit(self.users[0], SUM_PAIRS)
+        self.assertTrue(SubmissionRecord.objects.filter(pk=record.pk).exists())
+
+
+class SubmissionStorageTests(TestCase):
+    def setUp(self):
+        self.question = make_question(['1', '2', '3', '4'])
+        self.user = User.objects.create_user('student')
+
+    def test_cases_round_trip(self):
+        results = JudgeResults([
+            CaseVerdict(ACCEPTED, 12, 3400),
+            CaseVerdict(TIME_LIMIT, 3000, None),  # Killed before the memory was read
+            CaseVerdict(MEMORY_LIMIT, None, 262144),
+            SKIPPED,  # Never ran: plain verdict, nothing known
+        ])
+        record = record_submission(self.user, self.question, 'python', 'print(1)', results)
+        record = SubmissionRecord.objects.get(pk=record.pk)
+        self.assertEqual((record.score, record.total), (1, 4))
+        self.assertEqual([(case['verdict'], case['run_time_ms'], case['memory_kb']) for case in record.cases()], [
+            (ACCEPTED, 12, 3400), (TIME_LIMIT, 3000, None), (MEMORY_LIMIT, None, 262144), (SKIPPED, None, None),
+        ])
+        self.assertEqual(record.cases()[3]['label'], 'Skipped')
+
+    def test_compile_error_and_unknown_verdicts(self):
+        packed = pack_cases([COMPILE_ERROR, COMPILE_ERROR])
+        self.assertEqual(len(packed['verdicts']), 2)
+        self.assertEqual([case['verdict'] for case in unpack_cases(**packed)], [COMPILE_ERROR, COMPILE_ERROR])
+
+        # A verdict without a code is stored as a runtime error, not dropped
+        cases = unpack_cases(**pack_cases([ACCEPTED, 'XX']))
+        self.assertEqual([case['verdict'] for case in cases], [ACCEPTED, RUNTIME_ERROR])
+        self.assertEqual(unpack_cases(**pack_cases([])), [])
+
+    def test_numbers_keep_unknown_apart_from_large_values(self):
+        packed = pack_numbers([0, None, UNKNOWN, 5.7])
+        self.assertEqual(len(packed), 16)
+        # A real value can't collide with the UNKNOWN marker
+        self.assertEqual(unpack_numbers(packed), [0, None, UNKNOWN - 1, 5])
+
+    def test_code_is_stored_once_per_content(self):
+        code = 'n = int(input())\nprint(n * 2)\n' * 50
+        first = record_submission(self.user, self.question, 'python', code, [ACCEPTED])
+        other = User.objects.create_user('other')
+        second = record_submission(other, self.question, 'python', code, [WRONG_ANSWER])
+        changed = record_submission(self.user, self.question, 'python', code + '# v2\n', [ACCEPTED])
+
+        self.assertEqual(first.code_id, second.code_id)
+        self.assertNotEqual(first.code_id, changed.code_id)
+        self.assertEqual(SubmissionCode.objects.count(), 2)
+        stored = SubmissionCode.objects.get(pk=first.code_id)
+        self.assertEqual((stored.text, stored.size), (code, len(code.encode('utf-8'))))
+        self.assertLess(len(bytes(stored.data)), stored.size)
@@ -1,9 +1,22 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI, serve submit_code (and the contest submit / standings stream) as native async views
+if settings.USE_ASYNC_VIEWS:
+    from . import async_views as io_views
+else:
+    io_views = views
+
 urlpatterns = [
     path('daily/', views.daily_challenge, name='daily_challenge'),
     path('daily/submit-mcq/<int:question_id>/', views.submit_mcq, name='submit_mcq'),
-    path('daily/submit-code/<int:question_id>/', views.submit_code, name='submit_code'),
+    path('daily/submit-code/<int:question_id>/', io_views.submit_code, name='submit_code'),
+    path('daily/judge-status/<uuid:job_id>/', views.judge_status, name='judge_status'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('contests/', views.contest_list, name='contest_list'),
+    path('contests/<slug:slug>/', views.contest_detail, name='contest_detail'),
+    path('contests/<slug:slug>/events/', io_views.contest_events, name='contest_events'),
+    path('contests/<slug:slug>/<str:label>/', views.contest_problem, name='contest_problem'),
+    path('contests/<slug:slug>/<str:label>/submit/', io_views.contest_submit, name='contest_submit'),
 ]
\ No newline at end of file
@@ -6,9 +6,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from datetime import timedelta
-import requests
 import json
-from .models import DailyQuestion, UserStreak, DailySubmission, TestCase
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from core.gateway import ExecutorUnavailable
+from core.throttle import admission_control
+from core.streaming import event_stream_response
+from . import contests
+from .jobs import enqueue_job
+from .judge import count_passed, describe_results, judge_submission, is_accepted
+from .models import DailyQuestion, UserStreak, DailySubmission, TestCase, JudgeJob, Contest, ContestProblem
+from .submissions import record_submission
 
 @login_required(login_url='login')
 def daily_challenge(request):
@@ -56,51 +66,71 @@ def submit_mcq(request, question_id):
     return redirect('daily_challenge')
 
 @login_required
+@admission_control(html=True)
 def submit_code(request, question_id):
     if request.method == "POST":
         data = json.loads(request.body)
         user_code = data.get('code')
         language = data.get('language')
         
-        question = get_object_or_404(DailyQuestion, id=question_id)
+        # Only released daily questions: contest-only ones (no release_date) are
+        # submitted through contest_submit, and unreleased ones aren't public yet
+        question = get_object_or_404(DailyQuestion, id=question_id, release_date__lte=timezone.now().date())
+
+        # Async mode: queue the job and let the page poll judge_status
+        if settings.JUDGE_ASYNC:
+            job = enqueue_job(request.user, question, language, user_code)
+            return JsonResponse({
+                'job_id': str(job.job_id),
+                'status_url': reverse('judge_status', args=[job.job_id]),
+            }, status=202)
+
         test_cases = question.test_cases.all()
         
-        score = 0
-        total_cases = test_cases.count()
-        results = []
-
-        # Run against Piston for every test case
-        for test in test_cases:
-            payload = {
-                "language": language, 
-                "version": "3.10.0", # Simplified version mapping for now
-                "files": [{"content": user_code}],
-                "stdin": test.input_data
-            }
-            
-            try:
-                # Call Piston API
-                resp = requests.post('https://emkc.org/api/v2/piston/execute', json=payload)
-                api_out = resp.json().get('run', {}).get('output', '').strip()
-                expected = test.expected_output.strip()
-                
-                if api_out == expected:
-                    score += 1
-                    results.append(True)
-                else:
-                    results.append(False)
-            except:
-                results.append(False)
+        total_cases = len(test_cases)
+
+        # Run the test cases in parallel on the configured execution backend
+        try:
+            results = judge_submission(language, user_code, test_cases, question.stop_on_first_failure)
+        except ExecutorUnavailable:
+            # Don't record a score: the user gets to submit again once the runner is back
+            return HttpResponse(
+                '<div class="alert alert-warning mt-3 mb-0">Code runner is busy right now. Please submit again in a moment.</div>',
+                status=503
+            )
+        score = count_passed(results)
+        record_submission(request.user, question, language, user_code, results)
 
         # Update Streak
         update_user_progress(request.user, question, score)
         
         return render(request, 'challenges/code_result_partial.html', {
             'score': score, 
-            'results': results,
+            'results': describe_results(results),
             'total': total_cases
         })
 
+@login_required
+def judge_status(request, job_id):
+    """
+    Polled by daily_challenge.html while an async submission is being judged.
+    """
+    job = get_object_or_404(JudgeJob, job_id=job_id, user=request.user)
+
+    data = {'status': job.status}
+    if job.status == 'DONE':
+        data['html'] = render_to_string('challenges/code_result_partial.html', {
+            'score': job.score,
+            'results': describe_results(job.results, job.compile_time_ms),
+            'total': job.total
+        }, request=request)
+    elif job.status == 'FAILED':
+        data['html'] = '<div class="alert alert-warning mt-3 mb-0">We could not judge this submission. Please submit again.</div>'
+
+    response = JsonResponse(data)
+    response['Cache-Control'] = 'no-store'
+    return response
+
 def update_user_progress(user, question, score):
     # 1. Prevent Duplicate Submission
     if DailySubmission.objects.filter(user=user, question=question).exists():
@@ -133,4 +163,108 @@ def update_user_progress(user, question, score):
 def leaderboard(request):
     # Sort by Score (Desc), then Streak (Desc)
     leaders = UserStreak.objects.select_related('user').order_by('-total_score', '-current_streak')[:20]
-    return render(request, 'challenges/leaderboard.html', {'leaders': leaders})
\ No newline at end of file
+    return render(request, 'challenges/leaderboard.html', {'leaders': leaders})
+
+
+# --- CONTESTS ---
+def contest_list(request):
+    now = timezone.now()
+    all_contests = list(Contest.objects.all())
+    return render(request, 'challenges/contest_list.html', {
+        'running': [c for c in all_contests if c.get_status(now) == 'RUNNING'],
+        'upcoming': [c for c in all_contests if c.get_status(now) == 'UPCOMING'],
+        'ended': [c for c in all_contests if c.get_status(now) == 'ENDED'],
+    })
+
+def contest_detail(request, slug):
+    """
+    Problems and live standings. The table is rendered once; contest_events then
+    streams rank changes starting after last_event_id.
+    """
+    contest = get_object_or_404(Contest, slug=slug)
+    status = contest.get_status()
+    problems = contest.problems.select_related('question') if status != 'UPCOMING' or request.user.is_staff else []
+    return render(request, 'challenges/contest_detail.html', {
+        'contest': contest,
+        'status': status,
+        'problems': problems,
+        'standings': contests.standings(contest),
+        'last_event_id': contests.get_last_event_id(contest.pk),
+    })
+
+@login_required(login_url='login')
+def contest_problem(request, slug, label):
+    problem = get_object_or_404(ContestProblem.objects.select_related('contest', 'question'), contest__slug=slug, label=label)
+    status = problem.contest.get_status()
+    if status == 'UPCOMING' and not request.user.is_staff:
+        messages.info(request, "This contest hasn't started yet.")
+        return redirect('contest_detail', slug=slug)
+    return render(request, 'challenges/contest_problem.html', {
+        'problem': problem,
+        'contest': problem.contest,
+        'question': problem.question,
+        'status': status,
+    })
+
+def contest_closed(contest):
+    return HttpResponse(
+        f'<div class="alert alert-warning mt-3 mb-0">{contest.title} is not running. Submissions are closed.</div>',
+        status=403
+    )
+
+@login_required
+@admission_control(html=True)
+def contest_submit(request, slug, label):
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    submitted_at = timezone.now()  # Penalty counts from when the code was sent, not judged
+    data = json.loads(request.body)
+    user_code = data.get('code')
+    language = data.get('language')
+
+    problem = get_object_or_404(ContestProblem.objects.select_related('contest', 'question'), contest__slug=slug, label=label)
+    if problem.contest.get_status(submitted_at) != 'RUNNING':
+        return contest_closed(problem.contest)
+    question = problem.question
+
+    # Async mode: queue the job and let the page poll judge_status
+    if settings.JUDGE_ASYNC:
+        job = enqueue_job(request.user, question, language, user_code, contest_problem=problem)
+        return JsonResponse({
+            'job_id': str(job.job_id),
+            'status_url': reverse('judge_status', args=[job.job_id]),
+        }, status=202)
+
+    test_cases = question.test_cases.all()
+    try:
+        results = judge_submission(language, user_code, test_cases, question.stop_on_first_failure)
+    except ExecutorUnavailable:
+        # Not a rejected attempt: no penalty
+        return HttpResponse(
+            '<div class="alert alert-warning mt-3 mb-0">Code runner is busy right now. Please submit again in a moment.</div>',
+            status=503
+        )
+    record_submission(request.user, question, language, user_code, results)
+    contests.record_result(problem, request.user, is_accepted(results), submitted_at)
+
+    return render(request, 'challenges/code_result_partial.html', {
+        'score': count_passed(results),
+        'results': describe_results(results),
+        'total': len(results)
+    })
+
+def contest_events(request, slug):
+    """
+    Server-Sent Events with the standings changes (challenges/contests.py).
+    """
+    contest = get_object_or_404(Contest, slug=slug)
+    return event_stream_response(contests.standing_events(contest, last_seen_event(request)))
+
+def last_seen_event(request):
+    # Sent by EventSource when it reconnects; ?after= on the first connection
+    value = request.headers.get('Last-Event-ID') or request.GET.get('after') or 0
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
@@ -5,6 +5,7 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 import os
+import shlex
 
 
 # Quick-start development settings - unsuitable for production
@@ -153,6 +154,150 @@ if os.environ.get("VERCEL_ENV") == "production":
     PHONEPE_ENV = "PRODUCTION"
 else:
     PHONEPE_ENV = "SANDBOX"
+# Serve run_code, submit_code and the PhonePe status views as async views.
+# Turn on when running under ASGI (codeapt_site/asgi.py), e.g. uvicorn workers.
+USE_ASYNC_VIEWS = os.environ.get("USE_ASYNC_VIEWS", "0") == "1"
+
+# --- CODE EXECUTION (Arena + Daily Challenge) ---
+# 'piston' sends code to the public Piston API, 'local' runs it in sandboxed subprocesses
+CODE_EXECUTION_BACKEND = os.environ.get("CODE_EXECUTION_BACKEND", "piston")
+PISTON_API_URL = os.environ.get("PISTON_API_URL", "https://emkc.org/api/v2/piston")
+
+# Shared Piston client (core/gateway.py)
+PISTON_CONNECT_TIMEOUT = 3.05
+PISTON_READ_TIMEOUT = 20
+PISTON_MAX_RETRIES = 2                # Only for failures where the code never ran
+PISTON_POOL_SIZE = 20                 # Keep-alive connections per process
+PISTON_ASYNC_POOL_SIZE = 100          # Same, for the async views' httpx client
+PISTON_BREAKER_THRESHOLD = 5          # Consecutive failures before failing fast
+PISTON_BREAKER_RESET_SECONDS = 30
+PISTON_RUNTIMES_CACHE_SECONDS = 3600  # How long the /runtimes version list is reused
+PISTON_MAX_RUN_TIMEOUT_MS = 3000      # Highest run_timeout the Piston server accepts
+
+# Per-run limits for the local backend
+CODE_EXECUTION_LIMITS = {
+    "cpu_seconds": 2,
+    "wall_seconds": 5,
+    "memory_mb": 256,
+    "output_bytes": 64 * 1024,
+    "file_bytes": 1024 * 1024,
+    "processes": 128,
+    "compile_seconds": 15,
+}
+
+# Confinement of the local backend (core/sandbox.py). Without a sandbox user or command
+# the local backend is refused when CODE_SANDBOX_REQUIRED is on.
+CODE_SANDBOX_USER = os.environ.get("CODE_SANDBOX_USER")  # e.g. "codeapt-run"; the server must start as root
+CODE_SANDBOX_COMMAND = shlex.split(os.environ.get("CODE_SANDBOX_COMMAND", ""))  # e.g. "bwrap --unshare-all --die-with-parent ..."
+CODE_SANDBOX_REQUIRED = not DEBUG
+
+# Warm Python workers for the local backend (core/warm_pool.py); 0 turns the pool off.
+# Each worker is replaced after MAX_RUNS runs or any limit breach.
+CODE_EXECUTION_WARM_POOL_SIZE = int(os.environ.get("CODE_EXECUTION_WARM_POOL_SIZE", 0))
+CODE_EXECUTION_WARM_POOL_MAX_RUNS = 200
+
+# On-disk cache of compiled C / C++ / Java programs for the local backend (core/compile_cache.py).
+# Least recently used builds are evicted past MAX_MB; 0 turns the cache off.
+CODE_COMPILE_CACHE_DIR = os.environ.get("CODE_COMPILE_CACHE_DIR")  # None = <tmp>/codeapt-compile-cache
+CODE_COMPILE_CACHE_MAX_MB = int(os.environ.get("CODE_COMPILE_CACHE_MAX_MB", 256))
+
+# Output cap of streamed runs (run_code_stream, core/streaming.py). Chunks are forwarded
+# as they are read and not kept, so this can be larger than the buffered limit above.
+CODE_STREAM_OUTPUT_BYTES = 1024 * 1024
+
+# Shared Arena snippets (core/snippets.py)
+CODE_SNIPPET_MAX_BYTES = 64 * 1024  # Code + input of one snippet
+CODE_SNIPPET_ID_LENGTH = 8  # base62 characters of the content hash in share links
+
+# Max test cases of one Daily Challenge submission executed at the same time
+JUDGE_MAX_CONCURRENCY = int(os.environ.get("JUDGE_MAX_CONCURRENCY", 4))
+
+# Judge python/javascript submissions in one execution (harness runs every test input)
+JUDGE_BATCH_MODE = os.environ.get("JUDGE_BATCH_MODE", "1") == "1"
+JUDGE_BATCH_BUDGET_SECONDS = 2.5   # Stay under Piston's 3s run timeout; leftovers re-run per case
+
+# Async judging: submit_code queues a JudgeJob, `manage.py run_judge_workers` judges it
+JUDGE_ASYNC = os.environ.get("JUDGE_ASYNC", "0") == "1"
+JUDGE_JOB_MAX_ATTEMPTS = 3
+JUDGE_JOB_STALE_SECONDS = 300     # RUNNING longer than this = worker died, requeue
+JUDGE_JOB_RETRY_SECONDS = 2       # Executor down: wait this long, doubling per outage...
+JUDGE_JOB_MAX_RETRY_SECONDS = 120 # ...up to this, before the job can be claimed again
+
+# Live contest standings (challenges/contests.py). Each open standings page checks
+# for new events every POLL_SECONDS. With USE_ASYNC_VIEWS a stream stays open for
+# STREAM_SECONDS; the sync view answers with what is new and the browser reconnects.
+CONTEST_STREAM_POLL_SECONDS = 1
+CONTEST_STREAM_SECONDS = 60
+
+# Cached dashboard sections (core/dashboard.py). Writes clear the cache of the
+# process that made them, so the long TTL is only used with a shared cache backend;
+# with a per-process one (LocMemCache) other workers would show stale sections, and
+# sections expire after LOCAL_CACHE_SECONDS instead.
+DASHBOARD_CACHE_SECONDS = int(os.environ.get("DASHBOARD_CACHE_SECONDS", 300))
+DASHBOARD_LOCAL_CACHE_SECONDS = 5
+
+# Batched topic progress updates (core.views.sync_progress)
+PROGRESS_SYNC_MAX_UPDATES = 500         # Updates in one request
+PROGRESS_MAX_VIDEO_SECONDS = 24 * 3600  # Video heartbeat positions are clamped to this
+
+# Copied-solution detection (challenges/similarity.py)
+SIMILARITY_THRESHOLD = 0.7  # Estimated similarity (0-1) at which two submissions are flagged
+SIMILARITY_MIN_TOKENS = 20  # Shorter programs aren't indexed
+
+# Large test case inputs / expected outputs (challenges/testdata.py). Data over
+# INLINE_MAX_BYTES is gzipped into content-addressed files in TESTDATA_STORAGE (a
+# storage class; empty = DEFAULT_FILE_STORAGE), which must be persistent and shared
+# by every process that judges submissions: not the local disk on Vercel.
+TESTDATA_STORAGE = os.environ.get("TESTDATA_STORAGE", "cloudinary_storage.storage.RawMediaCloudinaryStorage")
+TESTDATA_INLINE_MAX_BYTES = int(os.environ.get("TESTDATA_INLINE_MAX_BYTES", 64 * 1024))
+
+# Result cache for code runs (core/run_cache.py). LocMemCache is per process and
+# evicts least recently used entries past MAX_ENTRIES; set CODE_RUN_CACHE_URL to a
+# Redis URL to share it between workers (needs the redis package; use allkeys-lru).
+CODE_RUN_CACHE_ENABLED = True
+CODE_RUN_CACHE_ALIAS = "code_runs"
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "code_runs": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "code-runs",
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 2000, "CULL_FREQUENCY": 10},
+    },
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+if os.environ.get("CODE_RUN_CACHE_URL"):
+    CACHES["code_runs"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CODE_RUN_CACHE_URL"],
+        "TIMEOUT": 60 * 60,
+    }
+    # Same Redis, so the rate limits are shared by every worker
+    CACHES["throttle"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CODE_RUN_CACHE_URL"],
+        "KEY_PREFIX": "throttle",
+    }
+
+# Admission control for run_code / submit_code (core/throttle.py).
+# Token buckets as (tokens per second, burst); a request takes one token from each.
+CODE_THROTTLE_ENABLED = os.environ.get("CODE_THROTTLE_ENABLED", "True") == "True"
+CODE_THROTTLE_CACHE_ALIAS = "throttle"
+CODE_THROTTLE_USER = (0.5, 10)  # Per logged-in user
+CODE_THROTTLE_IP = (1.0, 20)  # Per client IP (covers anonymous run_code calls)
+CODE_THROTTLE_GLOBAL = (20.0, 100)  # Whole site, sized to what the executor can take
+CODE_THROTTLE_MAX_IN_FLIGHT = int(os.environ.get("CODE_THROTTLE_MAX_IN_FLIGHT", 32))  # 0 = no in-flight cap
+# Behind a proxy REMOTE_ADDR is the proxy, so the client IP is read from the right-most
+# X-Forwarded-For entry (the one the proxy added). Only on when deployed behind one
+# (Vercel sets VERCEL=1): anywhere else clients could send any X-Forwarded-For they like.
+CODE_THROTTLE_TRUST_FORWARDED_FOR = os.environ.get("CODE_THROTTLE_TRUST_FORWARDED_FOR", os.environ.get("VERCEL", "0")) == "1"
+
 # Cloud name	
 # dsut5kquw
 # API key	
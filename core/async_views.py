@@ -0,0 +1,217 @@
+"""
+Async versions of the I/O-bound core views, used when settings.USE_ASYNC_VIEWS is on
+(serve with an ASGI server, e.g. `gunicorn codeapt_site.asgi:application -k uvicorn.workers.UvicornWorker`).
+
+While a view awaits Piston or PhonePe, the worker's event loop keeps serving other
+requests instead of pinning a thread per in-flight call.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth import get_user
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+
+from core import snippets
+from core.decorators import async_csrf_exempt, async_login_required
+from core.executor import aexecute
+from core.gateway import ExecutorUnavailable
+from core.streaming import arun_events, event_stream_response
+from core.throttle import admission_control
+from core.views import snippet_response
+from core.phonepe import get_phonepe_client
+from curriculum.models import Enrollment, Order
+
+
+@async_csrf_exempt
+@admission_control
+async def run_code(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            code = data.get('code', '')
+            language = data.get('language', 'python')
+            input_data = data.get('input', '')
+
+            result = await aexecute(snippet.language, code, input_data)
+            return JsonResponse({
+                'output': result['output'],
+                'compile_time_ms': result.get('compile_time_ms'),
+                'run_time_ms': result.get('run_time_ms'),
+            })
+
+        except ExecutorUnavailable as e:
+            response = JsonResponse({'output': f"Error: {str(e)} Please try again in a moment."}, status=503)
+            if e.retry_after:
+                response['Retry-After'] = str(e.retry_after)
+            return response
+        except Exception as e:
+            return JsonResponse({'output': f"Error: {str(e)}"}, status=500)
+
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+
+@async_csrf_exempt
+@admission_control
+async def run_code_stream(request):
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    return event_stream_response(arun_events(data.get('language', 'python'), data.get('code', ''), data.get('input', '')))
+
+
+@async_csrf_exempt
+@admission_control
+async def share_snippet(request):
+    """
+    Async version of views.share_snippet.
+    """
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        data = json.loads(request.body)
+        language = data.get('language', 'python')
+        code = data.get('code', '')
+        input_data = data.get('input', '')
+
+        # 1. Store (or find) the snippet
+        user = await sync_to_async(get_user)(request)
+        snippet, _ = await sync_to_async(snippets.store)(language, code, input_data, user)
+
+        # 2. Keep its output
+        if snippet.output is None:
+            result = await aexecute(snippet.language, code, input_data)
+            await sync_to_async(snippets.set_output)(snippet, result)
+    except snippets.SnippetTooLarge as e:
+        return JsonResponse({'error': str(e)}, status=413)
+    except snippets.InvalidSnippet as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except ExecutorUnavailable:
+        pass
+    except Exception as e:
+        return JsonResponse({'error': f"Error: {str(e)}"}, status=500)
+
+    return JsonResponse({'id': snippet.short_id, 'url': request.build_absolute_uri(reverse('arena_snippet', args=[snippet.short_id]))})
+
+
+async def snippet_detail(request, short_id):
+    data = await snippets.aload(short_id)
+    if data is None:
+        return JsonResponse({'error': 'Snippet not found'}, status=404)
+    return snippet_response(request, data)
+
+
+# --- PAYMENTS ---
+async def get_order_status(order_id):
+    """
+    The PhonePe SDK is blocking and has no async client, so the status call runs in a
+    worker thread (thread_sensitive=False lets many of them run at once).
+    """
+    client = await sync_to_async(get_phonepe_client, thread_sensitive=False)()
+    return await sync_to_async(client.get_order_status, thread_sensitive=False)(order_id)
+
+
+def set_transaction_id(order, status_response):
+    # payment_details is a LIST of attempts. We take the last one.
+    if status_response.payment_details:
+        last_attempt = status_response.payment_details[-1]
+        if hasattr(last_attempt, 'transaction_id'):
+            order.transaction_id = last_attempt.transaction_id
+        elif hasattr(last_attempt, 'payment_id'):
+            order.transaction_id = last_attempt.payment_id
+
+
+@async_csrf_exempt
+async def payment_callback(request, order_id):
+    """
+    Async version of views.payment_callback.
+    """
+    try:
+        print(f"\nCallback received for Order: {order_id}")
+
+        # 1. Ask PhonePe what happened
+        status_response = await get_order_status(order_id)
+        print(f"Callback Status Check: {status_response.state}")
+
+        # 2. Update Database
+        order = await Order.objects.select_related('user', 'subject').aget(order_id=order_id)
+
+        # Prevent duplicate enrollment if user refreshes page
+        if order.status == 'SUCCESS':
+            return redirect('dashboard')
+
+        if status_response.state == "COMPLETED":
+            order.status = 'SUCCESS'
+            set_transaction_id(order, status_response)
+            await order.asave()
+
+            # Enroll User
+            await Enrollment.objects.aget_or_create(user=order.user, subject=order.subject)
+
+            messages.success(request, f"Payment Successful! Enrolled in {order.subject.name}.")
+            return redirect('dashboard')
+
+        elif status_response.state == "FAILED":
+            order.status = 'FAILED'
+            await order.asave()
+            messages.error(request, "Payment Failed.")
+            return redirect('course_landing', slug=order.subject.slug)
+
+        else:
+            messages.warning(request, "Payment is processing. Check status in dashboard.")
+            return redirect('dashboard')
+
+    except Exception as e:
+        print(f"Callback Error: {e}")
+        messages.error(request, "Verification Error.")
+        return redirect('dashboard')
+
+
+@async_login_required(login_url='login')
+async def check_payment_status(request, order_id):
+    """
+    Async version of views.check_payment_status.
+    """
+    try:
+        # 1. Get the Order from DB
+        order = await Order.objects.select_related('user', 'subject').aget(order_id=order_id, user=request.user)
+
+        # If already successful, just redirect
+        if order.status == 'SUCCESS':
+            messages.info(request, "This order is already completed.")
+            return redirect('dashboard')
+
+        # 2. Ask PhonePe for Status
+        status_response = await get_order_status(order.order_id)
+        print(f"Manual Check Status: {status_response.state}")
+
+        # 3. Update Status
+        if status_response.state == "COMPLETED":
+            order.status = 'SUCCESS'
+            set_transaction_id(order, status_response)
+            await order.asave()
+
+            # 4. Enroll User
+            await Enrollment.objects.aget_or_create(user=order.user, subject=order.subject)
+
+            messages.success(request, f"Payment Verified! You are now enrolled in {order.subject.name}.")
+            return redirect('dashboard')
+
+        elif status_response.state == "FAILED":
+            order.status = 'FAILED'
+            await order.asave()
+            messages.error(request, "Payment Failed.")
+        else:
+            messages.warning(request, f"Payment is still {status_response.state}. Please try again in a moment.")
+
+    except Exception as e:
+        print(f"Manual Check Error: {e}")
+        messages.error(request, "Error checking payment status.")
+
+    return redirect('dashboard')
@@ -0,0 +1,137 @@
+"""
+On-disk cache of compiled C / C++ / Java submissions for the local backend.
+
+Key = sha256(language, compiler version, compile command with its flags, source).
+Each entry is a directory holding the artifacts (binary or .class files) and
+compile.json with the compiler's verdict, so code that doesn't compile isn't
+compiled again either. Entries are published with an atomic rename and evicted
+least recently used first once the store is over settings.CODE_COMPILE_CACHE_MAX_MB
+(a hit touches the entry's mtime).
+
+Compiles of the same key are serialized with a lock file, so the test cases of
+one submission, running in parallel, share a single compile.
+"""
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+META_FILE = 'compile.json'
+LOCK_STRIPES = 256
+
+
+def get_root():
+    return getattr(settings, 'CODE_COMPILE_CACHE_DIR', None) or os.path.join(tempfile.gettempdir(), 'codeapt-compile-cache')
+
+
+def is_enabled():
+    return getattr(settings, 'CODE_COMPILE_CACHE_MAX_MB', 256) > 0
+
+
+def make_key(language, version, command, source):
+    payload = json.dumps([language, version, command, source])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def lock(key):
+    """
+    Exclusive lock for one key (striped over LOCK_STRIPES files). flock works across
+    processes, and across threads too since every call opens its own file.
+    """
+    lock_dir = os.path.join(get_root(), 'locks')
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f'{int(key[:8], 16) % LOCK_STRIPES}.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def get(key):
+    """
+    The entry's compile.json (plus 'path'), or None on a miss.
+    """
+    path = os.path.join(get_root(), 'entries', key)
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        os.utime(path)  # Most recently used
+    except (OSError, ValueError):
+        return None
+    meta['path'] = path
+    return meta
+
+
+def put(key, build_dir, artifacts, meta):
+    """
+    Stores the files matching the `artifacts` glob from build_dir under `key`.
+    """
+    root = get_root()
+    entries = os.path.join(root, 'entries')
+    os.makedirs(entries, exist_ok=True)
+
+    staging = tempfile.mkdtemp(prefix='tmp-', dir=root)
+    try:
+        if meta['status'] == 'OK':
+            for artifact in glob.glob(os.path.join(build_dir, artifacts)):
+                shutil.copy2(artifact, staging)
+        with open(os.path.join(staging, META_FILE), 'w') as f:
+            json.dump(meta, f)
+        os.rename(staging, os.path.join(entries, key))
+    except OSError:
+        # Already stored by another process (or the disk is full): keep what's there
+        shutil.rmtree(staging, ignore_errors=True)
+        return
+    evict()
+
+
+def copy_artifacts(entry, workdir):
+    """
+    Copies a cached entry's artifacts into a run directory. False if it was evicted meanwhile.
+    """
+    try:
+        for name in os.listdir(entry['path']):
+            if name != META_FILE:
+                shutil.copy2(os.path.join(entry['path'], name), workdir)
+    except OSError:
+        return False
+    return True
+
+
+def evict():
+    """
+    Removes least recently used entries until the store fits in CODE_COMPILE_CACHE_MAX_MB.
+    """
+    max_bytes = getattr(settings, 'CODE_COMPILE_CACHE_MAX_MB', 256) * 1024 * 1024
+    entries_dir = os.path.join(get_root(), 'entries')
+
+    entries = []
+    total = 0
+    with os.scandir(entries_dir) as scan:
+        for entry in scan:
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+            except OSError:
+                continue
+            total += size
+
+    for _mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        # Rename first so readers see a clean miss instead of a half-deleted entry
+        doomed = os.path.join(get_root(), f'evicted-{os.path.basename(path)}-{os.getpid()}')
+        try:
+            os.rename(path, doomed)
+        except OSError:
+            continue
+        shutil.rmtree(doomed, ignore_errors=True)
+        total -= size
@@ -0,0 +1,174 @@
+"""
+Data for the student dashboard, computed in a fixed number of queries however
+many courses the user is enrolled in.
+
+The dashboard page is a shell; each section is fetched separately and its HTML
+is cached per user until a write to the data behind it (receivers at the bottom),
+for at most cache_seconds().
+"""
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+from django.template.loader import render_to_string
+
+from challenges.models import UserStreak
+from curriculum.models import Enrollment, JobApplication, Order, QuizSubmission, SubjectProgress, Topic, TopicProgress
+from curriculum.quiz_stats import get_stats
+
+
+def count_subquery(queryset, group_by):
+    """
+    COUNT(*) of a correlated queryset, as an annotation (0 when there are no rows).
+    """
+    counts = queryset.order_by().values(group_by).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def course_progress(user):
+    """
+    [{'subject', 'progress', 'completed', 'total', 'last_topic', 'next_topic'}, ...] for every
+    enrollment, in one query.
+    """
+    enrollments = Enrollment.objects.filter(user=user).select_related(
+        'subject__program', 'last_topic', 'next_topic',
+    ).defer('last_topic__content', 'next_topic__content').annotate(
+        total_topics=count_subquery(Topic.objects.filter(subject=OuterRef('subject')), 'subject'),
+        # Kept up to date on every toggle, so no scan of TopicProgress
+        completed_topics=Coalesce(
+            Subquery(SubjectProgress.objects.filter(user=user, subject=OuterRef('subject')).values('completed_count')[:1]),
+            Value(0),
+        ),
+    )
+    return [
+        {
+            'subject': enrollment.subject,
+            'progress': int(enrollment.completed_topics / enrollment.total_topics * 100) if enrollment.total_topics else 0,
+            'completed': enrollment.completed_topics,
+            'total': enrollment.total_topics,
+            'last_topic': enrollment.last_topic,
+            'next_topic': enrollment.next_topic,
+        }
+        for enrollment in enrollments
+    ]
+
+
+def quiz_summary(user):
+    """
+    (quizzes attempted, average percentage), from the user's running totals
+    (curriculum/quiz_stats.py): one primary-key lookup.
+    """
+    stats = get_stats(user)
+    return stats.attempts, stats.average
+
+
+def streak_context(user):
+    streak, created = UserStreak.objects.get_or_create(user=user)
+    return {'streak': streak}
+
+
+def stats_context(user):
+    total_tests_attempted, avg_score = quiz_summary(user)
+    return {
+        'total_lessons_completed': sum(item['completed'] for item in course_progress(user)),
+        'total_tests_attempted': total_tests_attempted,
+        'avg_score': avg_score,
+    }
+
+
+def orders_context(user):
+    return {'pending_orders': list(Order.objects.filter(user=user, status='PENDING').select_related('subject'))}
+
+
+def courses_context(user):
+    return {'course_data': course_progress(user)}
+
+
+def applications_context(user):
+    return {'my_applications': list(JobApplication.objects.filter(user=user).select_related('job').order_by('-applied_at'))}
+
+
+# name -> context function; the template is core/dashboard/<name>.html
+SECTIONS = {
+    'streak': streak_context,
+    'stats': stats_context,
+    'orders': orders_context,
+    'courses': courses_context,
+    'applications': applications_context,
+}
+
+
+def section_key(user_id, name):
+    return f'dashboard:{user_id}:{name}'
+
+
+def cache_seconds():
+    """
+    How long a section stays cached. A write only clears the cache of the process that
+    made it, so with a per-process backend the other workers could show stale sections:
+    there they expire after settings.DASHBOARD_LOCAL_CACHE_SECONDS instead.
+    """
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        return settings.DASHBOARD_LOCAL_CACHE_SECONDS
+    return settings.DASHBOARD_CACHE_SECONDS
+
+
+def render_section(user, name):
+    """
+    HTML of one dashboard section, from the cache when nothing behind it changed.
+    """
+    if name not in SECTIONS:
+        raise Http404("Unknown dashboard section")
+    key = section_key(user.pk, name)
+    html = cache.get(key)
+    if html is None:
+        # No request: the cached HTML must not carry anything request-specific (CSRF token etc.)
+        html = render_to_string(f'core/dashboard/{name}.html', SECTIONS[name](user))
+        cache.set(key, html, cache_seconds())
+    return html
+
+
+def invalidate(user_id, *names):
+    cache.delete_many([section_key(user_id, name) for name in names])
+
+
+# model -> sections that show its rows
+INVALIDATES = {
+    TopicProgress: ('stats', 'courses'),
+    SubjectProgress: ('stats', 'courses'),
+    Enrollment: ('stats', 'courses'),
+    QuizSubmission: ('stats',),
+    Order: ('orders',),
+    JobApplication: ('applications',),
+    UserStreak: ('streak',),
+}
+
+
+def invalidate_sections(sender, instance, **kwargs):
+    # After commit, or a request could cache the old rows again before they change
+    user_id, names = instance.user_id, INVALIDATES[sender]
+    transaction.on_commit(lambda: invalidate(user_id, *names))
+
+
+def invalidate_subject_sections(sender, instance, created=True, **kwargs):
+    # A topic added to or removed from a course changes everyone's totals in it
+    if not created:
+        return
+    subject_id = instance.subject_id
+
+    def invalidate_enrolled():
+        user_ids = Enrollment.objects.filter(subject_id=subject_id).values_list('user_id', flat=True)
+        cache.delete_many([section_key(user_id, name) for user_id in user_ids for name in ('stats', 'courses')])
+    transaction.on_commit(invalidate_enrolled)
+
+
+for model in INVALIDATES:
+    post_save.connect(invalidate_sections, sender=model)
+    post_delete.connect(invalidate_sections, sender=model)
+post_save.connect(invalidate_subject_sections, sender=Topic)
+post_delete.connect(invalidate_subject_sections, sender=Topic)
@@ -0,0 +1,794 @@
+"""
+Code execution backends shared by the Arena (run_code) and the Daily Challenge judge.
+
+The backend is picked with settings.CODE_EXECUTION_BACKEND:
+    'piston' -> public Piston API (default)
+    'local'  -> subprocesses on this machine (needs the compilers installed). Only a
+                sandbox with settings.CODE_SANDBOX_USER and/or CODE_SANDBOX_COMMAND
+                (core/sandbox.py); without either it is refused unless DEBUG is on.
+
+Every backend returns the same dict, so the views don't care which one is active:
+    {'output': '...', 'status': 'OK' | 'CE' | 'RE' | 'TLE' | 'MLE' | 'OLE', 'exit_code': 0,
+     'compile_time_ms': ..., 'run_time_ms': ..., 'memory_kb': ...}   (None when the backend doesn't report it)
+
+Callers can tighten the limits of a single run with `limits` (same keys as DEFAULT_LIMITS),
+e.g. the Daily Challenge judge passes each test case's time / memory / output limit.
+
+`stdin` is a str, or stored data with a `sha256` and an `open()` returning a binary
+stream (challenges/testdata.py). The local backend streams stored data into the
+program; Piston needs it in the request body, so it is read into memory there.
+"""
+import codecs
+import os
+import re
+import resource
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core import compile_cache, run_cache, warm_pool
+from core.sandbox import check_sandbox, popen_options, sandbox_options
+from core.gateway import get_async_gateway, get_gateway
+
+# Frontend language -> Piston runtime (version is the fallback if /runtimes can't be read)
+LANGUAGES = {
+    'python': {'language': 'python', 'version': '3.10.0'},
+    'java': {'language': 'java', 'version': '15.0.2'},
+    'cpp': {'language': 'c++', 'version': '10.2.0'},
+    'c': {'language': 'c', 'version': '10.2.0'},
+    'javascript': {'language': 'javascript', 'version': '18.15.0'},
+}
+
+# The Arena editor sends Ace mode names, not our keys
+LANGUAGE_ALIASES = {
+    'c_cpp': 'cpp',
+    'c++': 'cpp',
+    'js': 'javascript',
+}
+
+DEFAULT_LIMITS = {
+    'cpu_seconds': 2,         # CPU time per run
+    'wall_seconds': 5,        # Real time per run (catches sleep / blocked reads)
+    'memory_mb': 256,         # Address space for native programs, heap for JVM / V8
+    'output_bytes': 64 * 1024,  # Combined stdout + stderr sent back to the user
+    'file_bytes': 1024 * 1024,  # Largest file a program may write in its sandbox dir
+    'processes': 128,         # RLIMIT_NPROC: processes + threads of the user running the code
+    'compile_seconds': 15,
+}
+
+
+# What runtimes print when an allocation fails under the memory limit
+MEMORY_ERRORS = re.compile(
+    r'MemoryError|std::bad_alloc|OutOfMemoryError|heap out of memory|Cannot allocate memory'
+)
+
+
+def normalize_language(language):
+    """
+    Maps whatever the frontend sent to one of our LANGUAGES keys (Python if unknown).
+    """
+    language = (language or '').strip().lower()
+    language = LANGUAGE_ALIASES.get(language, language)
+    return language if language in LANGUAGES else 'python'
+
+
+def get_limits(**overrides):
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(getattr(settings, 'CODE_EXECUTION_LIMITS', {}))
+    limits.update({k: v for k, v in overrides.items() if v is not None})
+    return limits
+
+
+def make_result(output, status='OK', exit_code=0, compile_time_ms=None, run_time_ms=None, memory_kb=None):
+    return {
+        'output': output,
+        'status': status,
+        'exit_code': exit_code,
+        'compile_time_ms': compile_time_ms,
+        'run_time_ms': run_time_ms,
+        'memory_kb': memory_kb,  # Peak resident memory of the run
+    }
+
+
+STDIN_CHUNK_SIZE = 64 * 1024
+
+# Characters of streamed output kept to classify the exit (memory errors print at the end)
+STREAM_TAIL_CHARS = 4096
+
+# How often a program that closed its output is checked for having exited
+EXIT_POLL_SECONDS = 0.01
+
+
+def stdin_key(stdin):
+    # Stored data is identified by its checksum (no need to read it)
+    return stdin if isinstance(stdin, str) else f'sha256:{stdin.sha256}'
+
+
+def read_stdin(stdin):
+    if isinstance(stdin, str):
+        return stdin
+    with stdin.open() as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+def elapsed_ms(started):
+    return int((time.perf_counter() - started) * 1000)
+
+
+def is_memory_error(output):
+    return bool(MEMORY_ERRORS.search(output or ''))
+
+
+class ExecutionBackend:
+    """
+    Base class for code runners. Subclasses implement run().
+    """
+    name = None
+
+    def run(self, language, code, stdin='', limits=None):
+        raise NotImplementedError
+
+    def prepare(self, language, code):
+        """
+        Compiles `code` ahead of several runs of it, so they share one compile.
+        Returns a result dict: 'CE' with the compiler output, otherwise 'OK'.
+        Backends without a separate compile step have nothing to do.
+        """
+        return make_result('')
+
+    def stream(self, language, code, stdin='', limits=None):
+        """
+        Generator: yields the output (str chunks) while the program runs and returns
+        the result dict, with 'output' left empty, when it ends.
+        Backends that can't stream send the whole output as one chunk.
+        """
+        result = self.run(language, code, stdin, limits)
+        if result['output']:
+            yield result['output']
+        return dict(result, output='')
+
+    def version(self, language):
+        """Runtime version used for `language` (part of the result cache key)."""
+        return ''
+
+
+# --- PISTON (Free Public API) ---
+class PistonBackend(ExecutionBackend):
+    name = 'piston'
+
+    def version(self, language):
+        # Use whatever version the executor has installed; LANGUAGES is only the fallback
+        config = LANGUAGES[normalize_language(language)]
+        return get_gateway().resolve_version(config['language'], default=config['version'])
+
+    def run(self, language, code, stdin='', limits=None):
+        config = LANGUAGES[normalize_language(language)]
+        result = get_gateway().execute(
+            config['language'], self.version(language), [{"content": code}], read_stdin(stdin), **self.run_limits(limits)
+        )
+        return self.parse_response(result, limits)
+
+    @staticmethod
+    def run_limits(limits):
+        """
+        Piston's run_timeout (ms) / run_memory_limit (bytes) for a `limits` override.
+        run_timeout is capped at what the server accepts (settings.PISTON_MAX_RUN_TIMEOUT_MS).
+        """
+        limits = limits or {}
+        options = {}
+        if limits.get('wall_seconds'):
+            options['run_timeout'] = min(
+                int(limits['wall_seconds'] * 1000), getattr(settings, 'PISTON_MAX_RUN_TIMEOUT_MS', 3000)
+            )
+        if limits.get('memory_mb'):
+            options['run_memory_limit'] = limits['memory_mb'] * 1024 * 1024
+        return options
+
+    @staticmethod
+    def parse_response(result, limits=None):
+        """
+        Converts Piston's JSON response into our result dict.
+        """
+        # A failed compile comes back without a usable 'run' stage
+        compile_stage = result.get('compile') or {}
+        compile_time_ms = compile_stage.get('wall_time')  # Only reported by newer Piston versions
+        if compile_stage.get('code'):
+            return make_result(compile_stage.get('output', ''), 'CE', compile_stage.get('code'), compile_time_ms)
+
+        run = result.get('run', {})
+        output = run.get('output', '')
+        exit_code = run.get('code')
+        # Newer Piston versions say why a run was stopped: TO = timeout, OL / EL = output limit
+        if run.get('status') == 'TO' or run.get('signal') == 'SIGKILL':
+            status = 'TLE'
+        elif run.get('status') in ('OL', 'EL'):
+            status = 'OLE'
+        elif exit_code:
+            status = 'MLE' if is_memory_error(output) else 'RE'
+        else:
+            status = 'OK'
+
+        # Piston has no per-request output cap, so apply ours here
+        max_output = (limits or {}).get('output_bytes')
+        if max_output and len(output.encode('utf-8')) > max_output:
+            output = output.encode('utf-8')[:max_output].decode('utf-8', errors='replace')
+            status = 'OLE'
+        if status == 'OLE':
+            output += "\n[Output limit exceeded]"
+        memory_kb = run['memory'] // 1024 if run.get('memory') is not None else None
+        return make_result(output, status, exit_code, compile_time_ms, run.get('wall_time'), memory_kb)
+
+
+# --- LOCAL SANDBOX ---
+class LocalBackend(ExecutionBackend):
+    """
+    Runs submissions in a throwaway directory as a child process with rlimits, as the
+    sandbox user and inside the sandbox command when configured (core/sandbox.py).
+    Java and Node reserve huge virtual address ranges at startup, so for them the
+    memory limit is passed to the runtime instead of RLIMIT_AS.
+    Compiled programs are reused from core/compile_cache.py when the same source was
+    built before.
+    """
+    name = 'local'
+
+    TOOLCHAINS = {
+        'python': {
+            'source': 'main.py',
+            'run': [sys.executable, '-I', '-S', 'main.py'],
+            'version': [sys.executable, '--version'],
+        },
+        'c': {
+            'source': 'main.c',
+            'compile': ['gcc', '-O2', '-std=c11', '-o', 'main', 'main.c', '-lm'],
+            'artifacts': 'main',
+            'run': ['./main'],
+            'version': ['gcc', '-dumpfullversion'],
+        },
+        'cpp': {
+            'source': 'main.cpp',
+            'compile': ['g++', '-O2', '-std=c++17', '-o', 'main', 'main.cpp'],
+            'artifacts': 'main',
+            'run': ['./main'],
+            'version': ['g++', '-dumpfullversion'],
+        },
+        'java': {
+            'source': '{class_name}.java',
+            'compile': ['javac', '{class_name}.java'],
+            'artifacts': '*.class',
+            'run': ['java', '-Xmx{memory_mb}m', '-Xss64m', '{class_name}'],
+            'version': ['javac', '-version'],
+            'native_memory_limit': False,
+        },
+        'javascript': {
+            'source': 'main.js',
+            'run': ['node', '--max-old-space-size={memory_mb}', 'main.js'],
+            'version': ['node', '--version'],
+            'native_memory_limit': False,
+        },
+    }
+
+    def __init__(self):
+        self._versions = {}
+
+    def version(self, language):
+        language = normalize_language(language)
+        if language not in self._versions:
+            try:
+                completed = subprocess.run(self.TOOLCHAINS[language]['version'], capture_output=True, text=True, timeout=10)
+                lines = (completed.stdout or completed.stderr).strip().splitlines()
+                self._versions[language] = lines[0] if lines else ''
+            except (OSError, subprocess.TimeoutExpired):
+                return ''
+        return self._versions[language]
+
+    def run(self, language, code, stdin='', limits=None):
+        language = normalize_language(language)
+        toolchain = self.TOOLCHAINS[language]
+        limits = get_limits(**(limits or {}))
+
+        values = {
+            'class_name': self._java_class_name(code) if language == 'java' else 'Main',
+            'memory_mb': limits['memory_mb'],
+        }
+
+        # Python goes to a warm worker when the pool is on
+        # (The worker gets stdin inside its request message, so stored data runs cold)
+        if language == 'python' and isinstance(stdin, str):
+            result = self._run_warm(code, stdin, limits)
+            if result is not None:
+                return result
+
+        workdir = self._make_workdir('codeapt-run-')
+        compile_time_ms = None
+        try:
+            source = toolchain['source'].format(**values)
+            with open(os.path.join(workdir, source), 'w') as f:
+                f.write(code)
+
+            # 1. Compile (C / C++ / Java), or reuse an earlier build of the same source
+            if 'compile' in toolchain:
+                compiled = self._compile(language, code, values, limits, workdir)
+                if compiled['status'] != 'OK':
+                    return compiled
+                compile_time_ms = compiled['compile_time_ms']
+
+            # 2. Run
+            command = [part.format(**values) for part in toolchain['run']]
+            started = time.perf_counter()
+            output, status, exit_code, memory_kb = self._execute(
+                command, workdir, stdin, limits,
+                native_memory_limit=toolchain.get('native_memory_limit', True),
+            )
+            output, status, exit_code = self._label(output, status, exit_code)
+            return make_result(output, status, exit_code, compile_time_ms, elapsed_ms(started), memory_kb)
+
+        except FileNotFoundError as e:
+            # Compiler / interpreter missing on this machine
+            return make_result(f"Error: {language} is not available on this server ({e.filename})", 'RE', None)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def prepare(self, language, code):
+        language = normalize_language(language)
+        toolchain = self.TOOLCHAINS[language]
+        # Without the cache every run compiles for itself anyway
+        if 'compile' not in toolchain or not compile_cache.is_enabled():
+            return make_result('')
+
+        limits = get_limits()
+        values = {'class_name': self._java_class_name(code) if language == 'java' else 'Main'}
+        workdir = self._make_workdir('codeapt-build-')
+        try:
+            with open(os.path.join(workdir, toolchain['source'].format(**values)), 'w') as f:
+                f.write(code)
+            return self._compile(language, code, values, limits, workdir)
+        except FileNotFoundError as e:
+            return make_result(f"Error: {language} is not available on this server ({e.filename})", 'RE', None)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def stream(self, language, code, stdin='', limits=None):
+        language = normalize_language(language)
+        toolchain = self.TOOLCHAINS[language]
+        limits = get_limits(**(limits or {}))
+        values = {
+            'class_name': self._java_class_name(code) if language == 'java' else 'Main',
+            'memory_mb': limits['memory_mb'],
+        }
+
+        # With the warm pool on, Python skips the cold start instead of streaming:
+        # the output comes as one chunk when the run ends (within its wall limit)
+        if language == 'python' and isinstance(stdin, str):
+            result = self._run_warm(code, stdin, limits)
+            if result is not None:
+                if result['output']:
+                    yield result['output']
+                return dict(result, output='')
+
+        workdir = self._make_workdir('codeapt-run-')
+        compile_time_ms = None
+        process_output = None
+        try:
+            source = toolchain['source'].format(**values)
+            with open(os.path.join(workdir, source), 'w') as f:
+                f.write(code)
+
+            # 1. Compile; compiler errors come out as one chunk
+            if 'compile' in toolchain:
+                compiled = self._compile(language, code, values, limits, workdir)
+                if compiled['status'] != 'OK':
+                    yield compiled['output']
+                    return dict(compiled, output='')
+                compile_time_ms = compiled['compile_time_ms']
+
+            # 2. Run, passing chunks on as they are read
+            command = [part.format(**values) for part in toolchain['run']]
+            started = time.perf_counter()
+            process_output = self._stream_process(
+                command, workdir, stdin, limits,
+                native_memory_limit=toolchain.get('native_memory_limit', True),
+            )
+            # Incremental, so a character split across two reads isn't mangled
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            tail = ''  # End of the output, enough for _label() to spot a memory error
+            while True:
+                try:
+                    text = decoder.decode(next(process_output))
+                except StopIteration as done:
+                    status, exit_code, memory_kb = done.value
+                    break
+                if text:
+                    tail = (tail + text)[-STREAM_TAIL_CHARS:]
+                    yield text
+            text = decoder.decode(b'', final=True)
+            if text:
+                tail += text
+                yield text
+
+            # Limit notices ("[Time limit exceeded]") go out as a last chunk
+            labelled, status, exit_code = self._label(tail, status, exit_code)
+            if labelled[len(tail):]:
+                yield labelled[len(tail):]
+            return make_result('', status, exit_code, compile_time_ms, elapsed_ms(started), memory_kb)
+
+        except FileNotFoundError as e:
+            yield f"Error: {language} is not available on this server ({e.filename})"
+            return make_result('', 'RE', None)
+        finally:
+            if process_output is not None:
+                process_output.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _compile(self, language, code, values, limits, workdir):
+        """
+        Leaves the compiled program in workdir (the source must already be there).
+        Returns a result dict, 'OK' or 'CE'; compile_time_ms is 0 on a cache hit.
+        """
+        toolchain = self.TOOLCHAINS[language]
+        command = [part.format(**values) for part in toolchain['compile']]
+        if not compile_cache.is_enabled():
+            return self._build(command, workdir, limits)[0]
+
+        key = compile_cache.make_key(language, self.version(language), command, code)
+        # Parallel test cases of one submission wait here for the first one's compile
+        with compile_cache.lock(key):
+            entry = compile_cache.get(key)
+            if entry is None:
+                result, finished = self._build(command, workdir, limits)
+                # A compile that hit a time / output limit may pass next time, so don't keep it
+                if finished:
+                    compile_cache.put(key, workdir, toolchain['artifacts'], {
+                        'status': result['status'], 'output': result['output'], 'exit_code': result['exit_code'],
+                    })
+                return result
+
+        if entry['status'] != 'OK':
+            return make_result(entry['output'], 'CE', entry['exit_code'], 0)
+        if compile_cache.copy_artifacts(entry, workdir):
+            return make_result('', 'OK', 0, 0)
+        # Evicted between get() and the copy
+        return self._build(command, workdir, limits)[0]
+
+    def _build(self, command, workdir, limits):
+        """
+        Runs the compiler. Returns (result, finished): finished is False if it hit a limit.
+        """
+        started = time.perf_counter()
+        raw_output, raw_status, exit_code, _memory_kb = self._execute(
+            command, workdir, '', limits,
+            wall_seconds=limits['compile_seconds'],
+            cpu_seconds=limits['compile_seconds'],
+            native_memory_limit=False,
+        )
+        output, status, exit_code = self._label(raw_output, raw_status, exit_code)
+        status = 'OK' if status == 'OK' and exit_code == 0 else 'CE'
+        finished = raw_status == 'OK' and exit_code is not None and exit_code >= 0
+        return make_result(output, status, exit_code, elapsed_ms(started)), finished
+
+    def _run_warm(self, code, stdin, limits):
+        """
+        Runs Python on the warm pool (core/warm_pool.py). Returns None when the pool
+        is off or its worker failed, so the caller falls back to a cold start.
+        """
+        pool = warm_pool.get_pool()
+        if pool is None:
+            return None
+        started = time.perf_counter()
+        try:
+            output, status, exit_code, memory_kb = pool.run(code, stdin, limits)
+        except warm_pool.WorkerError:
+            return None
+        return make_result(*self._label(output, status, exit_code), run_time_ms=elapsed_ms(started), memory_kb=memory_kb)
+
+    @staticmethod
+    def _java_class_name(code):
+        match = re.search(r'public\s+(?:final\s+)?class\s+(\w+)', code)
+        return match.group(1) if match else 'Main'
+
+    @staticmethod
+    def _make_workdir(prefix):
+        workdir = tempfile.mkdtemp(prefix=prefix)
+        user = sandbox_options()['user']
+        if user is not None:
+            # The program (and compiler) write their files here as the sandbox user
+            os.chown(workdir, *user)
+        return workdir
+
+    @staticmethod
+    def _limit_process(limits, cpu_seconds, native_memory_limit):
+        """
+        Returns the preexec_fn that applies rlimits inside the child before exec.
+        """
+        def apply():
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            resource.setrlimit(resource.RLIMIT_FSIZE, (limits['file_bytes'], limits['file_bytes']))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+            # Stops fork bombs (not enforced for root: see core/sandbox.py)
+            resource.setrlimit(resource.RLIMIT_NPROC, (limits['processes'], limits['processes']))
+            if native_memory_limit:
+                memory = limits['memory_mb'] * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        return apply
+
+    def _execute(self, command, workdir, stdin, limits, **options):
+        """
+        Runs one command and returns the raw (output, status, exit_code, memory_kb);
+        the first three go through _label().
+        """
+        chunks = []
+        process_output = self._stream_process(command, workdir, stdin, limits, **options)
+        while True:
+            try:
+                chunks.append(next(process_output))
+            except StopIteration as done:
+                status, exit_code, memory_kb = done.value
+                break
+        return b''.join(chunks).decode('utf-8', errors='replace'), status, exit_code, memory_kb
+
+    def _stream_process(self, command, workdir, stdin, limits, wall_seconds=None, cpu_seconds=None, native_memory_limit=True):
+        """
+        Runs one command, yielding its output (bytes) as it is read, at most
+        limits['output_bytes'] in total; returns the raw (status, exit_code, memory_kb).
+        stdout and stderr share one pipe so the output is interleaved like Piston's.
+        The pipe is only read when the consumer asks for more, so a slow reader makes
+        the program block on write instead of us buffering its output.
+        Closing the generator early kills the program.
+        """
+        wall_seconds = wall_seconds or limits['wall_seconds']
+        cpu_seconds = cpu_seconds or limits['cpu_seconds']
+        max_output = limits['output_bytes']
+
+        # The child starts out with this process's resident pages (fork), and ru_maxrss keeps
+        # that mark across exec, so it only measures the program when it is above our peak
+        spawner_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        prefix, user_options = popen_options()
+        process = subprocess.Popen(
+            prefix + command,
+            cwd=workdir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env={'PATH': os.environ.get('PATH', '/usr/bin:/bin'), 'HOME': workdir, 'LANG': 'C.UTF-8'},
+            preexec_fn=self._limit_process(limits, cpu_seconds, native_memory_limit),
+            start_new_session=True,  # Own process group, so we can kill everything it spawns
+            **user_options,
+        )
+
+        # Feed stdin from a thread so a chatty program can't deadlock us
+        writer = threading.Thread(target=self._feed_stdin, args=(process, stdin), daemon=True)
+        writer.start()
+
+        received = 0
+        status = 'OK'
+        finished = False
+        wait_status = usage = None
+        deadline = time.monotonic() + wall_seconds
+
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ)
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        status = 'TLE'
+                        break
+                    if not selector.select(timeout=remaining):
+                        continue
+                    chunk = os.read(process.stdout.fileno(), 8192)
+                    if not chunk:
+                        finished = True
+                        break
+                    if received + len(chunk) > max_output:
+                        status = 'OLE'
+                        chunk = chunk[:max_output - received]
+                    received += len(chunk)
+                    if chunk:
+                        yield chunk
+                    if status == 'OLE':
+                        break
+
+            # End of output only means the program closed it: it may still be running
+            while finished:
+                # wait4 instead of wait(): also gives the program's peak memory (ru_maxrss, in KB)
+                pid, wait_status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid:
+                    break
+                wait_status = None
+                if time.monotonic() >= deadline:
+                    status = 'TLE'
+                    break
+                time.sleep(EXIT_POLL_SECONDS)
+        finally:
+            # Also reached on GeneratorExit when the consumer stops reading. Always kill the
+            # whole session: children left in the background go too
+            self._kill(process)
+            if wait_status is None:
+                _, wait_status, usage = os.wait4(process.pid, 0)
+            process.returncode = exit_code = os.waitstatus_to_exitcode(wait_status)
+            process.stdout.close()
+        return status, exit_code, usage.ru_maxrss if usage.ru_maxrss > spawner_kb else None
+
+    @staticmethod
+    def _label(output, status, exit_code):
+        """
+        Turns a raw (output, status, exit_code) into the final status and adds the limit notice.
+        """
+        if status == 'OK' and exit_code != 0:
+            # SIGXCPU is what RLIMIT_CPU sends when the soft limit is hit
+            if exit_code in (-signal.SIGXCPU, -signal.SIGKILL):
+                status = 'TLE'
+            else:
+                status = 'MLE' if is_memory_error(output) else 'RE'
+        if status == 'OLE':
+            output += "\n[Output limit exceeded]"
+        elif status == 'TLE':
+            output += "\n[Time limit exceeded]"
+        return output, status, exit_code
+
+    @staticmethod
+    def _feed_stdin(process, stdin):
+        try:
+            if isinstance(stdin, str):
+                if stdin:
+                    process.stdin.write(stdin.encode('utf-8'))
+            else:
+                # Stored data is copied through in chunks, never read whole
+                with stdin.open() as f:
+                    shutil.copyfileobj(f, process.stdin, STDIN_CHUNK_SIZE)
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            # Program exited (or closed stdin) before reading everything
+            pass
+
+    @staticmethod
+    def _kill(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+BACKENDS = {
+    PistonBackend.name: PistonBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+_instances = {}
+
+
+def get_backend():
+    """
+    Returns the backend configured in settings.CODE_EXECUTION_BACKEND.
+    """
+    name = getattr(settings, 'CODE_EXECUTION_BACKEND', 'piston')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown CODE_EXECUTION_BACKEND: {name}")
+    if name == LocalBackend.name:
+        check_sandbox()
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def execute(language, code, stdin='', use_cache=True, limits=None):
+    """
+    Runs code on the configured backend. Returns {'output': ..., 'status': ..., 'exit_code': ...}.
+    Identical (language, version, code, stdin, limits) runs are answered from the result cache.
+    """
+    backend = get_backend()
+    language = normalize_language(language)
+    stdin = stdin or ''
+
+    if not use_cache or not getattr(settings, 'CODE_RUN_CACHE_ENABLED', True):
+        return backend.run(language, code, stdin, limits)
+
+    key = run_cache.make_key(backend.name, language, backend.version(language), code, stdin_key(stdin), limits)
+    result = run_cache.get(key)
+    if result is None:
+        result = backend.run(language, code, stdin, limits)
+        if run_cache.is_cacheable(code, result):
+            run_cache.set(key, result)
+    return result
+
+
+def stream(language, code, stdin='', use_cache=True, limits=None):
+    """
+    Runs code on the configured backend, yielding the output as it is produced
+    (see ExecutionBackend.stream). A run found in the result cache is replayed as
+    a single chunk; a clean run is stored there once it has finished.
+    """
+    backend = get_backend()
+    language = normalize_language(language)
+    stdin = stdin or ''
+
+    if not use_cache or not getattr(settings, 'CODE_RUN_CACHE_ENABLED', True):
+        return backend.stream(language, code, stdin, limits)
+    return _cached_stream(backend, language, code, stdin, limits)
+
+
+def _cached_stream(backend, language, code, stdin, limits):
+    key = run_cache.make_key(backend.name, language, backend.version(language), code, stdin_key(stdin), limits)
+    result = run_cache.get(key)
+    if result is not None:
+        if result['output']:
+            yield result['output']
+        return dict(result, output='')
+
+    # The chunks are kept to store the whole output; limits['output_bytes'] caps them
+    chunks = []
+    run = backend.stream(language, code, stdin, limits)
+    try:
+        while True:
+            try:
+                chunk = next(run)
+            except StopIteration as done:
+                result = done.value
+                break
+            chunks.append(chunk)
+            yield chunk
+    finally:
+        run.close()
+
+    if run_cache.is_cacheable(code, result):
+        run_cache.set(key, dict(result, output=''.join(chunks)))
+    return result
+
+
+def prepare(language, code):
+    """
+    Compiles a submission once before it is run against several inputs (see ExecutionBackend.prepare).
+    """
+    return get_backend().prepare(normalize_language(language), code)
+
+
+async def aprepare(language, code):
+    backend = get_backend()
+    if isinstance(backend, PistonBackend):
+        # Piston compiles on every execute; nothing to do (and nothing blocking)
+        return backend.prepare(language, code)
+    return await sync_to_async(prepare, thread_sensitive=False)(language, code)
+
+
+async def aexecute(language, code, stdin='', use_cache=True, limits=None):
+    """
+    Async execute() for the async views. Piston calls go through the async gateway,
+    so no thread is held while waiting; the local sandbox is blocking subprocess
+    work and runs in a worker thread instead.
+    """
+    backend = get_backend()
+    if not isinstance(backend, PistonBackend):
+        return await sync_to_async(execute, thread_sensitive=False)(language, code, stdin, use_cache, limits)
+
+    language = normalize_language(language)
+    stdin = stdin or ''
+    config = LANGUAGES[language]
+    gateway = get_async_gateway()
+    version = await gateway.resolve_version(config['language'], default=config['version'])
+
+    use_cache = use_cache and getattr(settings, 'CODE_RUN_CACHE_ENABLED', True)
+    if use_cache:
+        key = run_cache.make_key(backend.name, language, version, code, stdin_key(stdin), limits)
+        result = await run_cache.aget(key)
+        if result is not None:
+            return result
+
+    if not isinstance(stdin, str):
+        stdin = await sync_to_async(read_stdin, thread_sensitive=False)(stdin)
+
+    result = PistonBackend.parse_response(
+        await gateway.execute(
+            config['language'], version, [{"content": code}], stdin, **PistonBackend.run_limits(limits)
+        ),
+        limits,
+    )
+    if use_cache and run_cache.is_cacheable(code, result):
+        await run_cache.aset(key, result)
+    return result
@@ -0,0 +1,399 @@
+"""
+Shared HTTP client for the Piston execution API.
+
+One pooled requests.Session per process (keep-alive instead of a new TLS handshake
+per run), explicit connect/read timeouts, budgeted retries and a circuit breaker
+that fails fast while the executor is down. AsyncPistonGateway does the same
+for the async views over httpx.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from django.conf import settings
+from django.core.cache import cache
+
+# Statuses where Piston never started the program, so sending it again is safe
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# httpx errors raised while connecting, before any of the request was sent
+ASYNC_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+RUNTIMES_CACHE_KEY = 'piston:runtimes'
+
+
+class ExecutorUnavailable(Exception):
+    """
+    Raised when the executor can't be reached (breaker open or retries used up).
+    """
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def never_sent(error):
+    """
+    True if a requests ConnectionError happened while connecting, so the program can't
+    have run. A connection dropped later (after the body went out) may have run it.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`. After that one trial call is let through (half-open): success
+    closes the breaker, failure opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            # OPEN, or HALF_OPEN with the trial call still in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """
+        The call was abandoned before it had an outcome (cancelled, client went away),
+        which says nothing about the executor. Only a half-open trial is ended: back to
+        OPEN without counting a failure, so the next call becomes the trial.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    @property
+    def retry_after(self):
+        """Seconds until the breaker lets a trial call through."""
+        remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+
+class RetryBudget:
+    """
+    Every request earns `ratio` of a retry token, every retry spends one. Retries stay a
+    small fraction of real traffic, so an outage doesn't multiply our own load on it.
+    """
+    def __init__(self, ratio=0.2, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class PistonGateway:
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=20, max_retries=2,
+                 backoff_seconds=0.25, pool_size=20, breaker=None, retry_budget=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+
+        # Retries are handled below, the adapter only pools connections
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise ExecutorUnavailable("Code runner is temporarily unavailable.", self.breaker.retry_after)
+
+        self.retry_budget.deposit()
+        url = f"{self.base_url}{path}"
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                except requests.exceptions.ReadTimeout:
+                    # The program may still be running there. Sending it again only adds load.
+                    self.breaker.record_failure()
+                    raise ExecutorUnavailable("Code runner timed out.")
+                except requests.exceptions.ConnectionError as e:
+                    if not never_sent(e):
+                        # Lost after the request went out: /execute may already have run it
+                        self.breaker.record_failure()
+                        raise ExecutorUnavailable("Lost the connection to code runner.") from e
+                    error = e
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        if response.status_code >= 500:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
+                        return response
+                    error = ExecutorUnavailable(f"Code runner returned {response.status_code}.")
+
+                # 429/502/503/504 or the connection couldn't be made: the program never ran
+                if attempt >= self.max_retries or not self.retry_budget.withdraw():
+                    self.breaker.record_failure()
+                    if isinstance(error, ExecutorUnavailable):
+                        raise error
+                    raise ExecutorUnavailable("Could not reach code runner.") from error
+
+                attempt += 1
+                time.sleep(self.backoff_seconds * (2 ** (attempt - 1)))
+        except ExecutorUnavailable:
+            raise  # Already recorded
+        except Exception:
+            # Anything else that went wrong (a broken response body, ...) is a failure
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (stop_on_failure, client disconnect): not the executor's fault,
+            # but a half-open trial must still end or it would never finish
+            self.breaker.record_cancelled()
+            raise
+
+    def execute(self, language, version, files, stdin='', run_timeout=None, run_memory_limit=None):
+        payload = _execute_payload(language, version, files, stdin, run_timeout, run_memory_limit)
+        return self._request('POST', '/execute', json=payload).json()
+
+    def runtimes(self):
+        """
+        Runtime list from /runtimes, cached in Django's cache (settings.PISTON_RUNTIMES_CACHE_SECONDS).
+        """
+        runtimes = cache.get(RUNTIMES_CACHE_KEY)
+        if runtimes is None:
+            runtimes = self._request('GET', '/runtimes').json()
+            cache.set(RUNTIMES_CACHE_KEY, runtimes, getattr(settings, 'PISTON_RUNTIMES_CACHE_SECONDS', 3600))
+        return runtimes
+
+    def resolve_version(self, language, default=None):
+        """
+        Newest installed version of a Piston language (matched by name or alias).
+        Falls back to `default` if the runtime list can't be fetched.
+        """
+        try:
+            runtimes = self.runtimes()
+        except (ExecutorUnavailable, ValueError):
+            return default
+        return _pick_version(runtimes, language, default)
+
+
+class AsyncPistonGateway:
+    """
+    asyncio twin of PistonGateway for the async views (httpx.AsyncClient).
+    Shares the breaker and retry budget with the sync gateway, so both see one
+    picture of the executor's health.
+    """
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=20, max_retries=2,
+                 backoff_seconds=0.25, pool_size=100, breaker=None, retry_budget=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+        # An AsyncClient belongs to the event loop it was created on
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._clients[loop] = client
+        return client
+
+    async def _request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise ExecutorUnavailable("Code runner is temporarily unavailable.", self.breaker.retry_after)
+
+        self.retry_budget.deposit()
+        url = f"{self.base_url}{path}"
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    response = await self._client().request(method, url, **kwargs)
+                except httpx.ReadTimeout:
+                    # The program may still be running there. Sending it again only adds load.
+                    self.breaker.record_failure()
+                    raise ExecutorUnavailable("Code runner timed out.")
+                except ASYNC_CONNECT_ERRORS as e:
+                    error = e
+                except httpx.TransportError as e:
+                    # Lost after the request went out: /execute may already have run it
+                    self.breaker.record_failure()
+                    raise ExecutorUnavailable("Lost the connection to code runner.") from e
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        if response.status_code >= 500:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
+                        return response
+                    error = ExecutorUnavailable(f"Code runner returned {response.status_code}.")
+
+                if attempt >= self.max_retries or not self.retry_budget.withdraw():
+                    self.breaker.record_failure()
+                    if isinstance(error, ExecutorUnavailable):
+                        raise error
+                    raise ExecutorUnavailable("Could not reach code runner.") from error
+
+                attempt += 1
+                await asyncio.sleep(self.backoff_seconds * (2 ** (attempt - 1)))
+        except ExecutorUnavailable:
+            raise  # Already recorded
+        except Exception:
+            # Anything else that went wrong (a broken response body, ...) is a failure
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (stop_on_failure, client disconnect): not the executor's fault,
+            # but a half-open trial must still end or it would never finish
+            self.breaker.record_cancelled()
+            raise
+
+    async def execute(self, language, version, files, stdin='', run_timeout=None, run_memory_limit=None):
+        payload = _execute_payload(language, version, files, stdin, run_timeout, run_memory_limit)
+        response = await self._request('POST', '/execute', json=payload)
+        return response.json()
+
+    async def runtimes(self):
+        runtimes = await cache.aget(RUNTIMES_CACHE_KEY)
+        if runtimes is None:
+            response = await self._request('GET', '/runtimes')
+            runtimes = response.json()
+            await cache.aset(RUNTIMES_CACHE_KEY, runtimes, getattr(settings, 'PISTON_RUNTIMES_CACHE_SECONDS', 3600))
+        return runtimes
+
+    async def resolve_version(self, language, default=None):
+        try:
+            runtimes = await self.runtimes()
+        except (ExecutorUnavailable, ValueError):
+            return default
+        return _pick_version(runtimes, language, default)
+
+
+def _execute_payload(language, version, files, stdin, run_timeout, run_memory_limit):
+    payload = {
+        "language": language,
+        "version": version,
+        "files": files,
+        "stdin": stdin
+    }
+    # Only sent when set, so Piston keeps its own defaults otherwise
+    if run_timeout is not None:
+        payload["run_timeout"] = run_timeout
+    if run_memory_limit is not None:
+        payload["run_memory_limit"] = run_memory_limit
+    return payload
+
+
+def _pick_version(runtimes, language, default):
+    """
+    Newest version among runtimes matching `language` by name or alias.
+    """
+    versions = [
+        runtime['version'] for runtime in runtimes
+        if runtime.get('language') == language or language in runtime.get('aliases', [])
+    ]
+    if not versions:
+        return default
+    return max(versions, key=_version_key)
+
+
+def _version_key(version):
+    return tuple(int(part) if part.isdigit() else 0 for part in str(version).split('.'))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """
+    Process-wide gateway, so every view shares one connection pool and one breaker.
+    """
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = PistonGateway(
+                    settings.PISTON_API_URL,
+                    connect_timeout=getattr(settings, 'PISTON_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=getattr(settings, 'PISTON_READ_TIMEOUT', 20),
+                    max_retries=getattr(settings, 'PISTON_MAX_RETRIES', 2),
+                    pool_size=getattr(settings, 'PISTON_POOL_SIZE', 20),
+                    breaker=CircuitBreaker(
+                        failure_threshold=getattr(settings, 'PISTON_BREAKER_THRESHOLD', 5),
+                        reset_seconds=getattr(settings, 'PISTON_BREAKER_RESET_SECONDS', 30),
+                    ),
+                )
+    return _gateway
+
+
+_async_gateway = None
+
+
+def get_async_gateway():
+    """
+    Process-wide async gateway, sharing breaker and retry budget with get_gateway().
+    """
+    global _async_gateway
+    if _async_gateway is None:
+        sync_gateway = get_gateway()
+        with _gateway_lock:
+            if _async_gateway is None:
+                _async_gateway = AsyncPistonGateway(
+                    settings.PISTON_API_URL,
+                    connect_timeout=getattr(settings, 'PISTON_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=getattr(settings, 'PISTON_READ_TIMEOUT', 20),
+                    max_retries=getattr(settings, 'PISTON_MAX_RETRIES', 2),
+                    pool_size=getattr(settings, 'PISTON_ASYNC_POOL_SIZE', 100),
+                    breaker=sync_gateway.breaker,
+                    retry_budget=sync_gateway.retry_budget,
+                )
+    return _async_gateway
@@ -0,0 +1,154 @@
+"""
+Compares sync (WSGI) and async (ASGI) concurrency for the executor-bound views.
+
+Starts a fake Piston server that answers /execute after --latency ms, then fires
+--requests calls at run_code:
+    sync  -> Django's WSGI handler on a pool of --threads threads (like gunicorn --threads)
+    async -> Django's ASGI handler, all requests on ONE event loop thread
+
+    python manage.py bench_async_views --requests 200 --threads 8 --latency 300
+
+The PhonePe views follow the same pattern (one awaited outbound call per request),
+so they scale the same way; they aren't benchmarked here because they need a
+real PhonePe sandbox.
+"""
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from core import async_views, gateway, views
+
+# Used as ROOT_URLCONF while the benchmark runs
+urlpatterns = [
+    path('sync/run_code/', views.run_code),
+    path('async/run_code/', async_views.run_code),
+]
+
+PAYLOAD = json.dumps({'code': 'print(1)', 'language': 'python', 'input': ''})
+
+
+def make_fake_piston(latency):
+    class FakePiston(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply([{'language': 'python', 'version': '3.10.0', 'aliases': ['py']}])
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            self._reply({'run': {'output': '1\n', 'code': 0}})
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        # The async run opens every connection at once; the default backlog of 5 drops them
+        request_queue_size = 1024
+
+    server = Server(('127.0.0.1', 0), FakePiston)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = "Benchmarks sync WSGI vs async ASGI concurrency of run_code against a fake slow executor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=8, help="Sync worker threads")
+        parser.add_argument('--latency', type=int, default=300, help="Fake executor latency in ms")
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        server = make_fake_piston(options['latency'] / 1000)
+
+        overrides = dict(
+            ROOT_URLCONF=__name__,
+            ALLOWED_HOSTS=['testserver'],
+            CODE_EXECUTION_BACKEND='piston',
+            CODE_RUN_CACHE_ENABLED=False,
+            PISTON_API_URL=f'http://127.0.0.1:{server.server_port}',
+            PISTON_POOL_SIZE=options['threads'],
+            PISTON_ASYNC_POOL_SIZE=total,
+            PISTON_MAX_RETRIES=0,
+            # Measure the views, not the admission control turning most of the burst away
+            CODE_THROTTLE_ENABLED=False,
+        )
+        try:
+            with override_settings(**overrides):
+                self._reset_gateways()
+                rows = [
+                    ('sync WSGI', f"{options['threads']} threads", *self.run_sync(total, options['threads'])),
+                    ('async ASGI', '1 event loop', *self.run_async(total)),
+                ]
+        finally:
+            self._reset_gateways()
+            server.shutdown()
+
+        self.stdout.write(f"\n{total} requests, executor latency {options['latency']} ms\n")
+        self.stdout.write(f"{'mode':<12}{'workers':<16}{'total s':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for mode, workers, elapsed, latencies in rows:
+            self.stdout.write(
+                f"{mode:<12}{workers:<16}{elapsed:>9.2f}{total / elapsed:>9.1f}"
+                f"{statistics.median(latencies):>9.0f}{_percentile(latencies, 95):>9.0f}"
+            )
+
+    @staticmethod
+    def _reset_gateways():
+        # Gateways read their settings once; rebuild them for (and after) the benchmark
+        gateway._gateway = None
+        gateway._async_gateway = None
+
+    def run_sync(self, total, threads):
+        local = threading.local()
+
+        def call(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            started = time.perf_counter()
+            response = local.client.post('/sync/run_code/', PAYLOAD, content_type='application/json')
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(call, range(total)))
+        return time.perf_counter() - started, latencies
+
+    def run_async(self, total):
+        async def call(client):
+            started = time.perf_counter()
+            response = await client.post('/async/run_code/', PAYLOAD, content_type='application/json')
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - started) * 1000
+
+        async def main():
+            client = AsyncClient()
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(call(client) for _ in range(total)))
+            return time.perf_counter() - started, list(latencies)
+
+        return asyncio.run(main())
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
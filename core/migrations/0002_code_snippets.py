@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSnippet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('short_id', models.CharField(max_length=43, unique=True)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('language', models.CharField(max_length=20)),
+                ('code', models.TextField()),
+                ('stdin', models.TextField(blank=True)),
+                ('output', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='snippets', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
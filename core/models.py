@@ -32,4 +32,23 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+
+class CodeSnippet(models.Model):
+    """
+    Arena code shared by link, stored once per distinct content (see core/snippets.py).
+    """
+    short_id = models.CharField(max_length=43, unique=True)
+    sha256 = models.CharField(max_length=64, unique=True)
+    language = models.CharField(max_length=20)
+    code = models.TextField()
+    stdin = models.TextField(blank=True)
+    # Result of running the snippet, set once; None until then
+    output = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=10, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='snippets')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Snippet {self.short_id} ({self.language})"
@@ -0,0 +1,96 @@
+"""
+Content-addressed cache of code run results.
+
+Key = sha256(backend, language, version, code, stdin, limits). Entries live in the Django
+cache alias settings.CODE_RUN_CACHE_ALIAS ('code_runs'), which is what makes them
+bounded (MAX_ENTRIES, least recently used culled first), expiring (TIMEOUT) and,
+with a shared backend like Redis, visible to every worker process.
+"""
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+
+HITS_KEY = 'run-cache:hits'
+MISSES_KEY = 'run-cache:misses'
+
+# Programs whose output can change between runs with the same stdin
+NONDETERMINISTIC = re.compile(
+    r'\b(random|randint|shuffle|uuid|urandom|secrets|time|datetime|Date|now|'
+    r'rand|srand|Random|nanoTime|currentTimeMillis|hrtime|performance|getpid|'
+    r'threading|Thread|pthread|fork|environ|getenv)\b'
+)
+
+
+def get_cache():
+    return caches[getattr(settings, 'CODE_RUN_CACHE_ALIAS', 'code_runs')]
+
+
+def make_key(backend, language, version, code, stdin, limits=None):
+    # Limits are part of the key: a run that passed under 5s may not pass under 1s
+    payload = json.dumps([backend, language, version, code, stdin, limits or {}], sort_keys=True)
+    return 'run:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_cacheable(code, result):
+    """
+    Only clean runs of code that doesn't touch clocks, randomness, threads or the
+    environment. Errors and limit breaches can be transient, so they are never stored.
+    """
+    if result.get('status') != 'OK' or result.get('exit_code') not in (0, None):
+        return False
+    return not NONDETERMINISTIC.search(code)
+
+
+def get(key):
+    result = get_cache().get(key)
+    _count(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+
+def set(key, result):
+    get_cache().set(key, result)
+
+
+async def aget(key):
+    result = await get_cache().aget(key)
+    await _acount(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+
+async def aset(key, result):
+    await get_cache().aset(key, result)
+
+
+def _count(counter):
+    cache = get_cache()
+    # incr() needs an existing key; add() is a no-op if another worker created it first
+    cache.add(counter, 0, timeout=None)
+    try:
+        cache.incr(counter)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(counter, 1, timeout=None)
+
+
+async def _acount(counter):
+    cache = get_cache()
+    await cache.aadd(counter, 0, timeout=None)
+    try:
+        await cache.aincr(counter)
+    except ValueError:
+        await cache.aset(counter, 1, timeout=None)
+
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+    }
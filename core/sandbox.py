@@ -0,0 +1,58 @@
+"""
+Confinement of the local execution backend (core/executor.py, core/warm_pool.py).
+
+rlimits alone don't make a sandbox: the program would still run as the web
+server's user, able to read the app's files (settings, credentials) and use the
+network. Two settings add the rest:
+
+    CODE_SANDBOX_USER     dedicated unprivileged account (name or uid) the code runs as.
+                          It can't read the app's files, and RLIMIT_NPROC (the fork bomb
+                          limit) only counts its own processes. The server has to start
+                          as root to switch users.
+    CODE_SANDBOX_COMMAND  command put in front of every run, e.g. bwrap / nsjail with no
+                          network, a private /tmp and a read-only view of the toolchains.
+
+Without either, the local backend is refused unless settings.CODE_SANDBOX_REQUIRED
+is off (it defaults to `not DEBUG`), so it is a development-only backend by default.
+"""
+import pwd
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def sandbox_options():
+    """
+    {'user': (uid, gid) or None, 'command': [...]} from the settings.
+    """
+    user = getattr(settings, 'CODE_SANDBOX_USER', None)
+    if user in (None, ''):
+        user = None
+    else:
+        entry = pwd.getpwuid(int(user)) if str(user).isdigit() else pwd.getpwnam(user)
+        user = (entry.pw_uid, entry.pw_gid)
+    return {'user': user, 'command': list(getattr(settings, 'CODE_SANDBOX_COMMAND', None) or [])}
+
+
+def popen_options():
+    """
+    (command prefix, subprocess.Popen keyword arguments) that start a process sandboxed.
+    """
+    options = sandbox_options()
+    if options['user'] is None:
+        return options['command'], {}
+    uid, gid = options['user']
+    return options['command'], {'user': uid, 'group': gid, 'extra_groups': []}
+
+
+def check_sandbox():
+    """
+    Raises ImproperlyConfigured when a sandbox is required but none is configured.
+    """
+    options = sandbox_options()
+    required = getattr(settings, 'CODE_SANDBOX_REQUIRED', not settings.DEBUG)
+    if required and options['user'] is None and not options['command']:
+        raise ImproperlyConfigured(
+            "The local execution backend runs code as the server's own user, with its files and network. "
+            "Set CODE_SANDBOX_USER and/or CODE_SANDBOX_COMMAND, or use the piston backend."
+        )
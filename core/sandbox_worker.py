@@ -0,0 +1,215 @@
+"""
+Warm Python worker used by core/warm_pool.py. Not imported by Django: the pool
+starts it as its own interpreter (`python -I -S core/sandbox_worker.py`), so it
+only uses the standard library and never inherits Django's threads or sockets.
+
+The worker imports the usual modules once, then loops over requests on stdin.
+For every request it forks a child that applies the rlimits and runs the
+submission as a fresh __main__ in its own temp directory. Forking an already
+started interpreter takes about a millisecond, against tens of milliseconds
+for a cold `python main.py`.
+
+Messages in both directions are a 4-byte big-endian length followed by JSON:
+    request: {"code": ..., "stdin": ..., "limits": {...}}
+    reply:   {"output": ..., "status": "OK" | "TLE" | "OLE", "exit_code": ..., "memory_kb": ...}
+"""
+import json
+import os
+import resource
+import selectors
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+import types
+
+# Modules most submissions import; loaded once here instead of in every run
+PRELOAD = (
+    'array', 'bisect', 'collections', 'copy', 'decimal', 'fractions', 'functools',
+    'heapq', 'itertools', 'math', 'operator', 're', 'statistics', 'string',
+)
+
+HEADER = struct.Struct('>I')
+
+# How often a child that closed its output is checked for having exited
+EXIT_POLL_SECONDS = 0.01
+
+
+def read_message(fd):
+    header = _read_exact(fd, HEADER.size)
+    if header is None:
+        return None
+    body = _read_exact(fd, HEADER.unpack(header)[0])
+    return None if body is None else json.loads(body)
+
+
+def write_message(fd, message):
+    body = json.dumps(message).encode('utf-8')
+    data = HEADER.pack(len(body)) + body
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_exact(fd, size):
+    data = b''
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def run_submission(code, workdir, limits):
+    """
+    Child side of the fork: fd 0 is the stdin file, fds 1 and 2 are the output pipe.
+    Never returns.
+    """
+    exit_code = 0
+    try:
+        os.chdir(workdir)
+        cpu_seconds = limits['cpu_seconds']
+        memory = limits['memory_mb'] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits['file_bytes'], limits['file_bytes']))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        # Stops fork bombs; counts per user, so the pool starts the worker as the sandbox user
+        resource.setrlimit(resource.RLIMIT_NPROC, (limits['processes'], limits['processes']))
+
+        sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+        sys.stdout = open(1, 'w', encoding='utf-8', closefd=False)
+        sys.stderr = open(2, 'w', encoding='utf-8', closefd=False, buffering=1)
+        sys.argv = ['main.py']
+
+        main = types.ModuleType('__main__')
+        main.__file__ = os.path.join(workdir, 'main.py')
+        sys.modules['__main__'] = main
+        exec(compile(code, 'main.py', 'exec'), main.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Same traceback a cold `python main.py` prints, minus this function's frame
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(exit_code & 0xFF)
+
+
+def handle(request):
+    """
+    Parent side: forks one child for the request and collects its output under
+    the wall clock and output limits.
+    """
+    limits = request['limits']
+    max_output = limits['output_bytes']
+    workdir = tempfile.mkdtemp(prefix='codeapt-warm-')
+    # Unlinked file, so the program doesn't see it in its directory
+    stdin_file = tempfile.TemporaryFile()
+    try:
+        stdin_file.write((request.get('stdin') or '').encode('utf-8'))
+        stdin_file.flush()
+        stdin_file.seek(0)
+        # Not executed from disk, but lets tracebacks show the source lines
+        with open(os.path.join(workdir, 'main.py'), 'w', encoding='utf-8') as f:
+            f.write(request['code'])
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.setsid()  # Own process group, so everything it spawns can be killed
+                os.dup2(stdin_file.fileno(), 0)
+                os.dup2(write_fd, 1)
+                os.dup2(write_fd, 2)
+                os.closerange(3, 1024)
+                run_submission(request['code'], workdir, limits)
+            finally:
+                # Never fall back into the worker loop from the child
+                os._exit(1)
+
+        os.close(write_fd)
+        chunks = []
+        received = 0
+        status = 'OK'
+        finished = False
+        wait_status = usage = None
+        deadline = time.monotonic() + limits['wall_seconds']
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(read_fd, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    status = 'TLE'
+                    break
+                if not selector.select(timeout=remaining):
+                    continue
+                chunk = os.read(read_fd, 8192)
+                if not chunk:
+                    finished = True
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+                if received > max_output:
+                    status = 'OLE'
+                    break
+
+        # End of output only means the child closed it: it may still be running
+        while finished:
+            reaped, wait_status, usage = os.wait4(pid, os.WNOHANG)
+            if reaped:
+                break
+            wait_status = None
+            if time.monotonic() >= deadline:
+                status = 'TLE'
+                break
+            time.sleep(EXIT_POLL_SECONDS)
+
+        # The child has its own session, so the pool killing the worker wouldn't reach
+        # it: kill it (and anything it left in the background) here, every time
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        if wait_status is None:
+            _, wait_status, usage = os.wait4(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(wait_status)
+        os.close(read_fd)
+
+        output = b''.join(chunks)[:max_output].decode('utf-8', errors='replace')
+        # Forked from the warm worker, so this includes the preloaded interpreter
+        return {'output': output, 'status': status, 'exit_code': exit_code, 'memory_kb': usage.ru_maxrss}
+    finally:
+        stdin_file.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    for name in PRELOAD:
+        __import__(name)
+
+    while True:
+        request = read_message(0)
+        if request is None:
+            # The pool closed our stdin: shut down
+            return
+        write_message(1, handle(request))
+
+
+if __name__ == '__main__':
+    main()
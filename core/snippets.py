@@ -0,0 +1,142 @@
+"""
+Shared Arena snippets (the Share button of arena.html).
+
+A snippet is stored once per distinct (language, code, stdin): its key is their
+sha256, and sharing the same code again returns the existing snippet. The language
+is normalized first, as execute() does, so 'Python' and 'python' are one snippet. The short
+ID in the link is the start of that hash in base62, lengthened only if two
+snippets would collide.
+
+A snippet never changes once it has its output (the result of running it,
+taken from the run cache when the code was just run), so it is cached with no
+expiry and served with immutable HTTP caching headers.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .executor import normalize_language
+from .models import CodeSnippet
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+class SnippetTooLarge(ValueError):
+    pass
+
+
+class InvalidSnippet(ValueError):
+    pass
+
+
+def snippet_hash(language, code, stdin):
+    payload = json.dumps([language, code, stdin])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def base62(sha256):
+    number = int(sha256, 16)
+    digits = []
+    while number:
+        number, digit = divmod(number, 62)
+        digits.append(ALPHABET[digit])
+    return ''.join(reversed(digits))
+
+
+def cache_key(short_id):
+    return f'snippet:{short_id}'
+
+
+def store(language, code, stdin='', user=None):
+    """
+    Returns (snippet, created). Identical content gets the existing snippet back.
+    """
+    if not all(isinstance(value, str) for value in (language, code, stdin)):
+        raise InvalidSnippet("Language, code and input must be text.")
+    language = normalize_language(language)
+    if len(code.encode('utf-8')) + len(stdin.encode('utf-8')) > settings.CODE_SNIPPET_MAX_BYTES:
+        raise SnippetTooLarge(f"Snippets are limited to {settings.CODE_SNIPPET_MAX_BYTES // 1024} KB.")
+
+    sha256 = snippet_hash(language, code, stdin)
+    snippet = CodeSnippet.objects.filter(sha256=sha256).first()
+    if snippet:
+        return snippet, False
+
+    encoded = base62(sha256)
+    length = settings.CODE_SNIPPET_ID_LENGTH
+    while True:
+        try:
+            # Savepoint: after an IntegrityError the caller's transaction must stay usable
+            with transaction.atomic():
+                snippet = CodeSnippet.objects.create(
+                    short_id=encoded[:length],
+                    sha256=sha256,
+                    language=language,
+                    code=code,
+                    stdin=stdin,
+                    created_by=user if user is not None and user.is_authenticated else None,
+                )
+            return snippet, True
+        except IntegrityError:
+            # Either the same content was shared concurrently, or another snippet has this prefix
+            snippet = CodeSnippet.objects.filter(sha256=sha256).first()
+            if snippet:
+                return snippet, False
+            length += 1
+
+
+def set_output(snippet, result):
+    """
+    Records the snippet's output, once. Only the first result is ever kept, so a
+    snippet that has an output is immutable.
+    """
+    CodeSnippet.objects.filter(pk=snippet.pk, output__isnull=True).update(
+        output=result['output'], status=result.get('status', ''),
+    )
+    snippet.refresh_from_db(fields=['output', 'status'])
+
+
+def to_dict(snippet):
+    return {
+        'id': snippet.short_id,
+        'language': snippet.language,
+        'code': snippet.code,
+        'input': snippet.stdin,
+        'output': snippet.output,
+        'status': snippet.status or None,
+        'created_at': snippet.created_at.isoformat(),
+    }
+
+
+def load(short_id):
+    """
+    The snippet as a dict, or None. Complete snippets are cached forever: they can't change.
+    """
+    data = cache.get(cache_key(short_id))
+    if data is not None:
+        return data
+
+    snippet = CodeSnippet.objects.filter(short_id=short_id).first()
+    if snippet is None:
+        return None
+    data = to_dict(snippet)
+    if snippet.output is not None:
+        cache.set(cache_key(short_id), data, None)
+    return data
+
+
+async def aload(short_id):
+    data = await cache.aget(cache_key(short_id))
+    if data is not None:
+        return data
+
+    snippet = await CodeSnippet.objects.filter(short_id=short_id).afirst()
+    if snippet is None:
+        return None
+    data = to_dict(snippet)
+    if snippet.output is not None:
+        await cache.aset(cache_key(short_id), data, None)
+    return data
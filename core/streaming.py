@@ -0,0 +1,78 @@
+"""
+Server-Sent Events for streamed code runs (the run_code_stream views).
+
+The response is a stream of events, each `data` being JSON:
+    event: output   "<next chunk of the program's output>"
+    event: done     {"status": ..., "exit_code": ..., "compile_time_ms": ..., "run_time_ms": ...}
+    event: error    "<message>"   (the run could not be completed)
+
+Chunks are forwarded as the executor reads them. Output is capped at
+settings.CODE_STREAM_OUTPUT_BYTES, which also bounds the copy kept to store a
+clean run in the result cache; a cached run is replayed as one output event
+followed by done.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from core.executor import stream
+from core.gateway import ExecutorUnavailable
+
+
+def format_event(event, data, event_id=None):
+    # With an id, a reconnecting EventSource sends it back as Last-Event-ID
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def run_events(language, code, stdin=''):
+    """
+    Generator of SSE strings for one run. Closing it (client went away) kills the program.
+    """
+    limits = {'output_bytes': getattr(settings, 'CODE_STREAM_OUTPUT_BYTES', 1024 * 1024)}
+    run = stream(language, code, stdin, limits=limits)
+    try:
+        while True:
+            try:
+                chunk = next(run)
+            except StopIteration as done:
+                result = done.value
+                break
+            yield format_event('output', chunk)
+    except ExecutorUnavailable as e:
+        yield format_event('error', f"Error: {e} Please try again in a moment.")
+        return
+    except Exception as e:
+        yield format_event('error', f"Error: {e}")
+        return
+    finally:
+        run.close()
+
+    result.pop('output', None)
+    yield format_event('done', result)
+
+
+async def arun_events(language, code, stdin=''):
+    """
+    run_events() as an async iterator. Under ASGI, Django 4.2 reads a sync iterator
+    to the end before sending anything, so the async views need this one.
+    """
+    events = run_events(language, code, stdin)
+    step = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            event = await step(events, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        await sync_to_async(events.close, thread_sensitive=False)()
+
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
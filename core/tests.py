@@ -1,3 +1,593 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import time
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from challenges.models import UserStreak
+from core import dashboard, executor, run_cache, snippets, throttle, views, warm_pool
+from core.streaming import format_event, run_events
+from core.gateway import AsyncPistonGateway, CircuitBreaker, ExecutorUnavailable, PistonGateway
+from core.models import CodeSnippet
+from curriculum.models import Enrollment, Program, QuizSubmission, Subject, SubjectProgress, Topic, TopicProgress
+from curriculum.progress import set_completed
+from curriculum.quiz_stats import record
+
+
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='pass')
+        UserStreak.objects.create(user=self.user)
+        self.program = Program.objects.create(name='Technical Training')
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def section(self, name):
+        return self.client.get(reverse('dashboard_section', args=[name]))
+
+    def enroll(self, name, topics, completed):
+        subject = Subject.objects.create(program=self.program, name=name)
+        created = [Topic.objects.create(subject=subject, name=f'{name} {i}', order=i) for i in range(topics)]
+        for topic in created[:completed]:
+            set_completed(self.user, topic, True)
+        Enrollment.objects.create(user=self.user, subject=subject)
+        return subject
+
+    def submit_quiz(self, subject, score, total_questions):
+        record(QuizSubmission.objects.create(user=self.user, subject=subject, score=score, total_questions=total_questions))
+
+    def test_course_progress_and_quiz_average(self):
+        self.enroll('Python', topics=4, completed=3)
+        self.enroll('Java', topics=0, completed=0)
+        # Another user's progress must not count
+        other = User.objects.create_user('other')
+        set_completed(other, Topic.objects.get(name='Python 3'), True)
+        python = Subject.objects.get(name='Python')
+        self.submit_quiz(python, score=2, total_questions=3)  # 66%
+        self.submit_quiz(python, score=1, total_questions=1)  # 100%
+        self.submit_quiz(python, score=0, total_questions=0)  # 0%
+
+        courses = self.section('courses')
+        stats = self.section('stats')
+
+        progress = {item['subject'].name: item for item in courses.context['course_data']}
+        self.assertEqual((progress['Python']['completed'], progress['Python']['total'], progress['Python']['progress']), (3, 4, 75))
+        self.assertEqual((progress['Java']['completed'], progress['Java']['total'], progress['Java']['progress']), (0, 0, 0))
+        self.assertEqual(stats.context['total_lessons_completed'], 3)
+        self.assertEqual(stats.context['total_tests_attempted'], 3)
+        self.assertEqual(stats.context['avg_score'], 55)
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.enroll('Python', topics=3, completed=1)
+        with CaptureQueriesContext(connection) as one_course:
+            self.section('courses')
+
+        for name in ('Java', 'C', 'Aptitude', 'SQL'):
+            self.enroll(name, topics=5, completed=2)
+        cache.clear()
+        with self.assertNumQueries(len(one_course)):
+            response = self.section('courses')
+        self.assertEqual(len(response.context['course_data']), 5)
+
+    def test_repeat_visit_reads_sections_from_cache(self):
+        python = self.enroll('Python', topics=3, completed=1)
+        for name in ('streak', 'stats', 'orders', 'courses', 'applications'):
+            self.section(name)
+
+        with CaptureQueriesContext(connection) as repeat:
+            self.assertContains(self.section('courses'), '1 / 3 Lessons Completed')
+        # Only the session and user lookups of login_required
+        self.assertFalse([q['sql'] for q in repeat if 'curriculum_' in q['sql'] or 'challenges_' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_completed(self.user, python.topics.get(order=1), True)
+        self.assertContains(self.section('courses'), '2 / 3 Lessons Completed')
+
+    def test_new_topic_updates_enrolled_users_totals(self):
+        python = self.enroll('Python', topics=2, completed=1)
+        self.assertContains(self.section('courses'), '1 / 2 Lessons Completed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            topic = Topic.objects.create(subject=python, name='Python 2', order=2)
+        self.assertContains(self.section('courses'), '1 / 3 Lessons Completed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            topic.delete()
+        self.assertContains(self.section('courses'), '1 / 2 Lessons Completed')
+
+    def test_per_process_cache_keeps_sections_briefly(self):
+        with self.settings(DASHBOARD_CACHE_SECONDS=300, DASHBOARD_LOCAL_CACHE_SECONDS=5):
+            self.assertEqual(dashboard.cache_seconds(), 5)
+            with mock.patch('core.dashboard.caches', {'default': mock.Mock()}):
+                self.assertEqual(dashboard.cache_seconds(), 300)
+
+    def test_resume_pointer_follows_progress(self):
+        python = self.enroll('Python', topics=3, completed=0)
+        first, second, third = python.topics.order_by('order')
+        enrollment = Enrollment.objects.get(user=self.user, subject=python)
+        self.assertEqual((enrollment.last_topic, enrollment.next_topic), (None, first))
+
+        set_completed(self.user, first, True)
+        set_completed(self.user, third, True)
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.last_topic, enrollment.next_topic), (third, second))
+        self.assertContains(self.section('courses'), reverse('topic_detail', args=[second.id]))
+
+        set_completed(self.user, second, True)
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.last_topic, enrollment.next_topic), (second, None))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_half_opens_after_reset(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.allow()), (CircuitBreaker.CLOSED, True))
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.allow()), (CircuitBreaker.OPEN, False))
+
+        with mock.patch('core.gateway.time.monotonic', return_value=breaker.opened_at + 30):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            # Only one trial call at a time
+            self.assertFalse(breaker.allow())
+
+    def test_half_open_trial_outcome(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def half_open_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.record_failure()
+        return breaker
+
+    def test_unexpected_error_ends_the_trial(self):
+        gateway = PistonGateway('http://piston.test', breaker=self.half_open_breaker())
+        with mock.patch.object(gateway.session, 'request', side_effect=requests.exceptions.ChunkedEncodingError):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                gateway.execute('python', '3.10.0', [{'content': 'print(1)'}])
+        self.assertEqual(gateway.breaker.state, CircuitBreaker.OPEN)
+        # Not stuck half-open: the next call is the new trial
+        self.assertTrue(gateway.breaker.allow())
+
+    def test_cancelled_async_trial_ends_the_trial(self):
+        gateway = AsyncPistonGateway('http://piston.test', breaker=self.half_open_breaker())
+        client = mock.Mock(request=mock.AsyncMock(side_effect=asyncio.CancelledError))
+        failures = gateway.breaker.failures
+        with mock.patch.object(gateway, '_client', return_value=client):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(gateway.execute('python', '3.10.0', [{'content': 'print(1)'}]))
+        # Back to OPEN without counting a failure; the next call is the new trial
+        self.assertEqual((gateway.breaker.state, gateway.breaker.failures), (CircuitBreaker.OPEN, failures))
+        self.assertTrue(gateway.breaker.allow())
+
+    def test_cancellations_are_not_failures(self):
+        gateway = AsyncPistonGateway('http://piston.test', breaker=CircuitBreaker(failure_threshold=2))
+        client = mock.Mock(request=mock.AsyncMock(side_effect=asyncio.CancelledError))
+        with mock.patch.object(gateway, '_client', return_value=client):
+            for _ in range(5):
+                with self.assertRaises(asyncio.CancelledError):
+                    asyncio.run(gateway.execute('python', '3.10.0', [{'content': 'print(1)'}]))
+        self.assertEqual((gateway.breaker.state, gateway.breaker.failures), (CircuitBreaker.CLOSED, 0))
+
+    def refused(self):
+        reason = NewConnectionError(None, 'Connection refused')
+        return requests.exceptions.ConnectionError(MaxRetryError(None, '/execute', reason))
+
+    def test_unavailable_after_retries_records_one_failure(self):
+        gateway = PistonGateway('http://piston.test', max_retries=1, backoff_seconds=0, breaker=CircuitBreaker(failure_threshold=5))
+        with mock.patch.object(gateway.session, 'request', side_effect=self.refused()) as request:
+            with self.assertRaises(ExecutorUnavailable):
+                gateway.execute('python', '3.10.0', [{'content': 'print(1)'}])
+        self.assertEqual((request.call_count, gateway.breaker.failures), (2, 1))
+
+    def test_connect_failure_is_retried(self):
+        gateway = PistonGateway('http://piston.test', max_retries=1, backoff_seconds=0)
+        ok = mock.Mock(status_code=200, json=mock.Mock(return_value={'run': {}}))
+        for error in (self.refused(), requests.exceptions.ConnectTimeout()):
+            with mock.patch.object(gateway.session, 'request', side_effect=[error, ok]) as request:
+                self.assertEqual(gateway.execute('python', '3.10.0', [{'content': 'print(1)'}]), {'run': {}})
+            self.assertEqual(request.call_count, 2)
+
+    def test_connection_lost_after_sending_is_not_retried(self):
+        # /execute may already have run the program
+        gateway = PistonGateway('http://piston.test', max_retries=2, backoff_seconds=0)
+        dropped = requests.exceptions.ConnectionError(ProtocolError('Connection aborted.'))
+        with mock.patch.object(gateway.session, 'request', side_effect=dropped) as request:
+            with self.assertRaises(ExecutorUnavailable):
+                gateway.execute('python', '3.10.0', [{'content': 'print(1)'}])
+        self.assertEqual(request.call_count, 1)
+
+    def test_async_connection_lost_after_sending_is_not_retried(self):
+        gateway = AsyncPistonGateway('http://piston.test', max_retries=2, backoff_seconds=0)
+        client = mock.Mock(request=mock.AsyncMock(side_effect=httpx.RemoteProtocolError('Server disconnected')))
+        with mock.patch.object(gateway, '_client', return_value=client):
+            with self.assertRaises(ExecutorUnavailable):
+                asyncio.run(gateway.execute('python', '3.10.0', [{'content': 'print(1)'}]))
+        self.assertEqual(client.request.call_count, 1)
+
+    def test_async_transport_error_is_retried(self):
+        gateway = AsyncPistonGateway('http://piston.test', max_retries=1, backoff_seconds=0)
+        response = httpx.Response(200, json={'run': {'output': '1\n'}})
+        client = mock.Mock(request=mock.AsyncMock(side_effect=[httpx.ConnectError('down'), response]))
+        with mock.patch.object(gateway, '_client', return_value=client):
+            self.assertEqual(asyncio.run(gateway.execute('python', '3.10.0', [{'content': 'print(1)'}])), {'run': {'output': '1\n'}})
+        self.assertEqual(gateway.breaker.state, CircuitBreaker.CLOSED)
+
+
+class RunCacheKeyTests(SimpleTestCase):
+    ARGS = ('local', 'python', '3.10', 'print(input())', '1', {'wall_seconds': 2, 'memory_mb': 256})
+
+    def test_same_run_same_key(self):
+        backend, language, version, code, stdin, limits = self.ARGS
+        reordered = {'memory_mb': 256, 'wall_seconds': 2}
+        self.assertEqual(run_cache.make_key(*self.ARGS), run_cache.make_key(backend, language, version, code, stdin, reordered))
+        self.assertEqual(run_cache.make_key(*self.ARGS[:5]), run_cache.make_key(*self.ARGS[:5], {}))
+
+    def test_every_part_is_in_the_key(self):
+        key = run_cache.make_key(*self.ARGS)
+        for index, other in enumerate(('piston', 'javascript', '3.11', 'print(2)', '2', {'wall_seconds': 1, 'memory_mb': 256})):
+            args = list(self.ARGS)
+            args[index] = other
+            self.assertNotEqual(run_cache.make_key(*args), key, args)
+
+    def test_parts_can_not_run_together(self):
+        # ('ab', 'c') and ('a', 'bc') must not collide
+        self.assertNotEqual(
+            run_cache.make_key('local', 'python', '3.10', 'print(1)\n', '', None),
+            run_cache.make_key('local', 'python', '3.10', 'print(1)', '\n', None),
+        )
+
+    def test_stored_stdin_is_keyed_by_checksum(self):
+        stored = mock.Mock(sha256='ab' * 32)
+        self.assertEqual(executor.stdin_key(stored), 'sha256:' + 'ab' * 32)
+        self.assertEqual(executor.stdin_key('1 2'), '1 2')
+
+    def test_only_clean_deterministic_runs_are_cached(self):
+        ok = {'status': 'OK', 'exit_code': 0}
+        self.assertTrue(run_cache.is_cacheable('print(1)', ok))
+        self.assertFalse(run_cache.is_cacheable('import random\nprint(random.random())', ok))
+        self.assertFalse(run_cache.is_cacheable('print(1)', {'status': 'TLE', 'exit_code': None}))
+        self.assertFalse(run_cache.is_cacheable('print(1)', {'status': 'OK', 'exit_code': 1}))
+
+    @override_settings(CODE_RUN_CACHE_ENABLED=True)
+    def test_execute_answers_a_repeat_from_the_cache(self):
+        backend = mock.Mock(version=mock.Mock(return_value='3.10'), run=mock.Mock(return_value={'output': '1\n', 'status': 'OK', 'exit_code': 0}))
+        backend.name = 'fake'
+        run_cache.get_cache().clear()
+        with mock.patch('core.executor.get_backend', return_value=backend):
+            first = executor.execute('python', 'print(1)')
+            second = executor.execute('python', 'print(1)')
+            executor.execute('python', 'print(1)', limits={'wall_seconds': 1})
+        self.assertEqual(first, second)
+        self.assertEqual(backend.run.call_count, 2)
+
+
+@override_settings(
+    CODE_THROTTLE_ENABLED=True, CODE_THROTTLE_USER=(1.0, 2), CODE_THROTTLE_IP=(1.0, 3),
+    CODE_THROTTLE_GLOBAL=(100.0, 100), CODE_THROTTLE_MAX_IN_FLIGHT=0,
+)
+class AdmissionControlTests(SimpleTestCase):
+    def setUp(self):
+        throttle.get_cache().clear()
+        self.now = 1_000_000
+        patcher = mock.patch('core.throttle.now_ms', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = mock.Mock(pk=1, is_authenticated=True)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([throttle.admit(self.user, '1.1.1.1') for _ in range(3)], [0, 0, 1])
+        self.now += 999
+        self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 1)
+        self.now += 1
+        self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 0)
+
+    def test_retry_after_counts_the_whole_wait(self):
+        with self.settings(CODE_THROTTLE_USER=(0.2, 1)):
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 0)
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 5)
+            self.now += 2500
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 3)
+
+    def test_refused_request_is_not_charged_to_the_other_buckets(self):
+        other = mock.Mock(pk=2, is_authenticated=True)
+        self.assertEqual([throttle.admit(self.user, '1.1.1.1') for _ in range(3)], [0, 0, 1])
+        # The IP bucket still has the token the refused request didn't use
+        self.assertEqual(throttle.admit(other, '1.1.1.1'), 0)
+        self.assertEqual(throttle.admit(other, '1.1.1.1'), 1)
+
+    def test_in_flight_cap(self):
+        with self.settings(CODE_THROTTLE_MAX_IN_FLIGHT=1, CODE_THROTTLE_USER=(100.0, 100), CODE_THROTTLE_IP=(100.0, 100)):
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 0)
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 1)
+            throttle.release()
+            self.assertEqual(throttle.admit(self.user, '1.1.1.1'), 0)
+
+    def test_client_ip_ignores_forwarded_entries_the_client_made_up(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 2.2.2.2')
+        with self.settings(CODE_THROTTLE_TRUST_FORWARDED_FOR=False):
+            self.assertEqual(throttle.client_ip(request), '10.0.0.1')
+        with self.settings(CODE_THROTTLE_TRUST_FORWARDED_FOR=True):
+            # 6.6.6.6 was sent by the client; the proxy appended the address it saw
+            self.assertEqual(throttle.client_ip(request), '2.2.2.2')
+
+    def test_view_answers_429_with_retry_after(self):
+        view = throttle.admission_control(lambda request: HttpResponse('ran'))
+        factory = RequestFactory()
+
+        def post():
+            request = factory.post('/run_code/', REMOTE_ADDR='1.1.1.1')
+            request.user = self.user
+            return view(request)
+
+        self.assertEqual([post().status_code for _ in range(2)], [200, 200])
+        response = post()
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertIn(b'try again in 1 second', response.content)
+
+        # Page loads aren't runs
+        request = factory.get('/run_code/', REMOTE_ADDR='1.1.1.1')
+        request.user = self.user
+        self.assertEqual(view(request).status_code, 200)
+
+    def test_async_view_answers_429(self):
+        async def run(request):
+            return HttpResponse('ran')
+
+        view = throttle.admission_control(run, html=True)
+        factory = RequestFactory()
+        statuses = []
+        with mock.patch('core.throttle.get_user', return_value=self.user):
+            for _ in range(3):
+                response = asyncio.run(view(factory.post('/submit_code/', REMOTE_ADDR='1.1.1.1')))
+                statuses.append(response.status_code)
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(CODE_EXECUTION_BACKEND='local', CODE_EXECUTION_WARM_POOL_SIZE=0, CODE_RUN_CACHE_ENABLED=True)
+class StreamedRunTests(SimpleTestCase):
+    def setUp(self):
+        run_cache.get_cache().clear()
+
+    def test_repeat_run_is_replayed_from_the_cache(self):
+        first = list(run_events('python', 'print(1)\nprint(2)'))
+        self.assertTrue(first[-1].startswith('event: done'))
+
+        with mock.patch.object(executor.LocalBackend, 'stream', side_effect=AssertionError("not cached")):
+            second = list(run_events('python', 'print(1)\nprint(2)'))
+        self.assertEqual(second[0], format_event('output', '1\n2\n'))
+        self.assertEqual(second[1], first[-1])
+        self.assertEqual(len(second), 2)
+
+    def test_failed_run_is_not_stored(self):
+        list(run_events('python', 'print(1)\nraise SystemExit(3)'))
+        with mock.patch.object(executor.LocalBackend, 'stream', return_value=iter(())) as backend_stream:
+            list(run_events('python', 'print(1)\nraise SystemExit(3)'))
+        backend_stream.assert_called_once()
+
+    @override_settings(CODE_RUN_CACHE_ENABLED=False)
+    def test_python_goes_to_the_warm_pool(self):
+        pool = mock.Mock(run=mock.Mock(return_value=('hi\n', 'OK', 0, 9000)))
+        with mock.patch('core.executor.warm_pool.get_pool', return_value=pool):
+            events = list(run_events('python', 'print("hi")', 'x'))
+        self.assertEqual(events[0], format_event('output', 'hi\n'))
+        self.assertTrue(events[1].startswith('event: done'))
+        self.assertEqual(pool.run.call_args[0][:2], ('print("hi")', 'x'))
+
+
+@override_settings(CODE_EXECUTION_BACKEND='local', CODE_EXECUTION_WARM_POOL_SIZE=0)
+class LocalBackendLimitTests(SimpleTestCase):
+    def run_python(self, code, wall_seconds=2):
+        started = time.monotonic()
+        result = executor.LocalBackend().run('python', code, '', {'wall_seconds': wall_seconds, 'cpu_seconds': 2})
+        return result, time.monotonic() - started
+
+    def test_closing_the_output_does_not_stop_the_clock(self):
+        result, elapsed = self.run_python('import os, time\nprint("hi", flush=True)\nos.close(1)\nos.close(2)\ntime.sleep(12)')
+        self.assertEqual(result['status'], 'TLE')
+        self.assertLess(elapsed, 5)
+        self.assertTrue(result['output'].startswith('hi\n'))
+
+    def test_background_children_are_killed(self):
+        code = (
+            'import subprocess\n'
+            'child = subprocess.Popen(["sleep", "30"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n'
+            'print(child.pid)'
+        )
+        result, elapsed = self.run_python(code)
+        self.assertEqual(result['status'], 'OK')
+        child = int(result['output'])
+        for _ in range(100):
+            try:
+                with open(f'/proc/{child}/stat') as f:
+                    # Killed but not reaped yet (by init) counts as gone
+                    if f.read().rsplit(')', 1)[1].split()[0] in ('Z', 'X'):
+                        break
+            except FileNotFoundError:
+                break
+            time.sleep(0.01)
+        else:
+            self.fail("background child still running")
+
+
+class WarmPoolLimitTests(SimpleTestCase):
+    LIMITS = dict(executor.DEFAULT_LIMITS, wall_seconds=2, cpu_seconds=2)
+
+    def setUp(self):
+        self.pool = warm_pool.WarmPool(size=1)
+        self.addCleanup(self.pool.close)
+
+    def test_closing_the_output_does_not_stop_the_clock(self):
+        started = time.monotonic()
+        output, status, exit_code, _ = self.pool.run(
+            'import os, time\nprint("hi", flush=True)\nos.close(1)\nos.close(2)\ntime.sleep(12)', '', self.LIMITS,
+        )
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual((output, status), ('hi\n', 'TLE'))
+
+    def test_worker_stays_usable(self):
+        self.assertEqual(self.pool.run('print(input())', 'x', self.LIMITS)[:2], ('x\n', 'OK'))
+        self.assertEqual(self.pool.run('print(2)', '', self.LIMITS)[:2], ('2\n', 'OK'))
+
+
+@override_settings(PROGRESS_SYNC_MAX_UPDATES=5, PROGRESS_MAX_VIDEO_SECONDS=3600)
+class SyncProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student')
+        self.subject = Subject.objects.create(program=Program.objects.create(name='Technical Training'), name='Python')
+        self.topics = [Topic.objects.create(subject=self.subject, name=f'Python {i}', order=i) for i in range(3)]
+        self.enrollment = Enrollment.objects.create(user=self.user, subject=self.subject)
+
+    def sync(self, body):
+        request = RequestFactory().post('/progress/sync/', body if isinstance(body, str) else json.dumps(body), content_type='application/json')
+        request.user = self.user
+        response = views.sync_progress(request)
+        return response.status_code, json.loads(response.content)
+
+    def bitset(self):
+        bits = SubjectProgress.objects.get(user=self.user, subject=self.subject)
+        return [bits.has(topic.position) for topic in self.topics], bits.completed_count
+
+    def test_updates_of_a_topic_are_coalesced(self):
+        first, second = self.topics[0].pk, self.topics[1].pk
+        status, data = self.sync({'updates': [
+            {'topic': first, 'position': 30}, {'topic': first, 'position': 95}, {'topic': first, 'completed': True},
+            {'topic': second, 'completed': True}, {'topic': second, 'completed': False, 'position': 10},
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual(data['topics'], {
+            str(first): {'is_completed': True, 'position': 95},
+            str(second): {'is_completed': False, 'position': 10},
+        })
+        self.assertEqual(TopicProgress.objects.filter(user=self.user).count(), 2)
+
+    def test_bitset_and_resume_pointers_follow_completion(self):
+        self.sync({'updates': [{'topic': self.topics[0].pk, 'completed': True}]})
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.bitset(), ([True, False, False], 1))
+        self.assertEqual((self.enrollment.last_topic, self.enrollment.next_topic), (self.topics[0], self.topics[1]))
+
+        self.sync({'updates': [{'topic': self.topics[1].pk, 'completed': True}, {'topic': self.topics[2].pk, 'completed': True}]})
+        self.sync({'updates': [{'topic': self.topics[0].pk, 'completed': False}]})
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.bitset(), ([False, True, True], 2))
+        self.assertEqual((self.enrollment.last_topic, self.enrollment.next_topic), (self.topics[0], self.topics[0]))
+
+    def test_retried_batch_changes_nothing(self):
+        batch = {'updates': [{'topic': self.topics[0].pk, 'completed': True}, {'topic': self.topics[1].pk, 'position': 40}]}
+        first = self.sync(batch)
+        with CaptureQueriesContext(connection) as queries:
+            retried = self.sync(batch)
+        self.assertEqual(retried, first)
+        # Nothing changed, so no progress row or bitset is written
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith(('UPDATE', 'INSERT INTO'))])
+        self.assertEqual(self.bitset(), ([True, False, False], 1))
+
+    def test_batch_size_is_limited(self):
+        updates = [{'topic': self.topics[0].pk, 'position': n} for n in range(6)]
+        self.assertEqual(self.sync({'updates': updates})[0], 413)
+        self.assertFalse(TopicProgress.objects.exists())
+
+    def test_bad_updates_are_rejected(self):
+        topic = self.topics[0].pk
+        for body in (
+            f'{{"updates": [{{"topic": {topic}, "position": Infinity}}]}}',
+            f'{{"updates": [{{"topic": {topic}, "position": -1e999}}]}}',
+            f'{{"updates": [{{"topic": {topic}, "position": NaN}}]}}',
+            '{"updates": [{"topic": Infinity, "completed": true}]}',
+            '{"updates": [{"topic": 99999999999999999999, "completed": true}]}',
+            '{"updates": [{"position": 5}]}',
+            '{"updates": 7}',
+            'not json',
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.sync(body)[0], 400)
+        self.assertFalse(TopicProgress.objects.exists())
+
+        # Positions are clamped, unknown topics skipped
+        status, data = self.sync({'updates': [{'topic': topic, 'position': 10 ** 9}, {'topic': 424242, 'completed': True}]})
+        self.assertEqual((status, data['topics']), (200, {str(topic): {'is_completed': False, 'position': 3600}}))
+
+
+@override_settings(CODE_SNIPPET_ID_LENGTH=8, CODE_SNIPPET_MAX_BYTES=1024)
+class SnippetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get(self, short_id, **headers):
+        return views.snippet_detail(RequestFactory().get(f'/snippets/{short_id}/', **headers), short_id)
+
+    def test_same_content_is_one_snippet(self):
+        snippet, created = snippets.store('python', 'print(input())', '1')
+        self.assertTrue(created)
+        self.assertEqual(len(snippet.short_id), 8)
+        # Language names are normalized before hashing
+        for language in ('python', 'Python', ' PY '):
+            self.assertEqual(snippets.store(language, 'print(input())', '1'), (snippet, False))
+        self.assertNotEqual(snippets.store('python', 'print(input())', '2')[0], snippet)
+        self.assertEqual(snippet.language, 'python')
+
+    def test_short_id_grows_on_collision(self):
+        encoded = snippets.base62(snippets.snippet_hash('python', 'print(1)', ''))
+        CodeSnippet.objects.create(short_id=encoded[:8], sha256='0' * 64, language='python', code='other')
+        snippet, created = snippets.store('python', 'print(1)')
+        self.assertTrue(created)
+        self.assertEqual(snippet.short_id, encoded[:9])
+
+    def test_bad_language_or_size(self):
+        # Too long for the column and unknown: run (and stored) as Python, like execute() does
+        self.assertEqual(snippets.store('x' * 50, 'print(1)')[0].language, 'python')
+        with self.assertRaises(snippets.InvalidSnippet):
+            snippets.store(['python'], 'print(1)')
+        with self.assertRaises(snippets.SnippetTooLarge):
+            snippets.store('python', 'x' * 1025)
+
+        request = RequestFactory().post('/snippets/share/', '{"language": 5, "code": "print(1)"}', content_type='application/json')
+        request.user = mock.Mock(is_authenticated=False)
+        with self.settings(CODE_THROTTLE_ENABLED=False):
+            self.assertEqual(views.share_snippet(request).status_code, 400)
+
+    def test_complete_snippet_is_immutable(self):
+        snippet, _ = snippets.store('python', 'print(1)')
+        snippets.set_output(snippet, {'output': '1\n', 'status': 'OK'})
+        # Only the first output is kept
+        snippets.set_output(snippet, {'output': '2\n', 'status': 'OK'})
+
+        response = self.get(snippet.short_id)
+        self.assertEqual(json.loads(response.content)['output'], '1\n')
+        self.assertEqual(response['ETag'], f'"{snippet.short_id}"')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        response = self.get(snippet.short_id, HTTP_IF_NONE_MATCH=f'"{snippet.short_id}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], f'"{snippet.short_id}"')
+        self.assertEqual(self.get('missing').status_code, 404)
+
+    def test_snippet_without_output_is_rechecked(self):
+        snippet, _ = snippets.store('python', 'print(1)')
+        response = self.get(snippet.short_id, HTTP_IF_NONE_MATCH=f'"{snippet.short_id}"')
+        self.assertEqual((response.status_code, response['Cache-Control']), (200, 'no-cache'))
+        self.assertFalse(response.has_header('ETag'))
+
+        # Not cached while incomplete, so the output shows up once it is recorded
+        snippets.set_output(snippet, {'output': '1\n', 'status': 'OK'})
+        self.assertEqual(json.loads(self.get(snippet.short_id).content)['output'], '1\n')
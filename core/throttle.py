@@ -0,0 +1,284 @@
+"""
+Admission control for the code execution endpoints (run_code, submit_code).
+
+Every request has to take a token from three token buckets: its user's, its IP's
+and a global one. A bucket refills at `rate` tokens per second up to `burst`.
+Requests are also shed while settings.CODE_THROTTLE_MAX_IN_FLIGHT executions are
+already running. Rejected requests get a 429 with Retry-After straight away
+instead of queueing behind a saturated executor.
+
+State lives in the settings.CODE_THROTTLE_CACHE_ALIAS cache, so with a shared
+backend (Redis) the limits hold across worker processes. A bucket is one integer,
+the time in ms at which it will be full again (GCRA, the "virtual scheduling"
+form of a token bucket). Taking a token is a single atomic incr; the request is
+refused (and the incr undone) if that pushes the bucket past its burst.
+"""
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+IN_FLIGHT_KEY = 'throttle:in-flight'
+
+# Buckets untouched this long are dropped (and come back full)
+BUCKET_TTL = 60 * 60
+# The in-flight counter restarts from zero this often, so a worker killed
+# mid-request can't leak slots forever
+IN_FLIGHT_TTL = 5 * 60
+
+BUSY_MESSAGE = "Too many code runs right now. Please try again in {seconds} second(s)."
+
+
+def get_cache():
+    return caches[getattr(settings, 'CODE_THROTTLE_CACHE_ALIAS', 'throttle')]
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def client_ip(request):
+    if getattr(settings, 'CODE_THROTTLE_TRUST_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            # The proxy appends the address it saw; entries before it come from the client
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_buckets(user, ip):
+    """
+    (cache key, rate per second, burst) of every bucket the request draws from.
+    """
+    buckets = []
+    if user is not None and user.is_authenticated:
+        buckets.append((f'throttle:user:{user.pk}',) + tuple(settings.CODE_THROTTLE_USER))
+    buckets.append((f'throttle:ip:{ip}',) + tuple(settings.CODE_THROTTLE_IP))
+    buckets.append(('throttle:global',) + tuple(settings.CODE_THROTTLE_GLOBAL))
+    return buckets
+
+
+def bucket_step(rate, burst):
+    """
+    (ms one token is worth, ms of tokens the bucket holds).
+    """
+    interval = max(1, int(1000 / rate))
+    return interval, interval * burst
+
+
+def take_token(cache, key, rate, burst):
+    """
+    Takes one token. Returns 0 if it was available, else the seconds until it will be.
+    """
+    interval, capacity = bucket_step(rate, burst)
+    now = now_ms()
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:
+        # New bucket: starts full, minus this request
+        if cache.add(key, now + interval, BUCKET_TTL):
+            return 0
+        full_at = cache.incr(key, interval)
+
+    if full_at - interval < now:
+        # The bucket had refilled completely; restart its clock from now
+        cache.set(key, now + interval, BUCKET_TTL)
+        return 0
+    if full_at - now > capacity:
+        cache.decr(key, interval)
+        return math.ceil((full_at - capacity - now) / 1000)
+    return 0
+
+
+def return_token(cache, key, rate, burst):
+    try:
+        cache.decr(key, bucket_step(rate, burst)[0])
+    except ValueError:
+        pass
+
+
+def admit(user, ip):
+    """
+    Lets a request in, or returns the seconds the client should wait. An admitted
+    request holds an in-flight slot until release() is called.
+    """
+    cache = get_cache()
+    max_in_flight = getattr(settings, 'CODE_THROTTLE_MAX_IN_FLIGHT', 0)
+    if max_in_flight:
+        cache.add(IN_FLIGHT_KEY, 0, IN_FLIGHT_TTL)
+        try:
+            in_flight = cache.incr(IN_FLIGHT_KEY)
+        except ValueError:
+            in_flight = 1
+        if in_flight > max_in_flight:
+            release()
+            return 1
+
+    taken = []
+    for bucket in get_buckets(user, ip):
+        wait = take_token(cache, *bucket)
+        if wait:
+            # Don't charge the other buckets for a request that isn't served
+            for other in taken:
+                return_token(cache, *other)
+            if max_in_flight:
+                release()
+            return wait
+        taken.append(bucket)
+    return 0
+
+
+def release():
+    if not getattr(settings, 'CODE_THROTTLE_MAX_IN_FLIGHT', 0):
+        return
+    try:
+        get_cache().decr(IN_FLIGHT_KEY)
+    except ValueError:
+        # The counter expired and restarted while this request ran
+        pass
+
+
+# --- ASYNC ---
+async def atake_token(cache, key, rate, burst):
+    interval, capacity = bucket_step(rate, burst)
+    now = now_ms()
+    try:
+        full_at = await cache.aincr(key, interval)
+    except ValueError:
+        if await cache.aadd(key, now + interval, BUCKET_TTL):
+            return 0
+        full_at = await cache.aincr(key, interval)
+
+    if full_at - interval < now:
+        await cache.aset(key, now + interval, BUCKET_TTL)
+        return 0
+    if full_at - now > capacity:
+        await cache.adecr(key, interval)
+        return math.ceil((full_at - capacity - now) / 1000)
+    return 0
+
+
+async def areturn_token(cache, key, rate, burst):
+    try:
+        await cache.adecr(key, bucket_step(rate, burst)[0])
+    except ValueError:
+        pass
+
+
+async def aadmit(user, ip):
+    cache = get_cache()
+    max_in_flight = getattr(settings, 'CODE_THROTTLE_MAX_IN_FLIGHT', 0)
+    if max_in_flight:
+        await cache.aadd(IN_FLIGHT_KEY, 0, IN_FLIGHT_TTL)
+        try:
+            in_flight = await cache.aincr(IN_FLIGHT_KEY)
+        except ValueError:
+            in_flight = 1
+        if in_flight > max_in_flight:
+            await arelease()
+            return 1
+
+    taken = []
+    for bucket in get_buckets(user, ip):
+        wait = await atake_token(cache, *bucket)
+        if wait:
+            for other in taken:
+                await areturn_token(cache, *other)
+            if max_in_flight:
+                await arelease()
+            return wait
+        taken.append(bucket)
+    return 0
+
+
+async def arelease():
+    if not getattr(settings, 'CODE_THROTTLE_MAX_IN_FLIGHT', 0):
+        return
+    try:
+        await get_cache().adecr(IN_FLIGHT_KEY)
+    except ValueError:
+        pass
+
+
+def released_after(content):
+    try:
+        yield from content
+    finally:
+        release()
+
+
+async def areleased_after(content):
+    try:
+        async for part in content:
+            yield part
+    finally:
+        await arelease()
+
+
+def too_many_requests(seconds, html=False):
+    message = BUSY_MESSAGE.format(seconds=seconds)
+    if html:
+        response = HttpResponse(f'<div class="alert alert-warning mt-3 mb-0">{message}</div>', status=429)
+    else:
+        response = JsonResponse({'output': f"Error: {message}"}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def admission_control(view_func=None, html=False):
+    """
+    Decorator for execution views, sync or async. Only POSTs (actual runs) are counted.
+    `html` = answer 429s with an HTML alert (submit_code) instead of run_code's JSON.
+    Put it below the login decorator so request.user is already known.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != 'POST' or not getattr(settings, 'CODE_THROTTLE_ENABLED', True):
+                    return await view(request, *args, **kwargs)
+                # request.user would hit the session synchronously
+                user = await sync_to_async(get_user)(request)
+                wait = await aadmit(user, client_ip(request))
+                if wait:
+                    return too_many_requests(wait, html)
+                try:
+                    response = await view(request, *args, **kwargs)
+                except BaseException:
+                    await arelease()
+                    raise
+                if response.streaming:
+                    # The run happens while the body is sent: hold the slot until then
+                    response.streaming_content = areleased_after(response.streaming_content)
+                else:
+                    await arelease()
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST' or not getattr(settings, 'CODE_THROTTLE_ENABLED', True):
+                return view(request, *args, **kwargs)
+            wait = admit(request.user, client_ip(request))
+            if wait:
+                return too_many_requests(wait, html)
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                release()
+                raise
+            if response.streaming:
+                response.streaming_content = released_after(response.streaming_content)
+            else:
+                release()
+            return response
+        return wrapper
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
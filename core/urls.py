@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from curriculum import views as curriculum_views
 
+# Under ASGI, serve the I/O-bound views as native async views
+if settings.USE_ASYNC_VIEWS:
+    from . import async_views as io_views
+else:
+    io_views = views
+
 urlpatterns = [
     path('', views.index, name='index'),
     path('contact/', views.contact, name='contact'), # Added this line
@@ -9,23 +16,30 @@ urlpatterns = [
     path('placements/', views.placements, name='placements'),
     path('about/', views.about, name='about'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/<slug:section>/', views.dashboard_section, name='dashboard_section'),
     path('course/<slug:slug>/', views.course_detail, name='course_detail'),
     path('topic/<int:topic_id>/', views.topic_detail, name='topic_detail'),
     path('arena/', views.arena, name='arena'),
-    path('run_code/', views.run_code, name='run_code'),
+    path('arena/s/<str:short_id>/', views.arena, name='arena_snippet'),
+    path('run_code/', io_views.run_code, name='run_code'),
+    path('run_code/stream/', io_views.run_code_stream, name='run_code_stream'),
+    path('run_code/cache-stats/', views.run_cache_stats, name='run_cache_stats'),
+    path('snippets/share/', io_views.share_snippet, name='share_snippet'),
+    path('snippets/<str:short_id>/', io_views.snippet_detail, name='snippet_detail'),
     path('quiz/<slug:slug>/', views.quiz_view, name='quiz'),
     path('courses/', views.courses, name='courses'),
     path('course-overview/<slug:slug>/', views.course_landing, name='course_landing'),
     path('enroll/<slug:slug>/', views.enroll_course, name='enroll_course'),
     path('toggle-progress/<int:topic_id>/', views.toggle_topic_completion, name='toggle_progress'),
+    path('progress/sync/', views.sync_progress, name='sync_progress'),
     path('profile/', views.profile, name='profile'),
     path('buy/<slug:subject_slug>/', views.initiate_payment, name='initiate_payment'),
-    path('payment/callback/<str:order_id>/', views.payment_callback, name='payment_callback'),
+    path('payment/callback/<str:order_id>/', io_views.payment_callback, name='payment_callback'),
     path('terms/', views.terms, name='terms'),
     path('privacy/', views.privacy, name='privacy'),
     path('refund-policy/', views.refund_policy, name='refund_policy'),
     path('bulk-upload/<slug:slug>/', curriculum_views.bulk_upload_topics, name='bulk_upload_topics'),
-    path('payment/check-status/<str:order_id>/', views.check_payment_status, name='check_payment_status'),
+    path('payment/check-status/<str:order_id>/', io_views.check_payment_status, name='check_payment_status'),
     path('careers/', views.careers, name='careers'),  # New Page
     path('apply-job/<int:job_id>/', views.track_application, name='track_application'),
 ]
\ No newline at end of file
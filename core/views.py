@@ -47,72 +47,26 @@ from curriculum.models import Subject  # Import your new model
 
 from django.db.models import Count, Q
 from curriculum.models import Enrollment, TopicProgress, QuizSubmission
+from curriculum import grading, progress, quiz_stats
 from curriculum.models import JobApplication
 from challenges.models import UserStreak
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from core.dashboard import invalidate as invalidate_section, render_section
 @login_required(login_url='login')
 def dashboard(request):
-    # Fetch enrolled courses
-    user_enrollments = Enrollment.objects.filter(user=request.user).select_related('subject')
-    
-    course_data = []
-    total_lessons_completed = 0
-    
-    for enrollment in user_enrollments:
-        subject = enrollment.subject
-        
-        # 1. Total Topics in this course
-        total_topics = subject.topics.count()
-        
-        # 2. Completed Topics by this user in this course
-        completed_topics = TopicProgress.objects.filter(
-            user=request.user, 
-            topic__subject=subject, 
-            is_completed=True
-        ).count()
-        
-        # 3. Calculate Percentage
-        if total_topics > 0:
-            progress_percent = int((completed_topics / total_topics) * 100)
-        else:
-            progress_percent = 0
-            
-        total_lessons_completed += completed_topics
-        
-        # Append data to list
-        course_data.append({
-            'subject': subject,
-            'progress': progress_percent,
-            'completed': completed_topics,
-            'total': total_topics
-        })
-        # --- NEW: CALCULATE QUIZ STATS ---
-    user_submissions = QuizSubmission.objects.filter(user=request.user)
-    
-    # 1. Total Tests Attempted
-    total_tests_attempted = user_submissions.count()
-    
-    # 2. Average Score across all tests
-    # We calculate the average percentage manually to be safe
-    avg_score = 0
-    if total_tests_attempted > 0:
-        total_percentage = sum([sub.percentage for sub in user_submissions])
-        avg_score = int(total_percentage / total_tests_attempted)
-    # ---------------------------------
-    pending_orders = Order.objects.filter(user=request.user, status='PENDING').select_related('subject')
-    my_applications = JobApplication.objects.filter(user=request.user).select_related('job').order_by('-applied_at')
-    streak_obj, created = UserStreak.objects.get_or_create(user=request.user)
-    context = {
-        'user': request.user,
-        'course_data': course_data,
-        'total_lessons_completed': total_lessons_completed,
-        'total_courses': user_enrollments.count(),
-        'total_tests_attempted': total_tests_attempted,
-        'avg_score': avg_score,
-        'pending_orders': pending_orders, # Add this
-        'my_applications': my_applications, # <--- CRITICAL FOR DASHBOARD
-        'streak': streak_obj, # <--- Add this
-    }
-    return render(request, 'core/dashboard.html', context)
+    # Only the page shell: each section is loaded by dashboard_section
+    return render(request, 'core/dashboard.html', {'user': request.user})
+
+@login_required(login_url='login')
+def dashboard_section(request, section):
+    """
+    One dashboard section as an HTML fragment (cached per user, see core/dashboard.py).
+    """
+    response = HttpResponse(render_section(request.user, section))
+    # Changes must show up on the next load, so the browser may not reuse it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required(login_url='login')
 def course_detail(request, slug):
@@ -122,12 +76,15 @@ def course_detail(request, slug):
     orphan_topics = subject.topics.filter(module__isnull=True).order_by('order')
     # Get all topics for this subject, ordered by the 'order' field
     topics = subject.topics.all().order_by('order')
+    # One bitset row instead of a TopicProgress lookup per topic
+    subject_progress = progress.get_progress(request.user, subject.id)
     
     context = {
         'course': subject,
         'subject': subject,
         'modules': modules,       # Send modules
         'orphan_topics': orphan_topics, # Send topics with no module
+        'completed_topic_ids': progress.completed_topic_ids(subject_progress, topics),
         'is_enrolled': Enrollment.objects.filter(user=request.user, subject=subject).exists()
     }
     return render(request, 'core/course_detail.html', context)
@@ -143,31 +100,44 @@ def topic_detail(request, topic_id):
     
     # Check if this topic is already completed by the user
     is_completed = False
+    video_position = 0
     if request.user.is_authenticated:
-        is_completed = TopicProgress.objects.filter(user=request.user, topic=topic, is_completed=True).exists()
+        is_completed = progress.is_completed(request.user, topic)
+        # Resume pointer of the dashboard's course card
+        if progress.visit(request.user, topic):
+            invalidate_section(request.user.pk, 'courses')
+        if topic.topic_type == 'video':
+            # Resume where the last heartbeat left off
+            video_position = TopicProgress.objects.filter(user=request.user, topic=topic).values_list('video_position', flat=True).first() or 0
     
     context = {
         'topic': topic,
         'subject': subject,
         'is_completed': is_completed, # Pass this to the template
+        'video_position': video_position,
     }
     return render(request, 'core/topic_detail.html', context)
 
 @login_required(login_url='login')
-def arena(request):
-    return render(request, 'core/arena.html')
+def arena(request, short_id=None):
+    # short_id = open a shared snippet (arena.html loads it from snippet_detail)
+    return render(request, 'core/arena.html', {'snippet_id': short_id})
 
 import requests
 import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-import requests
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
+from core.executor import execute
+from core.gateway import ExecutorUnavailable
+from core.streaming import event_stream_response, run_events
+from core.throttle import admission_control
 
 @csrf_exempt
+@admission_control
 def run_code(request):
     if request.method == "POST":
         try:
@@ -176,66 +146,138 @@ def run_code(request):
             language = data.get('language', 'python')
             input_data = data.get('input', '')
 
-            # Map your frontend languages to Piston API versions
-            # Piston supports: python, java, c++, javascript, etc.
-            language_map = {
-                'python': {'language': 'python', 'version': '3.10.0'},
-                'java': {'language': 'java', 'version': '15.0.2'},
-                'cpp': {'language': 'c++', 'version': '10.2.0'},
-                'c': {'language': 'c', 'version': '10.2.0'},  # <--- ADDED C HERE
-                'javascript': {'language': 'javascript', 'version': '18.15.0'},
-            }
-            
-            config = language_map.get(language, language_map['python'])
-
-            # Prepare payload for Piston API
-            payload = {
-                "language": config['language'],
-                "version": config['version'],
-                "files": [
-                    {
-                        "content": code
-                    }
-                ],
-                "stdin": input_data
-            }
-
-            # Send to Piston (Free Public API)
-            response = requests.post('https://emkc.org/api/v2/piston/execute', json=payload)
-            result = response.json()
-            
-            output = result.get('run', {}).get('output', '')
-            return JsonResponse({'output': output})
-
+            # Runs on the backend picked in settings.CODE_EXECUTION_BACKEND (Piston or local sandbox)
+            result = execute(language, code, input_data)
+            return JsonResponse({
+                'output': result['output'],
+                'compile_time_ms': result.get('compile_time_ms'),
+                'run_time_ms': result.get('run_time_ms'),
+            })
+
+        except ExecutorUnavailable as e:
+            response = JsonResponse({'output': f"Error: {str(e)} Please try again in a moment."}, status=503)
+            if e.retry_after:
+                response['Retry-After'] = str(e.retry_after)
+            return response
         except Exception as e:
             return JsonResponse({'output': f"Error: {str(e)}"}, status=500)
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+
+@csrf_exempt
+@admission_control
+def run_code_stream(request):
+    """
+    Same request as run_code, but the output comes back as Server-Sent Events while
+    the program runs (see core/streaming.py). Used by arena.html.
+    """
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    return event_stream_response(run_events(data.get('language', 'python'), data.get('code', ''), data.get('input', '')))
+
+from django.http import HttpResponseNotModified
+from django.urls import reverse
+from core import snippets
+
+
+def snippet_response(request, data):
+    """
+    JSON of a shared snippet. A snippet with its output can never change, so browsers
+    and proxies may keep it forever; one still waiting for its output must be rechecked.
+    """
+    etag = f'"{data["id"]}"'
+    complete = data['output'] is not None
+    if complete and request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(data)
+    if complete:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        response['ETag'] = etag
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@csrf_exempt
+@admission_control
+def share_snippet(request):
+    """
+    Saves the Arena's code under its content hash and returns the share link.
+    The first share also runs the snippet (usually a run cache hit) to keep its output.
+    """
+    if request.method != "POST":
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    try:
+        data = json.loads(request.body)
+        language = data.get('language', 'python')
+        code = data.get('code', '')
+        input_data = data.get('input', '')
+
+        # 1. Store (or find) the snippet
+        snippet, _ = snippets.store(language, code, input_data, request.user)
+
+        # 2. Keep its output
+        if snippet.output is None:
+            snippets.set_output(snippet, execute(snippet.language, code, input_data))
+    except snippets.SnippetTooLarge as e:
+        return JsonResponse({'error': str(e)}, status=413)
+    except snippets.InvalidSnippet as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except ExecutorUnavailable:
+        # Shared without an output; the link works all the same
+        pass
+    except Exception as e:
+        return JsonResponse({'error': f"Error: {str(e)}"}, status=500)
+
+    return JsonResponse({'id': snippet.short_id, 'url': request.build_absolute_uri(reverse('arena_snippet', args=[snippet.short_id]))})
+
+
+def snippet_detail(request, short_id):
+    data = snippets.load(short_id)
+    if data is None:
+        return JsonResponse({'error': 'Snippet not found'}, status=404)
+    return snippet_response(request, data)
+
+from django.contrib.auth.decorators import user_passes_test
+from core import run_cache
+
+@login_required(login_url='login')
+@user_passes_test(lambda u: u.is_staff)
+def run_cache_stats(request):
+    """
+    Hit / miss counters of the code run cache, for sizing CODE_RUN_CACHE (staff only).
+    """
+    return JsonResponse(run_cache.get_stats())
+
+from django.db import transaction
 from curriculum.models import Question # Import the model
 @login_required(login_url='login')
 def quiz_view(request, slug):
     subject = get_object_or_404(Subject, slug=slug)
-    questions = Question.objects.filter(subject=subject)
     
     if request.method == 'POST':
-        score = 0
-        total = questions.count()
-        
-        for q in questions:
-            selected_option_id = request.POST.get(str(q.id))
-            if selected_option_id:
-                choice = q.choices.filter(id=selected_option_id, is_correct=True)
-                if choice.exists():
-                    score += 1
+        # Every correct choice id in one query, then grade by set membership
+        key = grading.answer_key(subject.id)
+        score = grading.grade(key, request.POST)
+        total = len(key)
         
         # --- NEW: SAVE TO DATABASE ---
-        submission = QuizSubmission.objects.create(
-            user=request.user,
-            subject=subject,
-            score=score,
-            total_questions=total
-        )
+        # Submission and running totals (curriculum/quiz_stats.py) commit together
+        with transaction.atomic():
+            submission = QuizSubmission.objects.create(
+                user=request.user,
+                subject=subject,
+                score=score,
+                total_questions=total
+            )
+            quiz_stats.record(submission)
         # -----------------------------
         
         return render(request, 'core/quiz_result.html', {
@@ -247,7 +289,7 @@ def quiz_view(request, slug):
 
     context = {
         'subject': subject,
-        'questions': questions
+        'questions': Question.objects.filter(subject=subject).prefetch_related('choices')
     }
     return render(request, 'core/quiz.html', context)
 
@@ -465,20 +507,54 @@ def toggle_topic_completion(request, topic_id):
     if request.method == "POST":
         topic = get_object_or_404(Topic, id=topic_id)
         
-        # Get or Create the progress record
-        progress, created = TopicProgress.objects.get_or_create(user=request.user, topic=topic)
-        
-        # Toggle status
-        progress.is_completed = not progress.is_completed
-        progress.save()
+        # Toggle status (TopicProgress and the subject's bitset, together)
+        is_completed = not progress.is_completed(request.user, topic)
+        progress.set_completed(request.user, topic, is_completed)
         
         return JsonResponse({
             'status': 'success', 
-            'is_completed': progress.is_completed
+            'is_completed': is_completed
         })
     
     return JsonResponse({'status': 'error'}, status=400)
 
+@login_required(login_url='login')
+def sync_progress(request):
+    """
+    Applies a batch of progress updates from topic pages:
+    {"updates": [{"topic": 12, "completed": true}, {"topic": 12, "position": 95}, ...]}.
+    Later updates of the same topic replace earlier ones; completion is set, not toggled,
+    so a retried batch changes nothing.
+    """
+    if request.method != "POST":
+        return JsonResponse({'status': 'error'}, status=400)
+    try:
+        updates = json.loads(request.body)['updates']
+        if len(updates) > settings.PROGRESS_SYNC_MAX_UPDATES:
+            return JsonResponse({'status': 'error', 'error': 'Too many updates'}, status=413)
+
+        # 1. Coalesce per topic
+        coalesced = {}
+        for update in updates:
+            topic_id = int(update['topic'])
+            if not 0 < topic_id < 2 ** 31:
+                raise ValueError(topic_id)  # Not an id the database could hold
+            topic_update = coalesced.setdefault(topic_id, {})
+            if 'completed' in update:
+                topic_update['completed'] = bool(update['completed'])
+            if 'position' in update:
+                topic_update['position'] = min(max(int(update['position']), 0), settings.PROGRESS_MAX_VIDEO_SECONDS)
+    # json.loads accepts Infinity and NaN: int() raises OverflowError or ValueError on them
+    except (ValueError, TypeError, KeyError, OverflowError):
+        return JsonResponse({'status': 'error', 'error': 'Invalid request'}, status=400)
+
+    # 2. One upsert for all of them
+    rows = progress.sync(request.user, coalesced)
+    return JsonResponse({
+        'status': 'success',
+        'topics': {topic_id: {'is_completed': row.is_completed, 'position': row.video_position} for topic_id, row in rows.items()},
+    })
+
 
 from django.contrib import messages
 from .forms import UserUpdateForm, ProfileUpdateForm # Import the forms
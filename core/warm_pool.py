@@ -0,0 +1,150 @@
+"""
+Pool of warm Python workers for the local backend (settings.CODE_EXECUTION_WARM_POOL_SIZE).
+
+Each worker is a separate, already started interpreter running core/sandbox_worker.py.
+It forks a fresh child for every submission, so runs never share state, and skips
+interpreter startup, which is most of the cost of a short program.
+
+Workers are replaced after settings.CODE_EXECUTION_WARM_POOL_MAX_RUNS runs, after any
+limit breach (time, output, killed by a signal) and whenever the protocol breaks.
+"""
+import os
+import queue
+import selectors
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.conf import settings
+
+from core.sandbox import popen_options
+from core.sandbox_worker import read_message, write_message
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sandbox_worker.py')
+
+# Extra seconds the worker gets to answer beyond the run's own wall limit
+REPLY_GRACE_SECONDS = 2
+
+
+class WorkerError(Exception):
+    """
+    The worker died or stopped answering. The caller runs the code the cold way instead.
+    """
+
+
+class WarmWorker:
+    def __init__(self):
+        self.runs = 0
+        # The whole worker runs sandboxed like a cold run (core/sandbox.py), so the
+        # children it forks are too
+        prefix, user_options = popen_options()
+        self.process = subprocess.Popen(
+            prefix + [sys.executable, '-I', '-S', WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(),
+            env={'PATH': os.environ.get('PATH', '/usr/bin:/bin'), 'LANG': 'C.UTF-8'},
+            start_new_session=True,
+            **user_options,
+        )
+
+    def run(self, code, stdin, limits):
+        self.runs += 1
+        try:
+            write_message(self.process.stdin.fileno(), {'code': code, 'stdin': stdin, 'limits': limits})
+        except OSError as e:
+            raise WorkerError("Worker is not accepting requests.") from e
+
+        # Don't block forever on a wedged worker
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ)
+            if not selector.select(timeout=limits['wall_seconds'] + REPLY_GRACE_SECONDS):
+                raise WorkerError("Worker did not answer in time.")
+
+        reply = read_message(self.process.stdout.fileno())
+        if reply is None:
+            raise WorkerError("Worker exited.")
+        return reply
+
+    def close(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class WarmPool:
+    """
+    Fixed number of slots. A slot holds an idle worker, or None until one is started.
+    """
+    def __init__(self, size=4, max_runs=100):
+        self.size = size
+        self.max_runs = max_runs
+        self._slots = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)
+
+    def run(self, code, stdin, limits):
+        """
+        Runs a Python submission and returns (output, status, exit_code, memory_kb)
+        like LocalBackend._execute.
+        Raises WorkerError if the worker failed; the run should then be retried cold.
+        """
+        worker = self._slots.get()
+        try:
+            if worker is None:
+                worker = WarmWorker()
+            reply = worker.run(code, stdin, limits)
+        except (WorkerError, OSError, ValueError):
+            if worker is not None:
+                worker.close()
+            self._slots.put(None)
+            raise WorkerError("Warm worker failed.")
+
+        breached = reply['status'] != 'OK' or (reply['exit_code'] or 0) < 0
+        if breached or worker.runs >= self.max_runs:
+            self._recycle(worker)
+        else:
+            self._slots.put(worker)
+        return reply['output'], reply['status'], reply['exit_code'], reply.get('memory_kb')
+
+    def _recycle(self, worker):
+        # Start the replacement off the request path so the next run is still warm
+        def replace():
+            worker.close()
+            try:
+                self._slots.put(WarmWorker())
+            except OSError:
+                self._slots.put(None)
+        threading.Thread(target=replace, daemon=True).start()
+
+    def close(self):
+        for _ in range(self.size):
+            worker = self._slots.get()
+            if worker is not None:
+                worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process-wide pool, or None when settings.CODE_EXECUTION_WARM_POOL_SIZE is 0.
+    """
+    global _pool
+    size = getattr(settings, 'CODE_EXECUTION_WARM_POOL_SIZE', 0)
+    if not size:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WarmPool(size, getattr(settings, 'CODE_EXECUTION_WARM_POOL_MAX_RUNS', 100))
+    return _pool
@@ -125,12 +125,35 @@ class QuestionAdmin(admin.ModelAdmin):
 
 
 from .models import Program, Subject, Topic, Question, Choice, TopicProgress # Add TopicProgress
+from .models import SubjectProgress
+from .progress import rebuild
 
 @admin.register(TopicProgress)
 class TopicProgressAdmin(admin.ModelAdmin):
     list_display = ('user', 'topic', 'is_completed', 'updated_at')
     list_filter = ('is_completed', 'user')
 
+    # Keep the subject's bitset in sync with edits made here
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        rebuild(obj.user_id, obj.topic.subject_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild(obj.user_id, obj.topic.subject_id)
+
+    def delete_queryset(self, request, queryset):
+        pairs = set(queryset.values_list('user_id', 'topic__subject_id'))
+        super().delete_queryset(request, queryset)
+        for user_id, subject_id in pairs:
+            rebuild(user_id, subject_id)
+
+@admin.register(SubjectProgress)
+class SubjectProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'subject', 'completed_count', 'updated_at')
+    list_filter = ('subject',)
+    readonly_fields = ('completed', 'completed_count')
+
 from .models import Job, JobApplication
 
 @admin.register(Job)
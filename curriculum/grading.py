@@ -0,0 +1,39 @@
+"""
+Quiz grading against an answer key loaded in one query, however many questions
+the subject has.
+"""
+from django.db.models import FilteredRelation, Q
+
+from .models import Question
+
+
+def answer_key(subject_id):
+    """
+    {question_id: set of correct choice ids} of every question of the subject
+    (an empty set when a question has no correct choice; it still counts).
+    """
+    rows = Question.objects.filter(subject_id=subject_id).annotate(
+        correct=FilteredRelation('choices', condition=Q(choices__is_correct=True)),
+    ).values_list('id', 'correct__id')
+    key = {}
+    for question_id, choice_id in rows:
+        correct = key.setdefault(question_id, set())
+        if choice_id is not None:
+            correct.add(choice_id)
+    return key
+
+
+def grade(key, answers):
+    """
+    Number of questions whose answer (answers: {'<question id>': '<choice id>'}, e.g.
+    request.POST) is one of its correct choices.
+    """
+    score = 0
+    for question_id, correct in key.items():
+        try:
+            choice_id = int(answers.get(str(question_id)) or 0)
+        except ValueError:
+            continue
+        if choice_id in correct:
+            score += 1
+    return score
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from curriculum.models import Enrollment, TopicProgress
+from curriculum.progress import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the SubjectProgress bitsets from the TopicProgress rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only this user id")
+        parser.add_argument('--subject', type=int, help="Only this subject id")
+
+    def handle(self, *args, **options):
+        # Every (user, subject) with progress or an enrollment; rebuild() also resets stale bitsets
+        pairs = set(TopicProgress.objects.values_list('user_id', 'topic__subject_id'))
+        pairs |= set(Enrollment.objects.values_list('user_id', 'subject_id'))
+        if options['user']:
+            pairs = {pair for pair in pairs if pair[0] == options['user']}
+        if options['subject']:
+            pairs = {pair for pair in pairs if pair[1] == options['subject']}
+
+        for user_id, subject_id in sorted(pairs):
+            rebuild(user_id, subject_id)
+        self.stdout.write(f"Rebuilt {len(pairs)} subject progress row(s).")
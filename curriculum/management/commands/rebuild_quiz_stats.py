@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from curriculum.quiz_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recomputes UserQuizStats and SubjectQuizStats from the QuizSubmission history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help="Only this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        users = rebuild(options['user'])
+        self.stdout.write(f"Rebuilt quiz stats of {users} user(s).")
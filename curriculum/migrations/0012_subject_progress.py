@@ -0,0 +1,80 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_topics(apps, schema_editor):
+    """
+    Positions 0, 1, 2, ... within each subject, in the current topic order.
+    """
+    Topic = apps.get_model('curriculum', 'Topic')
+    positions = {}
+    for topic in Topic.objects.order_by('subject_id', 'order', 'id').only('id', 'subject_id'):
+        position = positions.get(topic.subject_id, 0)
+        Topic.objects.filter(pk=topic.pk).update(position=position)
+        positions[topic.subject_id] = position + 1
+
+
+def fill_subject_progress(apps, schema_editor):
+    TopicProgress = apps.get_model('curriculum', 'TopicProgress')
+    SubjectProgress = apps.get_model('curriculum', 'SubjectProgress')
+    bitsets = {}
+    done = TopicProgress.objects.filter(is_completed=True).values_list('user_id', 'topic__subject_id', 'topic__position')
+    for user_id, subject_id, position in done.iterator(chunk_size=1000):
+        bitsets[user_id, subject_id] = bitsets.get((user_id, subject_id), 0) | 1 << position
+    SubjectProgress.objects.bulk_create([
+        SubjectProgress(
+            user_id=user_id,
+            subject_id=subject_id,
+            completed=bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+            completed_count=bin(bits).count('1'),
+        )
+        for (user_id, subject_id), bits in bitsets.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('curriculum', '0011_alter_job_options_alter_jobapplication_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed', models.BinaryField(default=b'')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='position',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(number_topics, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='topic',
+            constraint=models.UniqueConstraint(fields=('subject', 'position'), name='unique_topic_position'),
+        ),
+        migrations.AddField(
+            model_name='subjectprogress',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='curriculum.subject'),
+        ),
+        migrations.AddField(
+            model_name='subjectprogress',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_progress', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subjectprogress',
+            unique_together={('user', 'subject')},
+        ),
+        migrations.RunPython(fill_subject_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_quiz_stats(apps, schema_editor):
+    """
+    Totals of the existing submissions (curriculum/quiz_stats.py rebuild, on the historical models).
+    """
+    QuizSubmission = apps.get_model('curriculum', 'QuizSubmission')
+    UserQuizStats = apps.get_model('curriculum', 'UserQuizStats')
+    SubjectQuizStats = apps.get_model('curriculum', 'SubjectQuizStats')
+    totals = {}
+    rows = QuizSubmission.objects.order_by().values_list('user_id', 'subject_id', 'score', 'total_questions', 'submitted_at')
+    for user_id, subject_id, score, total, submitted_at in rows.iterator(chunk_size=2000):
+        percentage = int((score / total) * 100) if total else 0
+        for key in ((user_id,), (user_id, subject_id)):
+            attempts, percentage_sum, best, last = totals.get(key, (0, 0, 0, submitted_at))
+            totals[key] = (attempts + 1, percentage_sum + percentage, max(best, percentage), max(last, submitted_at))
+    for key, (attempts, percentage_sum, best, last) in totals.items():
+        fields = {'attempts': attempts, 'percentage_sum': percentage_sum, 'best_percentage': best, 'last_attempt_at': last}
+        if len(key) == 1:
+            UserQuizStats.objects.create(user_id=key[0], **fields)
+        else:
+            SubjectQuizStats.objects.create(user_id=key[0], subject_id=key[1], **fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('curriculum', '0012_subject_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserQuizStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quiz_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.PositiveIntegerField(default=0)),
+                ('best_percentage', models.PositiveIntegerField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubjectQuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.PositiveIntegerField(default=0)),
+                ('best_percentage', models.PositiveIntegerField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_stats', to='curriculum.subject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_quiz_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'subject')},
+            },
+        ),
+        migrations.RunPython(fill_quiz_stats, migrations.RunPython.noop),
+    ]
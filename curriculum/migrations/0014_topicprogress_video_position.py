@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curriculum', '0013_quiz_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topicprogress',
+            name='video_position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_resume_pointers(apps, schema_editor):
+    """
+    Last topic = most recently updated TopicProgress; next = first topic not done.
+    """
+    Enrollment = apps.get_model('curriculum', 'Enrollment')
+    Topic = apps.get_model('curriculum', 'Topic')
+    TopicProgress = apps.get_model('curriculum', 'TopicProgress')
+    SubjectProgress = apps.get_model('curriculum', 'SubjectProgress')
+    topics = {}
+    for enrollment in Enrollment.objects.iterator(chunk_size=500):
+        if enrollment.subject_id not in topics:
+            topics[enrollment.subject_id] = list(
+                Topic.objects.filter(subject_id=enrollment.subject_id).order_by('order', 'id').values_list('id', 'position')
+            )
+        progress = SubjectProgress.objects.filter(user_id=enrollment.user_id, subject_id=enrollment.subject_id).first()
+        bits = int.from_bytes(bytes(progress.completed), 'little') if progress else 0
+        enrollment.next_topic_id = next(
+            (topic_id for topic_id, position in topics[enrollment.subject_id] if not bits >> position & 1), None
+        )
+        enrollment.last_topic_id = TopicProgress.objects.filter(
+            user_id=enrollment.user_id, topic__subject_id=enrollment.subject_id,
+        ).order_by('-updated_at').values_list('topic_id', flat=True).first()
+        enrollment.save(update_fields=['last_topic', 'next_topic'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curriculum', '0014_topicprogress_video_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='last_topic',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='curriculum.topic'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='next_topic',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='curriculum.topic'),
+        ),
+        migrations.RunPython(fill_resume_pointers, migrations.RunPython.noop),
+    ]
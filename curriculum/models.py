@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils.text import slugify
 from django.contrib.auth.models import User
 from django.db import models
@@ -64,12 +66,51 @@ class Topic(models.Model):
     # Duration (e.g., "10 mins")
     duration = models.CharField(max_length=50, blank=True, help_text="Estimated time to complete")
 
+    # Bit of this topic in SubjectProgress.completed. Assigned once, so reordering
+    # topics doesn't move anyone's progress (deleting one clears its bit).
+    position = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['subject', 'position'], name='unique_topic_position'),
+        ]
 
     def __str__(self):
         return f"{self.subject.name} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            moved_from = None
+            if self.pk is not None and self.position is not None:
+                previous = Topic.objects.filter(pk=self.pk).values_list('subject_id', flat=True).first()
+                if previous is not None and previous != self.subject_id:
+                    # Positions are per subject: take a free one in the new subject
+                    moved_from, old_position = previous, self.position
+                    self.position = None
+            if self.position is None:
+                self.position = self.next_position()
+            super().save(*args, **kwargs)
+
+            if moved_from is not None:
+                clear_position(moved_from, old_position)
+                self.set_completed_bits()
+
+    def next_position(self):
+        # Locking the subject row makes concurrent saves in one subject allocate one after the other
+        Subject.objects.select_for_update().filter(pk=self.subject_id).values_list('pk', flat=True).first()
+        last = Topic.objects.filter(subject_id=self.subject_id).aggregate(last=models.Max('position'))['last']
+        return 0 if last is None else last + 1
+
+    def set_completed_bits(self):
+        """
+        Sets this topic's bit for everyone who completed it (after a move to another subject).
+        """
+        for user_id in TopicProgress.objects.filter(topic=self, is_completed=True).values_list('user_id', flat=True):
+            progress, _ = SubjectProgress.objects.get_or_create(user_id=user_id, subject_id=self.subject_id)
+            if progress.set(self.position, True):
+                progress.save(update_fields=['completed', 'completed_count', 'updated_at'])
+
 
 class Question(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='questions')
@@ -95,12 +136,23 @@ class Enrollment(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='enrollments')
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    # Resume pointer (curriculum/progress.py): the topic opened last, and the first
+    # topic in course order that isn't done yet. None = nothing opened / all done.
+    last_topic = models.ForeignKey(Topic, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    next_topic = models.ForeignKey(Topic, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
     class Meta:
         unique_together = ('user', 'subject')  # Prevents duplicate enrollments
 
     def __str__(self):
         return f"{self.user.username} - {self.subject.name}"
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and self.next_topic_id is None:
+            # Nothing done yet: the course starts at its first topic
+            self.next_topic = Topic.objects.filter(subject_id=self.subject_id).order_by('order', 'id').first()
+        super().save(*args, **kwargs)
+
 
 # Add this at the bottom of curriculum/models.py
 
@@ -108,6 +160,7 @@ class TopicProgress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_progress')
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='progress')
     is_completed = models.BooleanField(default=False)
+    video_position = models.PositiveIntegerField(default=0)  # Seconds into the video, from player heartbeats
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -118,6 +171,58 @@ class TopicProgress(models.Model):
         return f"{self.user.username} - {self.topic.name} ({status})"
 
 
+class SubjectProgress(models.Model):
+    """
+    Completed topics of one user in one subject, as a bitset: bit Topic.position is
+    set when that topic is done (little-endian: bit n = byte n // 8, bit n % 8).
+    Kept in sync with TopicProgress by curriculum/progress.py, so per-topic checks and
+    completion counts are one row read instead of a scan of TopicProgress.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subject_progress')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='user_progress')
+    completed = models.BinaryField(default=b'')
+    completed_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'subject')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.subject.name}: {self.completed_count} done"
+
+    @property
+    def bits(self):
+        return int.from_bytes(bytes(self.completed), 'little')
+
+    def has(self, position):
+        return position is not None and bool(self.bits >> position & 1)
+
+    def set(self, position, done):
+        """
+        Sets or clears one topic's bit, keeping completed_count right. Returns True if it changed.
+        """
+        bits = self.bits
+        if bool(bits >> position & 1) == done:
+            return False
+        bits ^= 1 << position
+        self.completed = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        self.completed_count += 1 if done else -1
+        return True
+
+
+def clear_position(subject_id, position):
+    # A later topic can get this position again: it must start out not done
+    for progress in SubjectProgress.objects.filter(subject_id=subject_id, completed_count__gt=0):
+        if progress.set(position, False):
+            progress.save(update_fields=['completed', 'completed_count', 'updated_at'])
+
+
+@receiver(post_delete, sender=Topic)
+def clear_topic_bit(sender, instance, **kwargs):
+    if instance.position is not None:
+        clear_position(instance.subject_id, instance.position)
+
+
 # Add at the bottom of curriculum/models.py
 
 class QuizSubmission(models.Model):
@@ -140,6 +245,47 @@ class QuizSubmission(models.Model):
         return int((self.score / self.total_questions) * 100)
 
 
+class UserQuizStats(models.Model):
+    """
+    Running totals of a user's quiz submissions, updated by curriculum/quiz_stats.py on
+    every submission so reading them is one primary-key lookup.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='quiz_stats')
+    attempts = models.PositiveIntegerField(default=0)
+    percentage_sum = models.PositiveIntegerField(default=0)  # Sum of QuizSubmission.percentage
+    best_percentage = models.PositiveIntegerField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.attempts} quizzes, {self.average}% avg"
+
+    @property
+    def average(self):
+        return self.percentage_sum // self.attempts if self.attempts else 0
+
+
+class SubjectQuizStats(models.Model):
+    """
+    Same as UserQuizStats, for one subject.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subject_quiz_stats')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='quiz_stats')
+    attempts = models.PositiveIntegerField(default=0)
+    percentage_sum = models.PositiveIntegerField(default=0)
+    best_percentage = models.PositiveIntegerField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'subject')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.subject.name}: {self.attempts} quizzes, {self.average}% avg"
+
+    @property
+    def average(self):
+        return self.percentage_sum // self.attempts if self.attempts else 0
+
+
 # In curriculum/models.py (At the bottom)
 
 class Order(models.Model):
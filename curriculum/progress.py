@@ -0,0 +1,124 @@
+"""
+Topic completion, read from the per-subject bitsets (SubjectProgress).
+
+TopicProgress keeps one row per (user, topic); SubjectProgress packs the same
+information into one row per (user, subject). Writes go to both (sync, set_completed);
+reads only touch SubjectProgress.
+"""
+from django.db import transaction
+
+from .models import Enrollment, SubjectProgress, Topic, TopicProgress
+
+
+def get_progress(user, subject_id):
+    return SubjectProgress.objects.filter(user=user, subject_id=subject_id).first()
+
+
+def is_completed(user, topic):
+    progress = get_progress(user, topic.subject_id)
+    return progress is not None and progress.has(topic.position)
+
+
+def completed_topic_ids(progress, topics):
+    """
+    Ids of the given topics that are done, checked against an already loaded SubjectProgress.
+    """
+    if progress is None:
+        return set()
+    return {topic.id for topic in topics if progress.has(topic.position)}
+
+
+def sync(user, updates):
+    """
+    Applies a batch of updates, {topic_id: {'completed': bool, 'position': seconds}} (either
+    key optional), to TopicProgress with one bulk upsert and to the affected bitsets.
+    Unknown topic ids are skipped. Returns {topic_id: TopicProgress} of the applied ones.
+    """
+    topics = {topic.id: topic for topic in Topic.objects.filter(id__in=updates).only('id', 'subject_id', 'position')}
+    if not topics:
+        return {}
+    subject_ids = {topic.subject_id for topic in topics.values()}
+
+    with transaction.atomic():
+        # 1. Lock the user's bitsets of these subjects: batches of one user apply one after the other
+        SubjectProgress.objects.bulk_create(
+            [SubjectProgress(user=user, subject_id=subject_id) for subject_id in subject_ids], ignore_conflicts=True,
+        )
+        bitsets = {
+            progress.subject_id: progress
+            for progress in SubjectProgress.objects.select_for_update().filter(user=user, subject_id__in=subject_ids)
+        }
+        rows = {row.topic_id: row for row in TopicProgress.objects.filter(user=user, topic_id__in=topics)}
+
+        # 2. Apply the updates in memory
+        changed_rows, changed_bitsets, last_topics = [], set(), {}
+        for topic_id, topic in topics.items():
+            update = updates[topic_id]
+            row = rows.setdefault(topic_id, TopicProgress(user=user, topic_id=topic_id))
+            before = (row.is_completed, row.video_position)
+            if 'completed' in update:
+                row.is_completed = update['completed']
+                last_topics[topic.subject_id] = topic_id
+                if bitsets[topic.subject_id].set(topic.position, row.is_completed):
+                    changed_bitsets.add(topic.subject_id)
+            if 'position' in update:
+                row.video_position = update['position']
+            if row.pk is None or (row.is_completed, row.video_position) != before:
+                changed_rows.append(row)
+
+        # 3. Write what changed: one upsert for the rows, one UPDATE per changed subject
+        if changed_rows:
+            TopicProgress.objects.bulk_create(
+                changed_rows, update_conflicts=True, unique_fields=['user', 'topic'],
+                update_fields=['is_completed', 'video_position', 'updated_at'],
+            )
+        for subject_id in changed_bitsets:
+            bitsets[subject_id].save(update_fields=['completed', 'completed_count', 'updated_at'])
+            Enrollment.objects.filter(user=user, subject_id=subject_id).update(
+                last_topic_id=last_topics[subject_id], next_topic_id=next_topic_id(subject_id, bitsets[subject_id]),
+            )
+    return rows
+
+
+def next_topic_id(subject_id, progress):
+    """
+    First topic of the subject, in course order, whose bit isn't set (None when all are done).
+    """
+    for topic_id, position in Topic.objects.filter(subject_id=subject_id).order_by('order', 'id').values_list('id', 'position'):
+        if not progress.has(position):
+            return topic_id
+    return None
+
+
+def visit(user, topic):
+    """
+    Points the user's enrollment in the topic's subject at it. Returns True if it changed.
+    """
+    return bool(
+        Enrollment.objects.filter(user=user, subject_id=topic.subject_id)
+        .exclude(last_topic_id=topic.id)
+        .update(last_topic_id=topic.id)
+    )
+
+
+def set_completed(user, topic, done):
+    """
+    Marks a topic done or not done, in TopicProgress and in the subject's bitset.
+    """
+    return sync(user, {topic.id: {'completed': done}})[topic.id]
+
+
+def rebuild(user_id, subject_id):
+    """
+    Recomputes one bitset from the TopicProgress rows (see the backfill_subject_progress command).
+    """
+    positions = TopicProgress.objects.filter(
+        user_id=user_id, topic__subject_id=subject_id, is_completed=True, topic__position__isnull=False,
+    ).values_list('topic__position', flat=True)
+    bits = 0
+    for position in positions:
+        bits |= 1 << position
+    SubjectProgress.objects.update_or_create(user_id=user_id, subject_id=subject_id, defaults={
+        'completed': bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+        'completed_count': bin(bits).count('1'),
+    })
@@ -0,0 +1,83 @@
+"""
+Per-user and per-user-per-subject quiz totals (UserQuizStats, SubjectQuizStats).
+
+record() adds one submission with a single UPDATE ... SET x = x + n per row, so
+concurrent submissions don't lose counts; rebuild() recomputes them from history.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import QuizSubmission, SubjectQuizStats, UserQuizStats
+
+
+def add_attempt(model, lookup, percentage, attempted_at):
+    changes = {
+        'attempts': F('attempts') + 1,
+        'percentage_sum': F('percentage_sum') + percentage,
+        'best_percentage': Greatest(F('best_percentage'), Value(percentage)),
+        'last_attempt_at': attempted_at,
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, attempts=1, percentage_sum=percentage, best_percentage=percentage, last_attempt_at=attempted_at)
+    except IntegrityError:
+        # Created by a concurrent submission in the meantime
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record(submission):
+    """
+    Adds a new QuizSubmission to the user's totals (call in the transaction that created it).
+    """
+    percentage = submission.percentage
+    add_attempt(UserQuizStats, {'user_id': submission.user_id}, percentage, submission.submitted_at)
+    add_attempt(SubjectQuizStats, {'user_id': submission.user_id, 'subject_id': submission.subject_id}, percentage, submission.submitted_at)
+
+
+def get_stats(user):
+    """
+    The user's UserQuizStats, unsaved and empty if they never submitted a quiz.
+    """
+    return UserQuizStats.objects.filter(pk=user.pk).first() or UserQuizStats(user=user)
+
+
+def rebuild(user_ids=None):
+    """
+    Recomputes the stats of the given users (default: everyone) from their QuizSubmissions.
+    Returns the number of users with stats.
+    """
+    submissions = QuizSubmission.objects.order_by()
+    if user_ids is not None:
+        submissions = submissions.filter(user_id__in=user_ids)
+
+    totals = {}
+    for submission in submissions.only('user_id', 'subject_id', 'score', 'total_questions', 'submitted_at').iterator(chunk_size=2000):
+        # Same percentage as record(): the model property
+        for key in ((submission.user_id,), (submission.user_id, submission.subject_id)):
+            attempts, percentage_sum, best, last = totals.get(key, (0, 0, 0, None))
+            totals[key] = (
+                attempts + 1,
+                percentage_sum + submission.percentage,
+                max(best, submission.percentage),
+                submission.submitted_at if last is None else max(last, submission.submitted_at),
+            )
+
+    with transaction.atomic():
+        users = UserQuizStats.objects.all()
+        subjects = SubjectQuizStats.objects.all()
+        if user_ids is not None:
+            users = users.filter(user_id__in=user_ids)
+            subjects = subjects.filter(user_id__in=user_ids)
+        users.delete()
+        subjects.delete()
+        fields = lambda values: dict(zip(('attempts', 'percentage_sum', 'best_percentage', 'last_attempt_at'), values))
+        UserQuizStats.objects.bulk_create([
+            UserQuizStats(user_id=key[0], **fields(values)) for key, values in totals.items() if len(key) == 1
+        ], batch_size=1000)
+        SubjectQuizStats.objects.bulk_create([
+            SubjectQuizStats(user_id=key[0], subject_id=key[1], **fields(values)) for key, values in totals.items() if len(key) == 2
+        ], batch_size=1000)
+    return sum(1 for key in totals if len(key) == 1)
@@ -1,3 +1,98 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from . import progress
+from .models import Choice, Program, Question, QuizSubmission, Subject, SubjectProgress, Topic
+
+
+class TopicPositionTests(TestCase):
+    def setUp(self):
+        program = Program.objects.create(name='Technical Training')
+        self.python = Subject.objects.create(program=program, name='Python')
+        self.java = Subject.objects.create(program=program, name='Java')
+        self.user = User.objects.create_user('student')
+
+    def test_positions_are_allocated_per_subject(self):
+        topics = [Topic.objects.create(subject=self.python, name=f'P{i}') for i in range(3)]
+        self.assertEqual([topic.position for topic in topics], [0, 1, 2])
+        self.assertEqual(Topic.objects.create(subject=self.java, name='J0').position, 0)
+
+        # Reordering keeps the position (and everyone's progress)
+        topics[0].order = 9
+        topics[0].save()
+        self.assertEqual(Topic.objects.get(pk=topics[0].pk).position, 0)
+
+    def test_moving_a_topic_takes_a_new_position_and_its_progress(self):
+        done = Topic.objects.create(subject=self.python, name='P0')
+        Topic.objects.create(subject=self.python, name='P1')
+        Topic.objects.create(subject=self.java, name='J0')
+        progress.set_completed(self.user, done, True)
+
+        done.subject = self.java
+        done.save()
+
+        self.assertEqual(done.position, 1)
+        old = SubjectProgress.objects.get(user=self.user, subject=self.python)
+        new = SubjectProgress.objects.get(user=self.user, subject=self.java)
+        self.assertEqual((old.has(0), old.completed_count), (False, 0))
+        self.assertEqual((new.has(1), new.completed_count), (True, 1))
+
+    def test_deleting_a_topic_clears_its_bit(self):
+        topics = [Topic.objects.create(subject=self.python, name=f'P{i}') for i in range(2)]
+        progress.set_completed(self.user, topics[1], True)
+        topics[1].delete()
+
+        # The freed position goes to the next topic, which must start out not done
+        replacement = Topic.objects.create(subject=self.python, name='P2')
+        self.assertEqual(replacement.position, 1)
+        self.assertFalse(progress.is_completed(self.user, replacement))
+
+
+class QuizQueryTests(TestCase):
+    def setUp(self):
+        program = Program.objects.create(name='Technical Training')
+        self.small = self.make_quiz(program, 'Aptitude', questions=2)
+        self.large = self.make_quiz(program, 'Reasoning', questions=30)
+        self.client.force_login(User.objects.create_user('student'))
+
+    def make_quiz(self, program, name, questions):
+        subject = Subject.objects.create(program=program, name=name)
+        for i in range(questions):
+            question = Question.objects.create(subject=subject, text=f'{name} {i}')
+            for n in range(4):
+                Choice.objects.create(question=question, text=str(n), is_correct=n == 0)
+        return subject
+
+    def answers(self, subject):
+        answers = {}
+        for i, question in enumerate(subject.questions.order_by('id')):
+            # Every other question right
+            choice = question.choices.filter(is_correct=i % 2 == 0).first()
+            answers[str(question.id)] = str(choice.id)
+        return answers
+
+    def url(self, subject):
+        return reverse('quiz', args=[subject.slug])
+
+    def test_quiz_page_queries_do_not_grow_with_questions(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url(self.small))
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(self.url(self.large))
+        self.assertContains(response, 'Reasoning 29')
+
+    def test_grading_queries_do_not_grow_with_questions(self):
+        small_answers, large_answers = self.answers(self.small), self.answers(self.large)
+        # The first attempt also creates the running totals rows (curriculum/quiz_stats.py)
+        self.client.post(self.url(self.small), small_answers)
+        self.client.post(self.url(self.large), large_answers)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url(self.small), small_answers)
+        with self.assertNumQueries(len(small)):
+            response = self.client.post(self.url(self.large), large_answers)
+        self.assertEqual((response.context['score'], response.context['total']), (15, 30))
+        self.assertEqual(list(QuizSubmission.objects.filter(subject=self.large).values_list('score', flat=True)), [15, 15])